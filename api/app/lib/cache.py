@@ -0,0 +1,146 @@
+"""
+Process-local read-through cache in front of Redis values
+
+Values are stored in Redis under versioned keys (`{key}:v{version}`).
+Writers publish a full snapshot, switch `{namespace}:version` and notify
+readers via pub/sub; readers keep decoded values in memory until the
+version changes.
+"""
+
+import asyncio
+import time
+
+from libdev.cfg import cfg
+from libdev.log import log
+
+from lib.queue import expire, get, increment, redis, save
+from lib.subscriber import Subscriber
+
+
+# NOTE: Safety net for lost pub/sub messages / dropped subscription
+CHECK_INTERVAL = float(cfg("cache.check") or 60)
+CHECK_INTERVAL_UNSUBSCRIBED = float(cfg("cache.check_unsubscribed") or 1)
+# NOTE: Previous snapshot stays readable for in-flight readers
+STALE_TTL = 60
+
+
+class LocalCache:
+    """L1 cache of a versioned group of Redis keys"""
+
+    def __init__(self, namespace):
+        self.namespace = namespace
+        self.version_key = f"{namespace}:version"
+        self.sequence_key = f"{namespace}:sequence"
+        self.channel = f"{namespace}:invalidate"
+        self.version = None
+        self.checked = 0.0
+        self.values: dict = {}
+        self.loading: dict = {}
+        self.subscriber = Subscriber(self.channel, self._set_version, self._resync)
+
+    def _key(self, key, version):
+        return f"{key}:v{version}" if version else key
+
+    def _set_version(self, version):
+        version = int(version or 0)
+        if version != self.version:
+            self.version = version
+            self.values = {}
+        self.checked = time.monotonic()
+
+    async def _resync(self):
+        # NOTE: Messages may have been missed while unsubscribed
+        self._set_version(await redis.get(self.version_key))
+
+    async def current_version(self):
+        """Known snapshot version, re-checked in Redis periodically"""
+
+        interval = (
+            CHECK_INTERVAL
+            if self.subscriber.active()
+            else CHECK_INTERVAL_UNSUBSCRIBED
+        )
+        if self.version is None or time.monotonic() - self.checked > interval:
+            try:
+                self._set_version(await redis.get(self.version_key))
+            except Exception as e:  # pylint: disable=broad-except
+                log.warning("Cache {} version error: {}", self.namespace, e)
+        return self.version or 0
+
+    async def _load(self, key, version):
+        value = await get(self._key(key, version))
+        if value is not None and version == self.version:
+            self.values[key] = value
+        return value
+
+    async def get(self, key, default=None):
+        """Get value; callers must not mutate it, it is shared in the process"""
+
+        version = await self.current_version()
+
+        if key in self.values:
+            return self.values[key]
+
+        # NOTE: Concurrent misses share one Redis read
+        task = self.loading.get((key, version))
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, version))
+            self.loading[(key, version)] = task
+            task.add_done_callback(lambda _: self.loading.pop((key, version), None))
+
+        value = await task
+        return default if value is None else value
+
+    async def publish(self, values: dict, keep=()):
+        """Save a new snapshot and invalidate all L1 copies
+
+        Keys from `keep` are carried over from the previous snapshot
+        inside Redis, without sending their values again.
+        """
+
+        try:
+            previous = int(await redis.get(self.version_key) or 0)
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Cache {} version error: {}", self.namespace, e)
+            return
+
+        version = await increment(self.sequence_key)
+        if version is None:
+            return
+
+        # NOTE: The version is switched only when the whole snapshot is written
+        for key, value in values.items():
+            if not await save(self._key(key, version), value):
+                log.warning("Cache {} not published: {} not saved", self.namespace, key)
+                return
+
+        try:
+            for key in keep:
+                if not await redis.copy(
+                    self._key(key, previous),
+                    self._key(key, version),
+                    replace=True,
+                ):
+                    log.warning(
+                        "Cache {} not published: {} not copied", self.namespace, key
+                    )
+                    return
+            await redis.set(self.version_key, version)
+            await redis.publish(self.channel, version)
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Cache {} publish error: {}", self.namespace, e)
+            return
+        self._set_version(version)
+
+        if previous:
+            for key in (*values, *keep):
+                await expire(self._key(key, previous), STALE_TTL)
+
+
+categories = LocalCache("category")
+
+
+__all__ = (
+    "LocalCache",
+    "categories",
+)
@@ -0,0 +1,213 @@
+"""
+Versioned binary codecs for Redis values and queue messages
+
+Frame: `MAGIC (2 bytes) | VERSION | CODEC | FLAGS | payload`
+Values without the magic prefix are legacy pickles and are still readable.
+"""
+
+import pickle
+
+import msgpack
+import zstandard
+
+from libdev.cfg import cfg
+
+
+MAGIC = b"\xc5\x51"
+VERSION = 1
+HEADER_SIZE = len(MAGIC) + 3
+
+FLAG_ZSTD = 1
+
+# NOTE: msgpack extension types
+EXT_MODEL = 1  # NOTE: Nested `[name, fields]` payload, only read
+EXT_SET = 2
+EXT_MODEL_NAME = 3
+EXT_PICKLE = 127
+
+# NOTE: `QUEUE_COMPRESS=0` turns compression off
+COMPRESS_THRESHOLD = int(cfg("queue.compress", 1024))
+COMPRESS_LEVEL = 3
+
+_compressor = zstandard.ZstdCompressor(level=COMPRESS_LEVEL)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+class _ModelName(str):
+    """Collection name heading an inline model array"""
+
+
+def _get_model(name):
+    # pylint: disable=import-outside-toplevel
+    from models import get_model
+
+    return get_model(name)
+
+
+def _restore(name, state):
+    """Model instance from its state, without the constructor (as pickle does)"""
+
+    model = _get_model(name)
+    if model is None:
+        return {key: value for key, value in state.items() if key[0] != "_"}
+    obj = model.__new__(model)
+    obj.__dict__.update(state)
+    return obj
+
+
+def _default(obj):
+    """Typed encoding of values msgpack doesn't support natively"""
+
+    # NOTE: consys model instance → `[name ext, state]` in the same stream
+    name = getattr(obj, "_name", None)
+    if isinstance(name, str) and hasattr(obj, "json"):
+        return [msgpack.ExtType(EXT_MODEL_NAME, name.encode()), obj.__dict__]
+
+    if isinstance(obj, (set, frozenset)):
+        return msgpack.ExtType(EXT_SET, _packb(list(obj)))
+
+    # NOTE: Anything else keeps working, but is tied to the class layout
+    return msgpack.ExtType(EXT_PICKLE, pickle.dumps(obj))
+
+
+def _ext_hook(code, data):
+    if code == EXT_MODEL_NAME:
+        return _ModelName(data.decode())
+
+    if code == EXT_SET:
+        return set(_unpackb(data))
+
+    if code == EXT_MODEL:
+        name, fields = _unpackb(data)
+        model = _get_model(name)
+        if model is None:
+            return fields
+        return model(arg_data=fields, arg_fields={})
+
+    if code == EXT_PICKLE:
+        return pickle.loads(data)
+
+    return msgpack.ExtType(code, data)
+
+
+def _list_hook(data):
+    if len(data) == 2 and type(data[0]) is _ModelName:  # pylint: disable=C0123
+        return _restore(data[0], data[1])
+    return data
+
+
+def _packb(data):
+    return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+def _unpackb(data):
+    return msgpack.unpackb(
+        data,
+        ext_hook=_ext_hook,
+        list_hook=_list_hook,
+        raw=False,
+        strict_map_key=False,
+    )
+
+
+class Codec:
+    """Base codec"""
+
+    id: int = 0
+    name: str = ""
+
+    def dumps(self, data) -> bytes:
+        """Serialize"""
+        raise NotImplementedError
+
+    def loads(self, data: bytes):
+        """Deserialize"""
+        raise NotImplementedError
+
+
+class PickleCodec(Codec):
+    """Legacy pickle codec"""
+
+    id = 0
+    name = "pickle"
+
+    def dumps(self, data) -> bytes:
+        return pickle.dumps(data)
+
+    def loads(self, data: bytes):
+        return pickle.loads(data)
+
+
+class MsgpackCodec(Codec):
+    """msgpack with typed extensions for models and sets
+
+    Models are written inline as the collection name followed by the instance
+    state and restored without the constructor, like pickle does.
+    """
+
+    id = 1
+    name = "msgpack"
+
+    def dumps(self, data) -> bytes:
+        return _packb(data)
+
+    def loads(self, data: bytes):
+        return _unpackb(data)
+
+
+CODECS = {codec.id: codec for codec in (PickleCodec(), MsgpackCodec())}
+CODECS_BY_NAME = {codec.name: codec for codec in CODECS.values()}
+# NOTE: pickle stays the default, it decodes faster (`scripts.bench_queue`)
+DEFAULT_CODEC = CODECS_BY_NAME.get(cfg("queue.codec") or "pickle", CODECS[0])
+
+
+def get_codec(codec: Codec | str | None = None) -> Codec:
+    """Resolve codec by name / instance"""
+    if codec is None:
+        return DEFAULT_CODEC
+    if isinstance(codec, Codec):
+        return codec
+    return CODECS_BY_NAME[codec]
+
+
+def encode(data, codec: Codec | str | None = None, compress: bool | None = None):
+    """Serialize into a framed payload"""
+
+    codec = get_codec(codec)
+    payload = codec.dumps(data)
+
+    flags = 0
+    if compress is None:
+        compress = 0 < COMPRESS_THRESHOLD <= len(payload)
+    if compress:
+        payload = _compressor.compress(payload)
+        flags |= FLAG_ZSTD
+
+    return MAGIC + bytes((VERSION, codec.id, flags)) + payload
+
+
+def decode(data: bytes):
+    """Deserialize a framed payload (or a legacy pickle)"""
+
+    if data[: len(MAGIC)] != MAGIC:
+        return pickle.loads(data)
+
+    version, codec_id, flags = data[len(MAGIC) : HEADER_SIZE]
+    if version > VERSION:
+        raise ValueError(f"Unsupported payload version: {version}")
+
+    payload = data[HEADER_SIZE:]
+    if flags & FLAG_ZSTD:
+        payload = _decompressor.decompress(payload)
+
+    return CODECS[codec_id].loads(payload)
+
+
+__all__ = (
+    "Codec",
+    "PickleCodec",
+    "MsgpackCodec",
+    "get_codec",
+    "encode",
+    "decode",
+)
@@ -0,0 +1,60 @@
+"""
+Cached counts for list endpoints
+
+Counts are cached by the normalized filter under a per-collection generation,
+so saves reset all cached counts of the collection with one `INCR`.
+"""
+
+import hashlib
+import json
+from typing import Literal
+
+from libdev.log import log
+
+from lib.queue import get, increment, redis, save
+
+
+# NOTE: `more` skips counting and only reports whether the next page exists
+CountMode = Literal["exact", "cached", "estimated", "more"]
+
+
+def _generation_key(name):
+    return f"count:{name}"
+
+
+def condition_key(condition) -> str:
+    """Stable digest of a DB condition"""
+    raw = json.dumps(condition, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+async def cached(name, condition, ttl, fetch):
+    """Count from cache, or from `fetch()` saved for `ttl` seconds"""
+
+    try:
+        generation = int(await redis.get(_generation_key(name)) or 0)
+    except Exception as e:  # pylint: disable=broad-except
+        log.warning("Count generation error: {}", e)
+        return await fetch()
+
+    key = f"count:{name}:{generation}:{condition_key(condition)}"
+    count = await get(key)
+    if count is not None:
+        return count
+
+    count = await fetch()
+    await save(key, count, ttl)
+    return count
+
+
+async def invalidate(name):
+    """Reset cached counts of the collection"""
+    await increment(_generation_key(name))
+
+
+__all__ = (
+    "CountMode",
+    "condition_key",
+    "cached",
+    "invalidate",
+)
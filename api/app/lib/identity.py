@@ -0,0 +1,154 @@
+"""
+Request-scoped identity map and batch loader for model lookups
+"""
+
+import asyncio
+import contextvars
+from contextlib import contextmanager
+
+
+# NOTE: Marks ids already known to be absent in DB during the scope
+MISSING = object()
+
+_scope: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "identity_scope", default=None
+)
+# NOTE: The loop keeps only weak references to tasks
+_dispatches: set[asyncio.Task] = set()
+
+
+@contextmanager
+def identity_scope():
+    """Activate an identity map for the current request / job"""
+
+    token = _scope.set({"objects": {}, "loaders": {}})
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def active():
+    """Whether an identity scope is active"""
+    return _scope.get() is not None
+
+
+def _name(model):
+    """Collection name of a model or an instance, the map key prefix"""
+    # NOTE: consys keeps it in `_name`, models have no public accessor
+    return model._name  # pylint: disable=protected-access
+
+
+def lookup(name, id_):
+    """Cached instance, `MISSING`, or None when unknown"""
+    scope = _scope.get()
+    if scope is None:
+        return None
+    return scope["objects"].get((name, id_))
+
+
+def remember(instance):
+    """Put an instance into the map, keeping the already known one"""
+    scope = _scope.get()
+    if scope is None or not instance.id:
+        return instance
+    key = (_name(instance), instance.id)
+    current = scope["objects"].get(key)
+    if current is None or current is MISSING:
+        scope["objects"][key] = instance
+        return instance
+    return current
+
+
+def replace(instance):
+    """Put an instance into the map, overriding the known one"""
+    scope = _scope.get()
+    if scope is not None and instance.id:
+        scope["objects"][(_name(instance), instance.id)] = instance
+
+
+def forget(name, id_, missing=False):
+    """Drop an instance from the map"""
+    scope = _scope.get()
+    if scope is None:
+        return
+    if missing:
+        scope["objects"][(name, id_)] = MISSING
+    else:
+        scope["objects"].pop((name, id_), None)
+
+
+class Loader:
+    """Coalesce `load(id)` calls issued in the same tick into one `$in` query"""
+
+    def __init__(self, model):
+        self.model = model
+        self.pending: dict = {}
+
+    def load(self, id_) -> asyncio.Future:
+        """Future with the instance (or `ErrorWrong`) for the id"""
+
+        future = self.pending.get(id_)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        if not self.pending:
+            loop.call_soon(self._start, loop)
+
+        future = loop.create_future()
+        self.pending[id_] = future
+        return future
+
+    def _start(self, loop):
+        task = loop.create_task(self.dispatch())
+        _dispatches.add(task)
+        task.add_done_callback(_dispatches.discard)
+
+    async def dispatch(self):
+        """Fetch all pending ids with one query"""
+
+        # pylint: disable=import-outside-toplevel
+        from consys.errors import ErrorWrong
+
+        pending, self.pending = self.pending, {}
+
+        try:
+            instances = await self.model.aget(ids=list(pending))
+        except Exception as e:  # pylint: disable=broad-except
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        found = {instance.id: instance for instance in instances}
+        for id_, future in pending.items():
+            if future.done():
+                continue
+            instance = found.get(id_)
+            if instance is None:
+                forget(_name(self.model), id_, missing=True)
+                future.set_exception(ErrorWrong("id"))
+            else:
+                future.set_result(remember(instance))
+
+
+def loader(model):
+    """Batch loader of the model for the current scope"""
+
+    scope = _scope.get()
+    if scope is None:
+        return Loader(model)
+    return scope["loaders"].setdefault(_name(model), Loader(model))
+
+
+__all__ = (
+    "MISSING",
+    "identity_scope",
+    "active",
+    "lookup",
+    "remember",
+    "replace",
+    "forget",
+    "loader",
+)
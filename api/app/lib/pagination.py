@@ -0,0 +1,42 @@
+"""
+Opaque cursors for keyset pagination
+"""
+
+import base64
+import json
+
+from consys.errors import ErrorInvalid
+
+
+def encode_cursor(key: list | None) -> str | None:
+    """Cursor from the sort key of the last item on a page"""
+
+    if key is None:
+        return None
+
+    raw = json.dumps(key, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None) -> list | None:
+    """Sort key from a cursor"""
+
+    if not cursor:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        key = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ErrorInvalid("cursor") from e
+
+    if not isinstance(key, list):
+        raise ErrorInvalid("cursor")
+
+    return key
+
+
+__all__ = (
+    "encode_cursor",
+    "decode_cursor",
+)
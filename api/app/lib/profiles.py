@@ -0,0 +1,257 @@
+"""
+Cache of UserHub profiles
+
+Profile fields are kept per user in Redis (`profile:{id}` hash, each field
+with its fetch time) and in a process LRU; a field is fresh for its TTL from
+`FIELD_TTL` (`PROFILES_TTL` seconds by default). Concurrent lookups of the
+same user share one UserHub request, missing users are fetched in one batch.
+`invalidate` drops users in Redis and in all API processes.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+from libdev.cfg import cfg
+from libdev.log import log
+from userhub import BaseUser as User
+
+from lib.codec import decode, encode
+from lib.queue import redis
+from lib.subscriber import Subscriber
+
+
+TTL = int(cfg("profiles.ttl") or 3600)
+# NOTE: Fields changed by UserHub itself are refreshed more often
+FIELD_TTL = {
+    "status": 60,
+    "balance": 60,
+    "last_online": 60,
+}
+LOCAL_SIZE = int(cfg("profiles.local") or 10000)
+CHANNEL = "profiles:invalidate"
+# NOTE: Results of requests started before an invalidation are not stored
+INVALIDATED_TTL = 60
+
+
+def _key(user_id):
+    return f"profile:{user_id}"
+
+
+def _fresh(entry, fields, now) -> dict | None:
+    """Fields of the cached entry, None if some of them are missing or stale"""
+
+    profile = {}
+    for field in fields:
+        item = entry.get(field)
+        if item is None or now - item[1] > FIELD_TTL.get(field, TTL):
+            return None
+        if item[0] is not None:
+            profile[field] = item[0]
+    return profile
+
+
+class _Profiles:
+    """L1 of profile fields in front of Redis and UserHub"""
+
+    def __init__(self, size=LOCAL_SIZE):
+        self.size = size
+        self.local: OrderedDict = OrderedDict()
+        self.loading: dict = {}
+        self.invalidated: dict = {}
+        self.subscriber = Subscriber(CHANNEL, self._drop)
+
+    def _drop(self, message):
+        for user_id in (
+            message.decode() if isinstance(message, bytes) else message
+        ).split(","):
+            self.local.pop(int(user_id), None)
+
+    def _remember(self, user_id, entry):
+        self.local.setdefault(user_id, {}).update(entry)
+        self.local.move_to_end(user_id)
+        while len(self.local) > self.size:
+            self.local.popitem(last=False)
+
+    async def _read(self, ids, fields) -> dict:
+        """Cached fields from Redis as `{id: {field: (value, fetched)}}`"""
+
+        fields = sorted(fields)
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for user_id in ids:
+                    pipe.hmget(_key(user_id), fields)
+                rows = await pipe.execute()
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Profiles cache read error: {}", e)
+            return {}
+
+        entries = {}
+        for user_id, values in zip(ids, rows):
+            entry = {
+                field: tuple(decode(value))
+                for field, value in zip(fields, values)
+                if value is not None
+            }
+            if entry:
+                entries[user_id] = entry
+        return entries
+
+    async def _write(self, entries):
+        ttl = max(TTL, *FIELD_TTL.values())
+        try:
+            async with redis.pipeline(transaction=False) as pipe:
+                for user_id, entry in entries.items():
+                    pipe.hset(
+                        _key(user_id),
+                        mapping={
+                            field: encode(list(item)) for field, item in entry.items()
+                        },
+                    )
+                    pipe.expire(_key(user_id), ttl)
+                await pipe.execute()
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Profiles cache write error: {}", e)
+
+    async def _fetch(self, ids, fields, token) -> dict:
+        """Profiles from UserHub, stored in the cache"""
+
+        started = time.time()
+        users = await User.complex(
+            token=token or cfg("userhub.token"),
+            # NOTE: A single user is requested by `id=<int>`
+            id=ids[0] if len(ids) == 1 else ids,
+            fields=list(fields),
+        )
+        if isinstance(users, str):
+            log.warning("Profiles fetch error: {}", users)
+            return {}
+
+        entries = {}
+        for user in users if isinstance(users, list) else [users]:
+            if isinstance(user, dict) and user.get("id") in ids:
+                entries[user["id"]] = {
+                    field: (user.get(field), started) for field in fields
+                }
+
+        stored = {
+            user_id: entry
+            for user_id, entry in entries.items()
+            if self.invalidated.get(user_id, 0) < started
+        }
+        if stored:
+            await self._write(stored)
+            if self.subscriber.active():
+                for user_id, entry in stored.items():
+                    self._remember(user_id, entry)
+
+        return {
+            user_id: {
+                field: value for field, (value, _) in entry.items() if value is not None
+            }
+            for user_id, entry in entries.items()
+        }
+
+    async def _load(self, ids, fields, token) -> dict:
+        """Fetch users, joining requests in flight for the same users"""
+
+        waiting = {}
+        rest = []
+        for user_id in ids:
+            loading = self.loading.get(user_id)
+            if loading is not None and fields <= loading[0]:
+                waiting[user_id] = loading[1]
+            else:
+                rest.append(user_id)
+
+        if rest:
+            task = asyncio.ensure_future(self._fetch(rest, fields, token))
+            for user_id in rest:
+                self.loading[user_id] = (fields, task)
+                waiting[user_id] = task
+
+            def done(_):
+                for user_id in rest:
+                    if self.loading.get(user_id, (None, None))[1] is task:
+                        del self.loading[user_id]
+
+            task.add_done_callback(done)
+
+        result = {}
+        for task in set(waiting.values()):
+            try:
+                loaded = await asyncio.shield(task)
+            except Exception as e:  # pylint: disable=broad-except
+                log.warning("Profiles fetch error: {}", e)
+                continue
+            for user_id, profile in loaded.items():
+                if waiting.get(user_id) is task:
+                    result[user_id] = dict(profile)
+        return result
+
+    async def get_many(self, ids, fields, token=None) -> dict:
+        """Profiles with the fields as `{id: {field: value}}`, missing users skipped"""
+
+        fields = frozenset(fields) | {"id"}
+        ids = list(dict.fromkeys(int(user_id) for user_id in ids if user_id))
+        now = time.time()
+        trusted = self.subscriber.active()
+
+        result = {}
+        missing = []
+        for user_id in ids:
+            entry = self.local.get(user_id) if trusted else None
+            profile = None if entry is None else _fresh(entry, fields, now)
+            if profile is None:
+                missing.append(user_id)
+                continue
+            self.local.move_to_end(user_id)
+            result[user_id] = profile
+
+        if missing:
+            for user_id, entry in (await self._read(missing, fields)).items():
+                if trusted:
+                    self._remember(user_id, entry)
+                profile = _fresh(entry, fields, now)
+                if profile is not None:
+                    result[user_id] = profile
+            missing = [user_id for user_id in missing if user_id not in result]
+
+        if missing:
+            result.update(await self._load(missing, fields, token))
+        return result
+
+    async def get(self, user_id, fields, token=None) -> dict | None:
+        """Profile of the user with the fields, None if it is not found"""
+        return (await self.get_many([user_id], fields, token)).get(int(user_id))
+
+    async def invalidate(self, *ids):
+        """Drop cached profiles of the users in all processes"""
+
+        ids = [int(user_id) for user_id in ids if user_id]
+        if not ids:
+            return
+
+        now = time.time()
+        if len(self.invalidated) > self.size:
+            self.invalidated = {
+                user_id: at
+                for user_id, at in self.invalidated.items()
+                if now - at < INVALIDATED_TTL
+            }
+        for user_id in ids:
+            self.invalidated[user_id] = now
+            self.local.pop(user_id, None)
+            self.loading.pop(user_id, None)
+
+        try:
+            await redis.delete(*(_key(user_id) for user_id in ids))
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Profiles cache invalidation error: {}", e)
+        await self.subscriber.publish(",".join(map(str, ids)))
+
+
+profiles = _Profiles()
+
+
+__all__ = ("profiles",)
@@ -2,22 +2,23 @@
 Message Queue
 """
 
-import pickle
-
 from libdev.cfg import cfg
 from redis.asyncio import Redis
 
+from lib.codec import decode, encode
+
 
 class Queue:
     """FIFO queue with Redis"""
 
-    def __init__(self, broker, name):
+    def __init__(self, broker, name, codec=None):
         self.broker = broker
         self.name = name
+        self.codec = codec
 
     async def push(self, data):
         """Push data to queue"""
-        await self.broker.rpush(self.name, pickle.dumps(data))
+        await self.broker.rpush(self.name, encode(data, self.codec))
 
     async def pop(self):
         """Pop data from queue"""
@@ -26,14 +27,19 @@ class Queue:
         result = await self.broker.blpop(self.name)
         if not result:
             return None
-        return pickle.loads(result[1])
+        return decode(result[1])
 
     async def pop_nowait(self):
         """Pop data without blocking"""
         data = await self.broker.lpop(self.name)
         if data is None:
             return None
-        return pickle.loads(data)
+        return decode(data)
+
+    async def pop_many(self, count):
+        """Pop up to `count` items without blocking"""
+        data = await self.broker.lpop(self.name, count)
+        return [decode(item) for item in data or ()]
 
     async def length(self):
         """Length of queue"""
@@ -47,9 +53,9 @@ redis = Redis(
 )
 
 
-def queue(name):
+def queue(name, codec=None):
     """Create queue object"""
-    return Queue(redis, name)
+    return Queue(redis, name, codec)
 
 
 async def expire(key, ttl):
@@ -60,19 +66,20 @@ async def expire(key, ttl):
         print("Redis expire error", e)
 
 
-async def save(key, data, ttl=None):
-    """Save value"""
+async def save(key, data, ttl=None, codec=None):
+    """Save value, False if Redis is unavailable"""
 
-    data = pickle.dumps(data)
+    data = encode(data, codec)
 
     try:
         await redis.set(key, data)
     except Exception as e:  # pylint: disable=broad-except
         print("Redis save error", e)
-        return
+        return False
 
     if ttl is not None:
         await expire(key, ttl)
+    return True
 
 
 async def get(key, default=None):
@@ -87,7 +94,11 @@ async def get(key, default=None):
     if data is None:
         return default
 
-    return pickle.loads(data)
+    try:
+        return decode(data)
+    except Exception as e:  # pylint: disable=broad-except
+        print("Redis decode error", e)
+        return default
 
 
 async def increment(key):
@@ -0,0 +1,112 @@
+"""
+Fast JSON responses for list endpoints
+
+Handlers returning `fast_response` skip `response_model` validation, so
+items must already have the response shape: built from stored snapshots,
+by `shape` from a response model, or as constructed models.
+"""
+
+import enum
+from functools import cache
+from types import NoneType, UnionType
+from typing import Union, get_args, get_origin
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+
+
+# NOTE: Field types `shape` casts values to, as response validation did
+_SCALARS = (str, int, float)
+
+
+def _scalar(target):
+    return lambda value: value if isinstance(value, target) else target(value)
+
+
+def _cast(annotation):
+    """Cast of a stored value to the field type, None if kept as is"""
+
+    if get_origin(annotation) in (Union, UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not NoneType]
+        if len(args) != 1:
+            return None
+        annotation = args[0]
+
+    if annotation in _SCALARS:
+        return _scalar(annotation)
+    if get_origin(annotation) is list:
+        (item,) = get_args(annotation) or (None,)
+        if item in _SCALARS:
+            cast = _scalar(item)
+            return lambda values: [cast(value) for value in values]
+    return None
+
+
+@cache
+def _fields(model: type[BaseModel]) -> tuple:
+    return tuple(
+        (name, field.default, field.default_factory, _cast(field.annotation))
+        for name, field in model.model_fields.items()
+    )
+
+
+def shape(model: type[BaseModel], data: dict) -> dict:
+    """Dict with the fields of the model, missing ones set to defaults
+
+    Values of `str`, `int`, `float` fields (and lists of them) are cast to
+    the field type, nothing else is validated: use for stored data. Other
+    keys are kept if the model allows extra fields.
+    """
+
+    result = {}
+    # NOTE: As validation does, models allowing extra fields keep the rest
+    if model.model_config.get("extra") == "allow":
+        result = dict(data)
+    for name, default, factory, cast in _fields(model):
+        if name in data:
+            value = data[name]
+            if cast is not None and value is not None:
+                value = cast(value)
+            result[name] = value
+        elif factory is not None:
+            result[name] = factory()
+        elif default is not PydanticUndefined:
+            result[name] = default
+    return result
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    """JSON bytes of the response content"""
+    return orjson.dumps(
+        content,
+        default=_default,
+        option=orjson.OPT_NON_STR_KEYS,
+    )
+
+
+def fast_response(content, status_code: int = 200) -> Response:
+    """orjson-encoded response without `response_model` re-validation"""
+    return Response(
+        dumps(content),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+__all__ = (
+    "shape",
+    "dumps",
+    "fast_response",
+)
@@ -0,0 +1,56 @@
+"""
+Text normalization for search indexes
+"""
+
+import re
+
+from libdev.lang import get_pure
+
+
+# NOTE: Shorter prefixes match too much to be useful for typeahead
+MIN_PREFIX = 2
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(value) -> list[str]:
+    """Lowercase words of a value (HTML is stripped)"""
+
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, set)):
+        return [token for item in value for token in tokenize(item)]
+    if isinstance(value, dict):
+        return tokenize(list(value.values()))
+    if not isinstance(value, str):
+        value = str(value)
+    if "<" in value:
+        value = get_pure(value)
+    return _WORD.findall(value.lower())
+
+
+def terms(values) -> list[str]:
+    """Unique words for the prefix index"""
+    return sorted({token for value in values for token in tokenize(value)})
+
+
+def prefix_conditions(query) -> list[dict] | None:
+    """Conditions on `terms`: all words of the query, the last one as a prefix"""
+
+    tokens = tokenize(query)
+    if not tokens or len(tokens[-1]) < MIN_PREFIX:
+        return None
+
+    *words, prefix = tokens
+    conditions = [{"terms": word} for word in words]
+    # NOTE: Anchored case-sensitive regex is a range scan on the index
+    conditions.append({"terms": {"$regex": f"^{re.escape(prefix)}"}})
+    return conditions
+
+
+__all__ = (
+    "MIN_PREFIX",
+    "tokenize",
+    "terms",
+    "prefix_conditions",
+)
@@ -1,8 +1,46 @@
+"""
+Socket.IO server
+
+Emits go through Redis pub/sub and reach clients connected to any API
+process / replica (and can be sent from workers).
+"""
+
+from urllib.parse import quote
+
 import socketio
+from libdev.cfg import cfg
+
+from lib.queue import redis
+
 
+# NOTE: Polling needs every request of a session on the same process;
+# `websocket` only is safe behind a load balancer without sticky sessions
+TRANSPORTS = (cfg("sockets.transports") or "polling,websocket").split(",")
 
-sio = socketio.AsyncServer(async_mode="asgi", cors_allowed_origins="*")
-asgi = socketio.ASGIApp(sio)
+
+def _redis_url():
+    """URL of the Redis server and DB of `lib.queue`"""
+
+    params = redis.connection_pool.connection_kwargs
+    password = params.get("password")
+    auth = f":{quote(password, safe='')}@" if password else ""
+    return (
+        f"redis://{auth}{params.get('host') or 'localhost'}"
+        f":{params.get('port') or 6379}/{params.get('db') or 0}"
+    )
+
+
+sio = socketio.AsyncServer(
+    async_mode="asgi",
+    cors_allowed_origins="*",
+    client_manager=socketio.AsyncRedisManager(
+        _redis_url(),
+        channel=f"{cfg('PROJECT_NAME') or 'app'}:socketio",
+    ),
+    transports=TRANSPORTS,
+)
+# NOTE: Mounted at `/ws`, Starlette passes the full path to mounted apps
+asgi = socketio.ASGIApp(sio, socketio_path="/ws/socket.io")
 
 
 __all__ = (
@@ -0,0 +1,80 @@
+"""
+Redis pub/sub subscription of a process
+
+Used by process-local caches: they are trusted only while the subscription
+delivering their invalidations is up.
+"""
+
+import asyncio
+import time
+
+from libdev.log import log
+
+from lib.queue import redis
+
+
+# NOTE: Delay before subscribing again after losing Redis
+RESUBSCRIBE_DELAY = 1
+
+
+class Subscriber:
+    """Background listener of a channel
+
+    `on_start` runs after subscribing and before messages are handled, so
+    state loaded by it misses no message.
+    """
+
+    def __init__(self, channel, handle, on_start=None):
+        self.channel = channel
+        self.handle = handle
+        self.on_start = on_start
+        self.listener: asyncio.Task | None = None
+        self.ready = False
+        self.started_at = 0.0
+
+    async def _listen(self):
+        pubsub = None
+        try:
+            pubsub = redis.pubsub()
+            await pubsub.subscribe(self.channel)
+            if self.on_start is not None:
+                await self.on_start()
+            self.ready = True
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    self.handle(message["data"])
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Subscription to {} lost: {}", self.channel, e)
+        finally:
+            self.ready = False
+            try:
+                if pubsub is not None:
+                    await pubsub.aclose()
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    def active(self) -> bool:
+        """Whether messages are received, (re)subscribes if needed"""
+
+        if self.listener is None or self.listener.done():
+            if time.monotonic() - self.started_at < RESUBSCRIBE_DELAY:
+                return False
+            try:
+                self.listener = asyncio.get_running_loop().create_task(self._listen())
+            except RuntimeError:
+                return False
+            self.started_at = time.monotonic()
+        return self.ready
+
+    async def publish(self, message) -> bool:
+        """Send a message to all processes, False if Redis is unavailable"""
+
+        try:
+            await redis.publish(self.channel, message)
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Publish to {} failed: {}", self.channel, e)
+            return False
+        return True
+
+
+__all__ = ("Subscriber",)
@@ -0,0 +1,85 @@
+"""
+Bounded in-memory queue of a process handled by a background task
+
+Used where the request path must not wait for the work: when the queue is
+full the oldest items are dropped.
+"""
+
+import asyncio
+from collections import deque
+
+
+class Worker:
+    """Background task flushing a bounded queue
+
+    `push` may be called from the event loop or from DB threads. `flush`
+    runs once `wake` items are queued, and every `interval` seconds if set.
+    """
+
+    def __init__(self, size, wake=1, interval=None):
+        self.queue: deque = deque(maxlen=size)
+        self.wake = wake
+        self.interval = interval
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.wakeup: asyncio.Event | None = None
+        self.task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        """Whether items are accepted"""
+        return self.task is not None and not self.task.done()
+
+    def dropped(self, count):
+        """Items pushed out of the full queue"""
+
+    def push(self, item) -> bool:
+        """Queue an item, False if the worker is not running"""
+
+        if not self.running:
+            return False
+
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped(1)
+        self.queue.append(item)
+
+        if len(self.queue) >= self.wake and not self.wakeup.is_set():
+            self.loop.call_soon_threadsafe(self.wakeup.set)
+        return True
+
+    async def flush(self):
+        """Handle queued items"""
+        raise NotImplementedError
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    def start(self):
+        """Accept items and flush them in the background"""
+
+        if self.running:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.wakeup = asyncio.Event()
+        self.task = self.loop.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting items and flush the rest"""
+
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        await self.flush()
+
+
+__all__ = ("Worker",)
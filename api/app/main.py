@@ -7,21 +7,15 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from prometheus_fastapi_instrumentator import Instrumentator
-from starlette.middleware.errors import ServerErrorMiddleware
-from slowapi import Limiter, _rate_limit_exceeded_handler
-from slowapi.errors import RateLimitExceeded
-from slowapi.middleware import SlowAPIMiddleware
 from consys.errors import BaseError
 from libdev.img import convert
 from libdev.s3 import upload
 
 from lib import cfg, log, report
 from lib.sockets import asgi
-from services.parameters import ParametersMiddleware
-from services.monitoring import MonitoringMiddleware
-from services.errors import ErrorsMiddleware
-from services.access import AccessMiddleware
-from services.limiter import get_uniq
+from services.middleware import RequestMiddleware
+from services.limiter import Limiter, get_uniq
+from services import errors, presence, tracking
 from services.on_startup import on_startup
 from services.sentry import flush_sentry
 from routes import router
@@ -61,7 +55,10 @@ async def startup():
 
 @app.on_event("shutdown")
 async def shutdown():
-    """Flush Sentry events on shutdown."""
+    """Stop presence heartbeats and background writers, flush Sentry on shutdown."""
+    await presence.stop()
+    await tracking.writer.stop()
+    await errors.reporter.stop()
     flush_sentry()
 
 
@@ -104,16 +101,21 @@ async def uncaught_exception_handler(request: Request, exc: Exception):
 
 
 # Limiter
-# NOTE: 6th middleware
 limits = ["25/second", "100/minute", "2500/hour", "10000/day"]
-app.state.limiter = Limiter(key_func=get_uniq, default_limits=limits)
-app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
-app.add_middleware(SlowAPIMiddleware)
+app.state.limiter = Limiter(
+    key_func=get_uniq,
+    default_limits=limits,
+    # NOTE: Counted in addition to the default limits
+    route_limits={
+        "/users/token/": ["5/second", "30/minute", "300/hour"],
+        "/upload/": ["2/second", "20/minute", "200/hour", "1000/day"],
+    },
+)
 
-# JWT
-# NOTE: 5th middleware
+# Parameters, monitoring, errors, JWT and limits
+# NOTE: 2nd middleware
 app.add_middleware(
-    AccessMiddleware,
+    RequestMiddleware,
     jwt_secret=cfg("jwt"),
     whitelist={
         "/",
@@ -123,19 +125,6 @@ app.add_middleware(
     },
 )
 
-# Errors
-# NOTE: 4th middleware
-app.add_middleware(ErrorsMiddleware)
-app.add_middleware(ServerErrorMiddleware, handler=None)  # FIXME
-
-# Monitoring
-# NOTE: 3rd middleware
-app.add_middleware(MonitoringMiddleware)
-
-# Parameters
-# NOTE: 2nd middleware
-app.add_middleware(ParametersMiddleware)
-
 # CORS
 # NOTE: 1st middleware
 app.add_middleware(
@@ -1,8 +1,22 @@
+import asyncio
+import contextvars
 import hashlib
+import importlib
+import pkgutil
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial, wraps
 
+import bson
+from bson.errors import InvalidDocument
 from consys import make_base, Attribute
+from consys.errors import ErrorInvalid, ErrorWrong
+from pymongo.errors import BulkWriteError
 
-from lib import cfg
+from lib import cfg, log, counts, identity
+from lib.search import prefix_conditions, terms
 
 
 _ConSysBase = make_base(
@@ -12,12 +26,609 @@ _ConSysBase = make_base(
     password=cfg("mongo.pass"),
 )
 
+# NOTE: pymongo is thread-safe, so sync consys calls are offloaded to a bounded pool
+DB_WORKERS = int(cfg("mongo.workers") or 16)
+# NOTE: log sync DB calls made from the event loop thread (`MONGO_BLOCKING=1`)
+DB_BLOCKING_DETECT = bool(cfg("mongo.blocking"))
+
+# NOTE: Prefix index of searchable models (`_searchable`)
+SEARCH_INDEX = "search_index"
+
+# NOTE: Bulk inserts retried when ids are taken by concurrent inserts
+INSERT_ATTEMPTS = 3
+DUPLICATE_KEY = 11000
+
+_executor: ThreadPoolExecutor | None = None
+_owner_loop: contextvars.ContextVar[asyncio.AbstractEventLoop | None] = (
+    contextvars.ContextVar("owner_loop", default=None)
+)
+_sync_depth = threading.local()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor  # pylint: disable=global-statement
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=DB_WORKERS,
+            thread_name_prefix="db",
+        )
+    return _executor
+
+
+def owner_loop() -> asyncio.AbstractEventLoop | None:
+    """Event loop that offloaded the current DB call (None outside `run_sync`)."""
+    return _owner_loop.get()
+
+
+async def run_sync(func, *args, **kwargs):
+    """Run a sync DB call in the bounded executor without blocking the loop."""
+
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    context.run(_owner_loop.set, loop)
+    return await loop.run_in_executor(
+        _get_executor(),
+        partial(context.run, func, *args, **kwargs),
+    )
+
+
+# NOTE: Strong references, the loop keeps only weak ones to running tasks
+_tasks: set[asyncio.Task] = set()
+
+
+def _done(task: asyncio.Task) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.error("Background task failed: {}", str(task.exception()))
+
+
+def _create_task(loop, factory) -> None:
+    task = loop.create_task(factory())
+    _tasks.add(task)
+    task.add_done_callback(_done)
+
+
+def _spawn(factory) -> None:
+    """Schedule a coroutine from sync code, in the loop or in a DB thread"""
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = owner_loop()
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(_create_task, loop, factory)
+        return
+
+    _create_task(loop, factory)
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _detect_blocking(method):
+    """Log sync DB calls issued directly from the event loop thread."""
+
+    @wraps(method)
+    def inner(*args, **kwargs):
+        if not DB_BLOCKING_DETECT:
+            return method(*args, **kwargs)
+
+        depth = getattr(_sync_depth, "value", 0)
+        if not depth and _in_event_loop():
+            owner = args[0] if args else None
+            model = getattr(owner, "_name", None)
+            caller = traceback.extract_stack(limit=2)[0]
+            log.warning(
+                "Sync DB call in event loop: {}",
+                {
+                    "model": model,
+                    "method": method.__name__,
+                    "caller": f"{caller.filename}:{caller.lineno}",
+                },
+            )
+
+        _sync_depth.value = depth + 1
+        try:
+            return method(*args, **kwargs)
+        finally:
+            _sync_depth.value = depth
+
+    return inner
+
+
+def _cacheable(ids, args, kwargs) -> bool:
+    """Plain lookup by ids, which can be served by the identity map"""
+    return (
+        identity.active()
+        and bool(ids)
+        and not args
+        and all(value is None for key, value in kwargs.items() if key != "ids")
+    )
+
+
+def _first_invalid(docs, error: InvalidDocument) -> int:
+    """Index of the first document that can not be encoded"""
+
+    for i, doc in enumerate(docs):
+        try:
+            bson.encode(doc)
+        except InvalidDocument:
+            return i
+    raise error
+
+
+def _keyset_condition(sortby, key, sort):
+    """Items after `key` in the `sortby` order"""
+
+    operator = "$lt" if sort == "desc" else "$gt"
+    branches = []
+    for i, field in enumerate(sortby):
+        branch = dict(zip(sortby[:i], key[:i]))
+        branch[field] = {operator: key[i]}
+        branches.append(branch)
+    return {"$or": branches}
+
 
 class Base(_ConSysBase):
     """
     Project-wide base model with event dispatch on `.save()`.
+
+    Async handlers should use `aget` / `acomplex` / `acount` / `asave` / `arm`,
+    which run the same consys calls in a bounded executor.
+
+    Inside `identity_scope()` (every HTTP request) plain lookups by id return
+    the same instance, and `load` / `load_many` coalesce lookups issued in the
+    same tick into one `$in` query.
+
+    Compound indexes are declared in `_indexes` and created on startup.
+
+    Models with `_searchable` get a text index over `_search_fields` for
+    ranked `text_search` and are kept in the prefix index for `suggest`.
     """
 
+    _indexes: tuple = ()
+    # NOTE: Lifetime of counts with `strategy="cached"`, seconds
+    _count_ttl: int = 30
+    # NOTE: Append-heavy collections rely on TTL instead of resetting on save
+    _count_invalidate: bool = True
+    _searchable: bool = False
+
+    @classmethod
+    @_detect_blocking
+    def get(cls, *args, **kwargs):
+        ids = args[0] if args else kwargs.get("ids")
+        if not _cacheable(ids, args[1:], kwargs):
+            return super().get(*args, **kwargs)
+
+        if isinstance(ids, (list, tuple, set)):
+            instances = [
+                identity.remember(instance)
+                for instance in super().get(*args, **kwargs)
+            ]
+            for id_ in set(ids) - {instance.id for instance in instances}:
+                identity.forget(cls._name, id_, missing=True)
+            return instances
+
+        cached = identity.lookup(cls._name, ids)
+        if cached is identity.MISSING:
+            raise ErrorWrong("id")
+        if cached is not None:
+            return cached
+
+        try:
+            instance = super().get(*args, **kwargs)
+        except ErrorWrong:
+            identity.forget(cls._name, ids, missing=True)
+            raise
+
+        return identity.remember(instance)
+
+    @classmethod
+    def get_many(cls, ids) -> dict:
+        """Get instances by ids as `{id: instance}`, missing ids are skipped"""
+
+        ids = list(dict.fromkeys(ids))
+        rest = [id_ for id_ in ids if identity.lookup(cls._name, id_) is None]
+        if rest:
+            cls.get(ids=rest)
+
+        result = {}
+        for id_ in ids:
+            instance = identity.lookup(cls._name, id_)
+            if instance is not None and instance is not identity.MISSING:
+                result[id_] = instance
+        return result
+
+    @classmethod
+    async def load(cls, id_):
+        """Get instance by id, batched with other `load` calls of this tick"""
+
+        cached = identity.lookup(cls._name, id_)
+        if cached is identity.MISSING:
+            raise ErrorWrong("id")
+        if cached is not None:
+            return cached
+
+        return await identity.loader(cls).load(id_)
+
+    @classmethod
+    async def load_many(cls, ids) -> dict:
+        """Async `get_many` with one round trip for all unknown ids"""
+
+        ids = list(dict.fromkeys(ids))
+        instances = await asyncio.gather(
+            *(cls.load(id_) for id_ in ids),
+            return_exceptions=True,
+        )
+
+        result = {}
+        for id_, instance in zip(ids, instances):
+            if isinstance(instance, ErrorWrong):
+                continue
+            if isinstance(instance, BaseException):
+                raise instance
+            result[id_] = instance
+        return result
+
+    @classmethod
+    @_detect_blocking
+    def page(
+        cls,
+        limit: int,
+        after: list | None = None,
+        offset: int = 0,
+        sortby: tuple = ("updated", "id"),
+        sort: str = "desc",
+        fields: set | None = None,
+        handler=None,
+        extra: dict | None = None,
+        search: str | None = None,
+        **kwargs,
+    ):
+        """Page ordered by several fields with keyset pagination
+
+        `after` is the sort key of the last item of the previous page.
+        Returns the items (passed through `handler` like in `complex`) and the
+        sort key of the last item, or None if there are no more items.
+        """
+
+        db_condition = cls._condition(extra=extra, search=search, **kwargs)
+        if after is not None:
+            if len(after) != len(sortby):
+                raise ErrorInvalid("cursor")
+            keyset = _keyset_condition(sortby, after, sort)
+            db_condition = {"$and": [db_condition, keyset]} if db_condition else keyset
+
+        db_filter = {"_id": False}
+        if fields is not None:
+            fields = set(fields) | {"id"}
+            for field in fields | set(sortby):
+                db_filter[field] = True
+
+        direction = -1 if sort == "desc" else 1
+        res = cls._db[cls._name].find(db_condition, db_filter)
+        res = res.sort([(field, direction) for field in sortby])
+        if offset:
+            res = res.skip(offset)
+        docs = list(res.limit(limit + 1))
+
+        key = None
+        if len(docs) > limit:
+            docs = docs[:limit]
+            key = [docs[-1].get(field) for field in sortby]
+
+        instances = [cls(arg_data=doc, arg_fields=fields or {}) for doc in docs]
+        if fields:
+            for instance in instances:
+                for field in set(instance.__dict__):
+                    if field not in fields and not field.startswith("_"):
+                        del instance.__dict__[field]
+
+        if handler is None:
+            return instances, key
+        return [handler(instance.json(fields=fields)) for instance in instances], key
+
+    @classmethod
+    @_detect_blocking
+    def complex(cls, *args, **kwargs):
+        return super().complex(*args, **kwargs)
+
+    @classmethod
+    @_detect_blocking
+    def count(cls, *args, **kwargs):
+        return super().count(*args, **kwargs)
+
+    @classmethod
+    def _condition(cls, extra=None, search=None, **kwargs) -> dict:
+        """DB condition built the same way as in `get` / `count`"""
+
+        condition = {key: value for key, value in kwargs.items() if value is not None}
+        if extra:
+            condition.update(extra)
+        if search:
+            search_query = cls._build_search_query(search)
+            if condition:
+                condition = {"$and": [condition, search_query]}
+            else:
+                condition = search_query
+        return condition
+
+    @classmethod
+    @_detect_blocking
+    def text_search(
+        cls,
+        query: str,
+        limit: int = 20,
+        offset: int = 0,
+        fields: set | None = None,
+        extra: dict | None = None,
+        **kwargs,
+    ) -> list[dict]:
+        """Documents matching the query, ranked by the text index score"""
+
+        condition = cls._condition(extra=extra, **kwargs)
+        condition["$text"] = {"$search": query}
+
+        db_filter = {"_id": False, "score": {"$meta": "textScore"}}
+        if fields is not None:
+            for field in set(fields) | {"id"}:
+                db_filter[field] = True
+
+        res = cls._db[cls._name].find(condition, db_filter)
+        res = res.sort([("score", {"$meta": "textScore"})])
+        if offset:
+            res = res.skip(offset)
+        return list(res.limit(limit))
+
+    @classmethod
+    @_detect_blocking
+    def suggest(cls, query: str, limit: int = 10, **kwargs) -> list[int]:
+        """Ids of documents with words starting with the query (typeahead)
+
+        The last word of the query is matched as a prefix, the others fully.
+        Conditions from `kwargs` are checked on the model collection.
+        """
+
+        conditions = prefix_conditions(query)
+        if not conditions:
+            return []
+
+        # NOTE: Extra candidates for the ones filtered out by conditions
+        candidates = [
+            doc["id"]
+            for doc in cls._db[SEARCH_INDEX]
+            .find(
+                {"model": cls._name, "$and": conditions},
+                {"_id": False, "id": True},
+            )
+            .limit(limit * 3)
+        ]
+        if not candidates:
+            return []
+
+        condition = cls._condition(**kwargs)
+        condition["id"] = {"$in": candidates}
+        allowed = {
+            doc["id"]
+            for doc in cls._db[cls._name].find(condition, {"_id": False, "id": True})
+        }
+        return [id_ for id_ in candidates if id_ in allowed][:limit]
+
+    @classmethod
+    def reindex_search(cls, ids=None):
+        """Rebuild prefix index entries of the model"""
+
+        condition = {} if ids is None else {"id": {"$in": list(ids)}}
+        db_filter = {"_id": False, "id": True}
+        for field in cls._search_fields:
+            db_filter[field] = True
+
+        count = 0
+        for doc in cls._db[cls._name].find(condition, db_filter):
+            cls._db[SEARCH_INDEX].update_one(
+                {"model": cls._name, "id": doc["id"]},
+                {
+                    "$set": {
+                        "terms": terms(
+                            doc.get(field) for field in sorted(cls._search_fields)
+                        ),
+                    },
+                },
+                upsert=True,
+            )
+            count += 1
+        return count
+
+    def _search_changed(self, changes):
+        if not self._searchable or not self.id:
+            return
+        if changes and not set(changes) & set(self._search_fields):
+            return
+        try:
+            self.reindex_search(ids=[self.id])
+        except Exception as e:  # pylint: disable=broad-except
+            log.error(
+                "Search index update failed: {}",
+                {"model": self._name, "id": self.id, "error": str(e)},
+            )
+
+    def _counts_changed(self):
+        if self._count_invalidate:
+            _spawn(lambda: counts.invalidate(self._name))
+
+    @_detect_blocking
+    def rm(self, *args, **kwargs):
+        super().rm(*args, **kwargs)
+        identity.forget(self._name, self.id, missing=True)
+        self._counts_changed()
+        if self._searchable:
+            self._db[SEARCH_INDEX].delete_one({"model": self._name, "id": self.id})
+
+    @classmethod
+    def rm_many(cls, ids) -> int:
+        """Delete instances by ids with one query"""
+
+        ids = list(ids)
+        if not ids:
+            return 0
+
+        deleted = cls._db[cls._name].delete_many({"id": {"$in": ids}}).deleted_count
+        for id_ in ids:
+            identity.forget(cls._name, id_, missing=True)
+        if cls._count_invalidate:
+            _spawn(lambda: counts.invalidate(cls._name))
+        if cls._searchable:
+            cls._db[SEARCH_INDEX].delete_many({"model": cls._name, "id": {"$in": ids}})
+        return deleted
+
+    @classmethod
+    def insert_many(cls, docs: list[dict]) -> tuple[int, int]:
+        """Insert prepared `document` dicts in order with bulk writes
+
+        Returns the numbers of inserted and skipped documents. Documents that
+        can not be stored are skipped, the ones after the last handled one are
+        left if ids keep colliding. Search index is not updated.
+        """
+
+        pos = inserted = skipped = attempts = 0
+        end = len(docs)
+        # NOTE: Ids may be taken by concurrent inserts, the rest is retried
+        while pos < len(docs) and attempts < INSERT_ATTEMPTS:
+            if pos >= end:
+                end = len(docs)
+            batch = docs[pos:end]
+            start = cls._next_id()
+            for i, doc in enumerate(batch):
+                doc["id"] = doc["_id"] = start + i
+
+            try:
+                cls._db[cls._name].insert_many(batch, ordered=True)
+            except InvalidDocument as e:
+                bad = pos + _first_invalid(batch, e)
+                if bad > pos:
+                    # NOTE: Valid documents before it are inserted first
+                    end = bad
+                    continue
+                log.error("Document skipped: {}", {"model": cls._name, "error": str(e)})
+                skipped += 1
+                pos += 1
+                continue
+            except BulkWriteError as e:
+                done = e.details.get("nInserted", 0)
+                inserted += done
+                pos += done
+                error = (e.details.get("writeErrors") or [{}])[0]
+                if error.get("code") == DUPLICATE_KEY:
+                    attempts += 1
+                    continue
+                log.error(
+                    "Document skipped: {}",
+                    {"model": cls._name, "error": error.get("errmsg")},
+                )
+                skipped += 1
+                pos += 1
+                continue
+
+            inserted += len(batch)
+            pos = end
+
+        if inserted and cls._count_invalidate:
+            _spawn(lambda: counts.invalidate(cls._name))
+        return inserted, skipped
+
+    def document(self) -> dict:
+        """Stored form of an unsaved instance for `insert_many`, without id"""
+
+        self.updated = time.time()
+        return self.json(default=False)
+
+    def reload(self, *args, **kwargs):
+        identity.forget(self._name, self.id)
+        super().reload(*args, **kwargs)
+        identity.forget(self._name, self.id)
+        if self._specified_fields is None:
+            identity.replace(self)
+
+    @classmethod
+    async def aget(cls, *args, **kwargs):
+        """Async `get`"""
+        return await run_sync(cls.get, *args, **kwargs)
+
+    @classmethod
+    async def acomplex(cls, *args, **kwargs):
+        """Async `complex`"""
+        return await run_sync(cls.complex, *args, **kwargs)
+
+    @classmethod
+    async def apage(cls, *args, **kwargs):
+        """Async `page`"""
+        return await run_sync(cls.page, *args, **kwargs)
+
+    @classmethod
+    async def atext_search(cls, *args, **kwargs):
+        """Async `text_search`"""
+        return await run_sync(cls.text_search, *args, **kwargs)
+
+    @classmethod
+    async def asuggest(cls, *args, **kwargs):
+        """Async `suggest`"""
+        return await run_sync(cls.suggest, *args, **kwargs)
+
+    @classmethod
+    async def acount(cls, *args, strategy: counts.CountMode = "exact", **kwargs):
+        """Async `count`
+
+        Strategies:
+        * `exact` — `count_documents`
+        * `cached` — exact count cached by the filter for `_count_ttl`
+          seconds and reset on save / rm
+        * `estimated` — collection metadata for unfiltered queries,
+          `cached` otherwise
+        """
+
+        if strategy == "exact" or args:
+            return await run_sync(cls.count, *args, **kwargs)
+
+        offset = kwargs.pop("offset", 0)
+        condition = cls._condition(**kwargs)
+
+        if strategy == "estimated" and not condition and not offset:
+            return await run_sync(cls._db[cls._name].estimated_document_count)
+
+        return await counts.cached(
+            cls._name,
+            [condition, offset],
+            cls._count_ttl,
+            lambda: run_sync(cls.count, offset=offset, **kwargs),
+        )
+
+    @classmethod
+    async def ahas_more(cls, offset: int, **kwargs) -> bool:
+        """Whether there are items after `offset`, without counting all of them"""
+
+        condition = cls._condition(**kwargs)
+        found = await run_sync(
+            cls._db[cls._name].count_documents,
+            condition,
+            skip=offset,
+            limit=1,
+        )
+        return found > 0
+
+    async def asave(self, *args, **kwargs):
+        """Async `save`"""
+        return await run_sync(self.save, *args, **kwargs)
+
+    async def arm(self, *args, **kwargs):
+        """Async `rm`"""
+        return await run_sync(self.rm, *args, **kwargs)
+
+    @_detect_blocking
     def save(self, *args, **kwargs):  # pylint: disable=arguments-differ
         changes = {}
         try:
@@ -25,15 +636,22 @@ class Base(_ConSysBase):
         except Exception:  # pylint: disable=broad-except
             changes = {}
 
-        result = super().save(*args, **kwargs)
+        super().save(*args, **kwargs)
+
+        if self._specified_fields is None:
+            identity.replace(self)
+        else:
+            identity.forget(self._name, self.id)
+        self._counts_changed()
+        self._search_changed(changes)
 
         try:
             model_name = getattr(self, "_name", None)
             if not isinstance(model_name, str) or not model_name:
-                return result
+                return
 
             if not changes:
-                return result
+                return
 
             from tasks.event_enqueue import enqueue
             from tasks.event_registry import has_handlers
@@ -77,17 +695,84 @@ class Base(_ConSysBase):
                     }
                 )
         except Exception as exc:  # pylint: disable=broad-except
-            from lib import log
-
             log.error(
                 "Event dispatch on save failed: {}",
-                {"model": getattr(self, "_name", None), "id": getattr(self, "id", None), "error": str(exc)},
+                {
+                    "model": getattr(self, "_name", None),
+                    "id": getattr(self, "id", None),
+                    "error": str(exc),
+                },
             )
 
-        return result
+
+@lru_cache(maxsize=1)
+def _model_map() -> dict:
+    """
+    Build a mapping from collection name (`_name`) -> model class.
+    """
+
+    mapping = {}
+    for module_info in pkgutil.iter_modules(__path__):
+        module = importlib.import_module(f"{__name__}.{module_info.name}")
+        for obj in module.__dict__.values():
+            if not isinstance(obj, type):
+                continue
+            if not issubclass(obj, Base):
+                continue
+            model_name = getattr(obj, "_name", None)
+            if isinstance(model_name, str) and model_name:
+                mapping[model_name] = obj
+
+    return mapping
+
+
+def get_model(name: str):
+    """Model class by collection name"""
+    return _model_map().get(name)
+
+
+def ensure_indexes():
+    """Create indexes declared in `_indexes` of the models"""
+
+    # pylint: disable=protected-access
+    indexes = [
+        (SEARCH_INDEX, [("model", 1), ("id", 1)], {"unique": True}),
+        (SEARCH_INDEX, [("model", 1), ("terms", 1)], {}),
+    ]
+    for model in _model_map().values():
+        for keys in model._indexes:
+            indexes.append((model._name, keys, {}))
+        if model._searchable:
+            # NOTE: One text index per collection; no stemming for mixed locales
+            fields = sorted(model._search_fields)
+            indexes.append(
+                (
+                    model._name,
+                    [(field, "text") for field in fields],
+                    {
+                        "name": "search",
+                        "default_language": "none",
+                        "weights": {"title": 10} if "title" in fields else None,
+                    },
+                )
+            )
+
+    for collection, keys, options in indexes:
+        options = {key: value for key, value in options.items() if value is not None}
+        try:
+            _ConSysBase._db[collection].create_index(keys, **options)
+        except Exception as e:  # pylint: disable=broad-except
+            log.error(
+                "Index creation failed: {}",
+                {"collection": collection, "keys": keys, "error": str(e)},
+            )
 
 
 __all__ = (
     "Base",
+    "get_model",
+    "ensure_indexes",
     "Attribute",
+    "run_sync",
+    "owner_loop",
 )
@@ -1,6 +1,8 @@
+from collections import defaultdict
+
 from libdev.lang import get_pure
 
-from lib.queue import get
+from lib.cache import categories as categories_cache
 from models import Base, Attribute
 
 
@@ -31,33 +33,43 @@ class Category(Base):
         if ids is None and parent is None:
             parent = 0
 
-        tree = []
-
+        # NOTE: One pass over the list, then each node is visited once
+        by_parent = defaultdict(list)
         for category in categories:
-            if ids and ids != category.id:
-                continue
             if category.parent is None:
                 category.parent = 0
-            if parent is not None and category.parent != parent:
-                continue
+            by_parent[category.parent].append(category)
 
+        def build(category, seen):
             data = category.json()
-            data["categories"] = cls.get_tree(categories, category.id)
-
-            tree.append(data)
-
-        return tree
+            seen.add(category.id)
+            data["categories"] = [
+                build(child, seen)
+                for child in by_parent.get(category.id, [])
+                if child.id not in seen  # NOTE: Guard against parent cycles
+            ]
+            return data
+
+        if parent is not None:
+            roots = by_parent.get(parent, [])
+        else:
+            roots = categories
+
+        return [
+            build(category, set())
+            for category in roots
+            if not ids or ids == category.id
+        ]
 
     @classmethod
     async def get_childs(cls, parent):
         """Get childs of category"""
-        childs_cache = await get("category_childs") or {}
+        childs_cache = await categories_cache.get("category_childs") or {}
 
         if not childs_cache:
             # Build a fallback map when cache is empty or unavailable
-            from services.cache import get_childs as build_childs, get_parents
+            from services.cache import get_index
 
-            categories_tree = cls.get_tree(cls.get())
-            childs_cache = build_childs(get_parents(categories_tree))
+            _, childs_cache = get_index(cls.get_tree(cls.get()))
 
         return childs_cache.get(parent, []) + [parent]
@@ -1,9 +1,14 @@
-from models import Base, Attribute
+import asyncio
+
+from consys.errors import ErrorInvalid
+
+from models import Base, Attribute, run_sync
 
 
 class Comment(Base):
     _name = "comments"
     _search_fields = {"data"}
+    _indexes = ([("post", 1), ("created", -1), ("id", -1)],)
 
     data = Attribute(types=str, default="")
     parent = Attribute(types=int, default=0)
@@ -11,3 +16,53 @@ class Comment(Base):
     post = Attribute(types=int)
     status = Attribute(types=int, default=1)
     token = Attribute(types=str)
+
+    @classmethod
+    def get_thread(cls, post, limit, after=None, fields=None):
+        """Latest comments of a post, continued after the `created, id` key
+
+        Returns `(comments, key)`, where `key` is the sort key of the last
+        comment when the post has more of them.
+        """
+
+        fields = set(fields or {"data"}) | {"id", "created"}
+        condition = {
+            "post": post,
+            "status": {"$exists": False},
+        }
+        if after is not None:
+            if len(after) != 2:
+                raise ErrorInvalid("cursor")
+            condition["$or"] = [
+                {"created": {"$lt": after[0]}},
+                {"created": after[0], "id": {"$lt": after[1]}},
+            ]
+
+        # NOTE: Read by the `post, created, id` index, at most `limit + 1`
+        comments = list(
+            cls._db[cls._name]
+            .find(condition, {"_id": False, **{field: True for field in fields}})
+            .sort([("created", -1), ("id", -1)])
+            .limit(limit + 1)
+        )
+
+        key = None
+        if len(comments) > limit:
+            comments = comments[:limit]
+            key = [comments[-1]["created"], comments[-1]["id"]]
+        return comments, key
+
+    @classmethod
+    async def aget_threads(cls, posts, limit, after=None, fields=None):
+        """Latest comments of several posts as `{post: (comments, key)}`
+
+        One limited query per post, run concurrently.
+        """
+
+        threads = await asyncio.gather(
+            *(
+                run_sync(cls.get_thread, post, limit, after=after, fields=fields)
+                for post in posts
+            )
+        )
+        return dict(zip(posts, threads))
@@ -4,6 +4,7 @@ from models import Base, Attribute
 class Feedback(Base):
     _name = "feedback"
     _search_fields = {"title", "data", "type", "source"}
+    _searchable = True
 
     token = Attribute(types=str)
     network = Attribute(types=int, default=0)
@@ -11,5 +12,5 @@ class Feedback(Base):
 
     type = Attribute(types=str, default="question")
     source = Attribute(types=str)
-    files = Attribute(types=list, default=list)
+    files = Attribute(types=list, default=[])
 
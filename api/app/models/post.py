@@ -33,6 +33,11 @@ def default_url(instance):
 class Post(Base):
     _name = "posts"
     _search_fields = {"title", "data", "tags"}
+    _searchable = True
+    _indexes = (
+        [("updated", -1), ("id", -1)],
+        [("category", 1), ("updated", -1), ("id", -1)],
+    )
 
     title = Attribute(types=str, default=default_title)
     description = Attribute(types=str, default=default_description)
@@ -43,3 +48,5 @@ class Post(Base):
     url = Attribute(types=str, default=default_url)
     status = Attribute(types=int, default=1)
     token = Attribute(types=str)
+    # NOTE: Written by `flush_views`, live value is in `services.views`
+    views = Attribute(types=int)
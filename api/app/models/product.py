@@ -3,6 +3,63 @@ from libdev.lang import to_url
 from models import Base, Attribute
 
 
+BACKFILL_BATCH = 100
+
+
+def calculate_final_price(
+    price: float,
+    discount_type: str | None,
+    discount_value: float | None,
+) -> float:
+    """Calculate final price applying either percentage or fixed discount."""
+
+    try:
+        base_price = float(price or 0)
+    except (TypeError, ValueError):
+        base_price = 0.0
+
+    try:
+        value = float(discount_value or 0)
+    except (TypeError, ValueError):
+        value = 0.0
+
+    if not discount_type or value <= 0:
+        return base_price
+
+    if discount_type == "percent":
+        return max(base_price - base_price * value / 100, 0)
+
+    if discount_type == "fixed":
+        return max(base_price - value, 0)
+
+    return base_price
+
+
+def get_final_price_from(product: dict) -> float:
+    """Lowest final price among product options (or of the product itself)"""
+
+    options = product.get("options")
+    if not isinstance(options, list) or not options:
+        options = [product]
+
+    prices = []
+    for option in options:
+        if not isinstance(option, dict):
+            continue
+        discount_type = option.get("discount_type") or option.get("discountType")
+        if discount_type not in {"percent", "fixed"}:
+            discount_type = None
+        prices.append(
+            calculate_final_price(
+                option.get("price"),
+                discount_type,
+                option.get("discount_value") or option.get("discountValue"),
+            )
+        )
+
+    return min(prices, default=0.0)
+
+
 def default_url(instance):
     """Generate default URL slug based on title and id"""
     url = to_url(instance.title) or ""
@@ -14,6 +71,12 @@ def default_url(instance):
 class Product(Base):
     _name = "products"
     _search_fields = {"title", "description", "category"}
+    _searchable = True
+    _indexes = (
+        [("category", 1), ("final_price_from", 1)],
+        [("final_price_from", 1)],
+        [("is_featured", 1), ("id", -1)],
+    )
 
     title = Attribute(types=str)
     description = Attribute(types=str, default="")
@@ -33,3 +96,67 @@ class Product(Base):
     url = Attribute(types=str, default=default_url)
     status = Attribute(types=int, default=1)
     token = Attribute(types=str)
+    # NOTE: Denormalized on save for filtering and sorting by price
+    final_price_from = Attribute(types=float)
+    # NOTE: Serialized API response, written by the save route
+    snapshot = Attribute(types=dict)
+    snapshot_version = Attribute(types=int)
+
+    def save(self, *args, **kwargs):
+        # NOTE: A snapshot not rebuilt along with other changes is stale
+        changes = self.get_changes() if self._loaded_values is not None else None
+        if changes and not {"snapshot", "snapshot_version"} & set(changes):
+            self.snapshot_version = 0
+        # NOTE: Partially loaded instances keep the stored value
+        if self._specified_fields is None or {"options", "price"} <= set(
+            self._specified_fields
+        ):
+            self.final_price_from = get_final_price_from(
+                {
+                    "options": self.options,
+                    "price": self.price,
+                    "discount_type": self.discount_type,
+                    "discount_value": self.discount_value,
+                }
+            )
+        return super().save(*args, **kwargs)
+
+    @classmethod
+    def backfill_final_price(cls) -> int:
+        """Store `final_price_from` for products saved before it existed"""
+
+        coll = cls._db[cls._name]
+        count = 0
+        fields = {"id", "options", "price", "discount_type", "discount_value"}
+        for doc in coll.find(
+            {"final_price_from": {"$exists": False}},
+            {"_id": False, **{field: True for field in fields}},
+        ):
+            coll.update_one(
+                {"id": doc["id"]},
+                {"$set": {"final_price_from": get_final_price_from(doc)}},
+            )
+            count += 1
+        return count
+
+    @classmethod
+    def backfill_snapshots(cls, build, version: int) -> int:
+        """Store `build(product)` snapshots of another version or missing ones"""
+
+        coll = cls._db[cls._name]
+        ids = [
+            doc["id"]
+            for doc in coll.find({"snapshot_version": {"$ne": version}}, {"id": True})
+        ]
+
+        count = 0
+        # NOTE: Built from instances, default values are not stored
+        for start in range(0, len(ids), BACKFILL_BATCH):
+            for product in cls.get(ids=ids[start : start + BACKFILL_BATCH]):
+                # NOTE: Skipped if the product was saved in the meantime
+                res = coll.update_one(
+                    {"id": product.id, "updated": product.updated},
+                    {"$set": {"snapshot": build(product), "snapshot_version": version}},
+                )
+                count += res.modified_count
+        return count
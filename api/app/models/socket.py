@@ -3,6 +3,13 @@ from models import Base, Attribute
 
 class Socket(Base):
     _name = "sockets"
+    _indexes = (
+        [("token", 1)],
+        [("user", 1)],
+        [("node", 1)],
+    )
 
     id = Attribute(types=str)
     token = Attribute(types=str)
+    # NOTE: API process the socket is connected to
+    node = Attribute(types=str)
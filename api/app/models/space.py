@@ -12,6 +12,7 @@ class Space(Base):
         "region",
         "city",
     }
+    _searchable = True
 
     title = Attribute(types=str)
     link = Attribute(types=str)
@@ -27,7 +28,7 @@ class Space(Base):
     country = Attribute(types=str)
     region = Attribute(types=str)
     city = Attribute(types=str)
-    users = Attribute(types=list, default=list)
+    users = Attribute(types=list, default=[])
     user = Attribute(types=int)
     token = Attribute(types=str)
     status = Attribute(types=int, default=1)
@@ -3,6 +3,7 @@ from typing import Any, Dict
 
 from fastapi import Request
 
+from lib import log
 from models import Base, Attribute
 
 class TrackObject(str, Enum):
@@ -30,6 +31,17 @@ class TrackAction(str, Enum):
 
 class Track(Base):
     _name = "tracking"
+    _count_ttl = 60
+    _count_invalidate = False
+    # NOTE: Activity feed filters, sorted by `created`
+    _indexes = (
+        [("created", -1)],
+        [("user", 1), ("created", -1)],
+        [("token", 1), ("created", -1)],
+        [("ip", 1), ("created", -1)],
+        [("object", 1), ("action", 1), ("created", -1)],
+        [("action", 1), ("created", -1)],
+    )
 
     object = Attribute(types=str)
     action = Attribute(types=str)
@@ -56,11 +68,64 @@ class Track(Base):
         Persist a unified tracking entry with normalized params and context.
         """
 
+        payload = cls._entry(
+            object=object,
+            action=action,
+            user=user,
+            token=token,
+            params=params,
+            request=request,
+            context=context,
+            **extra_fields,
+        )
+
+        from services.tracking import writer  # lazy import to avoid cycles
+
+        # NOTE: Saved right away in processes without a running writer
+        if not writer.push(payload.document()):
+            payload.save()
+        return payload
+
+    @classmethod
+    def log_many(cls, entries: list[Dict[str, Any]]) -> int:
+        """
+        Persist tracking entries (`log` keyword arguments) with bulk inserts.
+        Entries that are not stored are logged and counted as dropped.
+        """
+
+        docs = [cls._entry(**entry).document() for entry in entries]
+        inserted, skipped = cls.insert_many(docs)
+
+        left = len(docs) - inserted - skipped
+        if left:
+            log.error(
+                "Tracking entries not saved, ids keep colliding: {}",
+                {"inserted": inserted, "left": left},
+            )
+        if skipped or left:
+            # lazy import to avoid cycles
+            from services.tracking import metric_tracking_dropped
 
+            metric_tracking_dropped.inc(skipped + left)
+        return inserted
+
+    @classmethod
+    def _entry(
+        cls,
+        *,
+        object: TrackObject,
+        action: TrackAction,
+        user: int | None,
+        token: str | None,
+        params: Dict[str, Any] | None = None,
+        request: Request | None = None,
+        context: Dict[str, Any] | None = None,
+        **extra_fields,
+    ) -> "Track":
         payload_context = _build_context(request, context)
         ip = payload_context.get("ip")
 
-        payload = cls(
+        return cls(
             object=object.value,
             action=action.value,
             params=params or {},
@@ -71,8 +136,24 @@ class Track(Base):
             **({"ip": ip} if ip is not None else {}),
             **extra_fields,
         )
-        payload.save()
-        return payload
+
+
+class TrackRollup(Base):
+    """Daily totals of removed tracking entries"""
+
+    _name = "tracking_rollups"
+    _indexes = ([("day", -1), ("object", 1), ("action", 1)],)
+
+    # NOTE: Start of the day (UTC), unix timestamp
+    day = Attribute(types=int)
+    object = Attribute(types=str)
+    action = Attribute(types=str)
+    events = Attribute(types=int, default=0)
+    # NOTE: Distinct authorized users
+    users = Attribute(types=int, default=0)
+    # NOTE: Set on all rollups of the day once they are saved, entries of the
+    # day are removed only after that
+    complete = Attribute(types=bool, default=False)
 
 
 def _resolve_source(network: int | str | None) -> str:
@@ -5,6 +5,7 @@ from libdev.codes import get_flag
 from consys.errors import ErrorWrong
 
 from lib import cfg
+from lib.profiles import profiles as profile_cache
 from models import Base, Attribute
 
 ADMIN_TOKEN = cfg("userhub.token")
@@ -166,23 +167,15 @@ async def fetch_user_profiles(
     profiles: Dict[int, Dict[str, Any]] = {}
 
     try:
-        global_users = await complex_global_users(
-            id=user_ids,
-            fields=list(global_fields or {"id", "login", "name", "surname", "title"}),
+        profiles = await profile_cache.get_many(
+            user_ids,
+            set(global_fields or {"id", "login", "name", "surname", "title"}),
         )
-        if global_users:
-            for user in (
-                global_users if isinstance(global_users, list) else [global_users]
-            ):
-                if isinstance(user, dict) and user.get("id") is not None:
-                    profiles[user["id"]] = {
-                        key: value for key, value in user.items() if value is not None
-                    }
     except Exception:  # pylint: disable=broad-except
         profiles = {}
 
     try:
-        local_users = UserLocal.complex(
+        local_users = await UserLocal.acomplex(
             ids=user_ids, fields=set(local_fields or {"id", "login", "name", "surname"})
         )
         if local_users:
@@ -8,6 +8,8 @@ from fastapi import APIRouter, Body, Request
 from pydantic import BaseModel, Field
 from consys.errors import ErrorAccess
 
+from lib.counts import CountMode
+from lib.responses import fast_response
 from models.track import Track, TrackAction, TrackObject
 from models.user import fetch_user_profiles
 
@@ -31,6 +33,10 @@ class AdminActivityRequest(BaseModel):
     )
     limit: int = Field(20, ge=1, le=100, description="Items per page")
     offset: int = Field(0, ge=0, description="Pagination offset")
+    count_mode: CountMode = Field(
+        "estimated",
+        description="Count strategy, `more` skips counting",
+    )
 
 
 class AdminActivityItem(BaseModel):
@@ -48,7 +54,8 @@ class AdminActivityItem(BaseModel):
 
 class AdminActivityResponse(BaseModel):
     items: list[AdminActivityItem]
-    count: int
+    count: int | None = None
+    more: bool | None = None
 
 
 def _safe_enum(value: str | None, enum_cls, default):
@@ -141,7 +148,7 @@ async def handler(
         "title",
     }
 
-    items: Iterable[Dict[str, Any]] | Dict[str, Any] | None = Track.complex(
+    items: Iterable[Dict[str, Any]] | Dict[str, Any] | None = await Track.acomplex(
         limit=data.limit,
         offset=data.offset,
         fields=fields,
@@ -161,7 +168,22 @@ async def handler(
     user_ids = {item.get("user") for item in items_list if item.get("user")}
     user_map = await fetch_user_profiles(user_ids, local_fields={"id", "login", "name", "surname"})
 
-    return {
-        "items": [_serialize_item(item, user_map) for item in items_list],
-        "count": Track.count(extra=extra, **filters),
-    }
+    count = None
+    more = None
+    if data.count_mode == "more":
+        more = await Track.ahas_more(
+            offset=data.offset + len(items_list),
+            extra=extra,
+            **filters,
+        )
+    else:
+        count = await Track.acount(strategy=data.count_mode, extra=extra, **filters)
+
+    # NOTE: `_serialize_item` builds items in the `AdminActivityItem` shape
+    return fast_response(
+        {
+            "items": [_serialize_item(item, user_map) for item in items_list],
+            "count": count,
+            "more": more,
+        }
+    )
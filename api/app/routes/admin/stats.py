@@ -48,7 +48,7 @@ async def _get_users_count() -> int:
     #     return 0
 
     try:
-        return UserLocal.count()
+        return await UserLocal.acount()
     except Exception as exc:  # pylint: disable=broad-except
         await report.warning("User count fallback (local)", error=exc)
         return 0
@@ -67,13 +67,13 @@ async def handler(
     _ = data.includeDrafts  # Reserved for future filtering
 
     try:
-        posts_count = Post.count()
+        posts_count = await Post.acount()
     except Exception as exc:  # pylint: disable=broad-except
         await report.warning("Posts count failed", error=exc)
         posts_count = 0
 
     try:
-        products_count = Product.count()
+        products_count = await Product.acount()
     except Exception as exc:  # pylint: disable=broad-except
         await report.warning("Products count failed", error=exc)
         products_count = 0
@@ -7,7 +7,7 @@ from pydantic import BaseModel
 from consys.errors import ErrorAccess, ErrorWrong
 
 from models.category import Category
-from lib.queue import get
+from lib.cache import categories as categories_cache
 
 
 router = APIRouter()
@@ -49,7 +49,7 @@ async def handler(
 
     # Get by url
     if data.url:
-        category_urls = await get("category_urls") or {}
+        category_urls = await categories_cache.get("category_urls") or {}
         category = category_urls.get(data.url)
         if not category:
             raise ErrorWrong("url")
@@ -57,19 +57,21 @@ async def handler(
 
     # Get
     categories = Category.get_tree(
+        await Category.aget(
+            fields=fields,
+            locale=data.locale
+            and {
+                "$in": [None, data.locale],
+            },  # NOTE: None → all locales
+        ),
         ids=data.id,
-        fields=fields,
-        locale=data.locale
-        and {
-            "$in": [None, data.locale],
-        },  # NOTE: None → all locales
     )
 
     if data.id:
         categories = categories[0]
 
-        category_ids = await get("category_ids") or {}
-        category_parents = await get("category_parents") or {}
+        category_ids = await categories_cache.get("category_ids") or {}
+        category_parents = await categories_cache.get("category_parents") or {}
         categories["parents"] = [
             category_ids[parent].json(fields={"id", "url", "title"})
             for parent in category_parents.get(categories["id"], [])
@@ -31,29 +31,32 @@ async def handler(
         raise ErrorAccess("rm")
 
     # Get
-    category = Category.get(data.id)
+    category = await Category.aget(data.id)
 
     if request.state.status < 6 and category.user != request.state.user:
         raise ErrorAccess("rm")
 
     # Reset subcategories
-    for subcategory in Category.get(parent=category.id):
+    changed = []
+    for subcategory in await Category.aget(parent=category.id):
         del subcategory.parent
-        subcategory.save()
+        await subcategory.asave()
+        changed.append(subcategory.id)
 
     # Reset posts
-    for post in Post.get(category=category.id):
+    for post in await Post.aget(category=category.id):
         del post.category
-        post.save()
+        await post.asave()
 
     # Delete
     snapshot = category.json(
         fields={"id", "title", "url", "locale", "status", "parent", "image"}
     )
-    category.rm()
+    await category.arm()
 
     # Cache renewal
-    await cache_categories()
+    changed.append(category.id)
+    await cache_categories(changed=changed)
 
     # Track
     Track.log(
@@ -111,7 +111,7 @@ async def save_category(
     }
 
     if data.id:
-        category = Category.get(data.id)
+        category = await Category.aget(data.id)
 
         if (
             request.state.status < 6
@@ -164,17 +164,17 @@ async def save_category(
         category.url += "-x"
 
     if new:
-        url_exists = Category.count(url=category.url)
+        url_exists = await Category.acount(url=category.url)
     else:
-        url_exists = Category.count(id={"$ne": category.id}, url=category.url)
+        url_exists = await Category.acount(id={"$ne": category.id}, url=category.url)
 
     if not category.url or url_exists:
         category.url = str(category.created)[-6:] + "-" + (category.url or "x")
 
     changes = format_changes(category.get_changes())
-    category.save()
+    await category.asave()
 
-    await cache_categories()
+    await cache_categories(changed=[category.id])
 
     Track.log(
         object=TrackObject.CATEGORY,
@@ -8,6 +8,8 @@ from fastapi import APIRouter, Body, Request
 from pydantic import BaseModel, ConfigDict, Field
 from consys.errors import ErrorAccess
 
+from lib.counts import CountMode
+from lib.responses import fast_response, shape
 from models.feedback import Feedback
 from models.user import fetch_user_profiles
 
@@ -22,8 +24,15 @@ class FeedbackGetRequest(BaseModel):
     limit: int | None = Field(None, ge=1, le=100, description="Items per page")
     offset: int | None = Field(None, ge=0, description="Pagination offset")
     search: str | None = Field(None, description="Search query")
-    type: str | None = Field(None, description="Feedback type filter", examples=["question"])
-    source: str | None = Field(None, description="Feedback source filter", examples=["faq", "footer", "tg"])
+    type: str | None = Field(
+        None, description="Feedback type filter", examples=["question"]
+    )
+    source: str | None = Field(
+        None, description="Feedback source filter", examples=["faq", "footer", "tg"]
+    )
+    count_mode: CountMode = Field(
+        "cached", description="Count strategy, `more` skips counting"
+    )
 
 
 class FeedbackItem(BaseModel):
@@ -45,6 +54,7 @@ class FeedbackItem(BaseModel):
 class FeedbackGetResponse(BaseModel):
     feedback: list[FeedbackItem]
     count: int | None = None
+    more: bool | None = None
 
 
 @router.post("/get/", response_model=FeedbackGetResponse, tags=["feedback"])
@@ -73,7 +83,7 @@ async def handler(request: Request, data: FeedbackGetRequest = Body(...)):
     if data.source:
         filters["source"] = data.source
 
-    items: Iterable[Dict[str, Any]] | Dict[str, Any] | None = Feedback.complex(
+    items: Iterable[Dict[str, Any]] | Dict[str, Any] | None = await Feedback.acomplex(
         ids=data.id,
         limit=data.limit,
         offset=data.offset,
@@ -92,7 +102,9 @@ async def handler(request: Request, data: FeedbackGetRequest = Body(...)):
         items_list = list(items)
 
     user_ids = {item.get("user") for item in items_list if item.get("user")}
-    user_map = await fetch_user_profiles(user_ids, local_fields={"id", "login", "name", "surname"})
+    user_map = await fetch_user_profiles(
+        user_ids, local_fields={"id", "login", "name", "surname"}
+    )
 
     for item in items_list:
         user_id = item.get("user")
@@ -103,15 +115,29 @@ async def handler(request: Request, data: FeedbackGetRequest = Body(...)):
         if not isinstance(files, list):
             item["files"] = []
 
-    count: int | None
+    count: int | None = None
+    more: bool | None = None
     if isinstance(data.id, int):
         count = 1 if items_list else 0
     elif data.id:
         count = len(items_list)
+    elif data.count_mode == "more":
+        more = await Feedback.ahas_more(
+            offset=(data.offset or 0) + len(items_list),
+            search=data.search,
+            **filters,
+        )
     else:
-        count = Feedback.count(search=data.search, **filters)
-
-    return {
-        "feedback": items_list,
-        "count": count,
-    }
+        count = await Feedback.acount(
+            strategy=data.count_mode,
+            search=data.search,
+            **filters,
+        )
+
+    return fast_response(
+        {
+            "feedback": [shape(FeedbackItem, item) for item in items_list],
+            "count": count,
+            "more": more,
+        }
+    )
@@ -24,7 +24,7 @@ async def handler(request: Request, data: FeedbackRmRequest = Body(...)):
     if request.state.status < 6:
         raise ErrorAccess("rm")
 
-    feedback = Feedback.get(data.id)
+    feedback = await Feedback.aget(data.id)
     Track.log(
         object=TrackObject.FEEDBACK,
         action=TrackAction.REMOVE,
@@ -33,4 +33,4 @@ async def handler(request: Request, data: FeedbackRmRequest = Body(...)):
         request=request,
         params={"id": feedback.id},
     )
-    feedback.rm()
+    await feedback.arm()
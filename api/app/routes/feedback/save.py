@@ -66,7 +66,7 @@ async def handler(request: Request, data: FeedbackSaveRequest = Body(...)):
     feedback.user_status = _to_int(getattr(request.state, "status", 3), 3)
 
     feedback.title = (feedback.data or "")[:80]
-    feedback.save()
+    await feedback.asave()
 
     Track.log(
         object=TrackObject.FEEDBACK,
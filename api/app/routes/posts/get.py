@@ -5,7 +5,7 @@ The getting method of the post object of the API
 import re
 
 from fastapi import APIRouter, Body, Request
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from libdev.lang import get_pure
 from consys.errors import ErrorAccess
 
@@ -14,8 +14,10 @@ from models.post import Post
 from models.comment import Comment
 from models.category import Category
 from models.track import Track, TrackAction, TrackObject
-from models.reaction import Reaction
-from lib.queue import get
+from lib.cache import categories as categories_cache
+from lib.counts import CountMode
+from lib.pagination import decode_cursor, encode_cursor
+from services import views
 
 
 router = APIRouter()
@@ -25,6 +27,10 @@ class Type(BaseModel):
     id: int | list[int] | None = None
     limit: int = 12  # 24 ?
     offset: int | None = None
+    cursor: str | None = None
+    count_mode: CountMode = "cached"
+    comments_limit: int = Field(20, ge=1, le=100)
+    comments_cursor: str | None = None
     search: str | None = None
     my: bool | None = None
     category: int | None = None
@@ -49,8 +55,8 @@ async def handler(
     category_ids = {}
     parents_map = {}
     if extend:
-        category_ids = await get("category_ids") or {}
-        parents_map = await get("category_parents") or {}
+        category_ids = await categories_cache.get("category_ids") or {}
+        parents_map = await categories_cache.get("category_parents") or {}
 
     # Action tracking
     if data.search:
@@ -87,6 +93,7 @@ async def handler(
             "category",
             "locale",
             "user",
+            "views",
         }
 
     # Processing
@@ -114,37 +121,6 @@ async def handler(
             #         'id', 'login', 'name', 'surname', 'title', 'image',
             #     })
 
-            # Comments
-            post["comments"] = []
-            # users = {}
-            for comment in Comment.complex(
-                post=post["id"],
-                status={"$exists": False},
-                fields={"id", "data", "user", "created"},
-            ):
-                if comment.get("user"):
-                    # FIXME: get via core API
-                    # if comment['user'] not in users:
-                    #     users[comment['user']] = User.complex(
-                    #         ids=comment['user'],
-                    #         fields={
-                    #             'id', 'name', 'surname', 'title', 'image',
-                    #         },
-                    #     )
-                    # comment['user'] = users[comment['user']]
-                    del comment["user"]
-                else:
-                    del comment["user"]
-                post["comments"].append(comment)
-
-            # Views counter
-            post["views"] = len(
-                Reaction.get(
-                    type={"$exists": False},
-                    post=data.id,
-                )
-            )
-
             return post
 
     else:
@@ -188,61 +164,66 @@ async def handler(
         extra=cond or None,
         search=data.search,
     )
-    posts = Post.complex(
-        ids=data.id,
-        limit=data.limit,
-        offset=data.offset,
-        **params,
-        fields=fields,
-        handler=handle,
-    )
+    cursor = None
+    if data.id:
+        posts = await Post.acomplex(
+            ids=data.id,
+            limit=data.limit,
+            offset=data.offset,
+            **params,
+            fields=fields,
+            handler=handle,
+            sortby="updated",
+        )
+    else:
+        # NOTE: Sorted by `updated, id` in DB, continued by cursor (keyset)
+        posts, last = await Post.apage(
+            limit=data.limit,
+            after=decode_cursor(data.cursor),
+            offset=data.offset or 0,
+            **params,
+            fields=fields,
+            handler=handle,
+        )
+        cursor = encode_cursor(last)
+
+    # Comments
+    # NOTE: Only for one post, paginated by `created`
+    # FIXME: comment authors via core API
+    if extend and posts:
+        threads = await Comment.aget_threads(
+            [data.id],
+            data.comments_limit,
+            after=decode_cursor(data.comments_cursor),
+        )
+        comments, last = threads[data.id]
+        posts["comments"] = comments
+        posts["comments_count"] = await Comment.acount(
+            strategy="cached",
+            post=data.id,
+            status={"$exists": False},
+        )
+        posts["comments_cursor"] = encode_cursor(last)
 
     # Count
     count = None
-    if not data.id:
-        count = Post.count(**params)
-
-    # Sort
-    if isinstance(posts, list):
-        posts = sorted(posts, key=lambda x: x["updated"], reverse=True)
+    if not data.id and data.count_mode != "more":
+        count = await Post.acount(strategy=data.count_mode, **params)
 
     # Views counter
-    # pylint: disable=too-many-nested-blocks
-    if extend and (request.state.user or request.state.token):
-        reactions = Reaction.get(
-            type={"$exists": False},
-            post=data.id,
-            extra={
-                "$or": [
-                    {"user": request.state.user},
-                    {"token": request.state.token},
-                ],
-            },
+    if extend:
+        await views.record(
+            data.id,
+            user=request.state.user,
+            token=request.state.token,
+            utm=data.utm,
         )
-        if reactions:
-            if request.state.user:
-                viewed = False
-                for reaction in reactions[::-1]:
-                    if reaction.user:
-                        if reaction.user == request.state.user:
-                            viewed = True
-                        continue
-                    if viewed:
-                        reaction.rm()
-                        continue
-                    reaction.user = request.state.user
-                    reaction.save()
-                    viewed = True
-        else:
-            Reaction(
-                post=data.id,
-                user=request.state.user,
-                token=request.state.token,
-                utm=data.utm or None,
-            ).save()
+        posts["views"] = await views.count(data.id, posts.get("views"))
 
     # Response
     return {
         "posts": posts,
         "count": count,
+        "more": cursor is not None,
+        "cursor": cursor,
     }
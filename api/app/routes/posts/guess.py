@@ -9,7 +9,7 @@ from pydantic import BaseModel
 from libdev.lang import to_url
 from consys.errors import ErrorAccess
 
-from lib.queue import get
+from lib.cache import categories as categories_cache
 from models.post import Post
 from models.category import Category
 
@@ -61,7 +61,7 @@ async def get_posts(ids, limit, category, locale):
     if category:
         category_childs = await Category.get_childs(category)
 
-    posts = Post.complex(
+    posts = await Post.acomplex(
         id={"$nin": ids} if ids else None,
         limit=limit,
         fields=fields,
@@ -116,7 +116,7 @@ async def handler(
         )
         ids.extend([post["id"] for post in posts])
 
-        category_parents = await get("category_parents") or {}
+        category_parents = await categories_cache.get("category_parents") or {}
         parent_candidates = category_parents.get(data.category, []) + [data.category]
         parent_category = parent_candidates[0]
         posts.extend(
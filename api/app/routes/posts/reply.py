@@ -36,12 +36,12 @@ async def handler(
         raise ErrorAccess("save")
 
     # Check post
-    Post.get(data.post, fields={})
+    await Post.aget(data.post, fields={})
 
     # Get
     new = False
     if data.id:
-        comment = Comment.get(data.id)
+        comment = await Comment.aget(data.id)
 
         if (
             request.state.status < 5
@@ -64,7 +64,7 @@ async def handler(
 
     # Save
     changes = format_changes(comment.get_changes())
-    comment.save()
+    await comment.asave()
 
     # Track
     Track.log(
@@ -29,7 +29,7 @@ async def handler(
         raise ErrorAccess("rm")
 
     # Get
-    post = Post.get(data.id)
+    post = await Post.aget(data.id)
 
     # No access
     if (
@@ -43,7 +43,7 @@ async def handler(
     snapshot = post.json(
         fields={"id", "title", "image", "locale", "category", "status", "token"}
     )
-    post.rm()
+    await post.arm()
 
     # Track
     Track.log(
@@ -53,7 +53,7 @@ async def handler(
         "locale",
     }
     if data.id:
-        post = Post.get(data.id)
+        post = await Post.aget(data.id)
 
         if (
             request.state.status < 5
@@ -84,7 +84,7 @@ async def handler(
 
     # Save
     changes = format_changes(post.get_changes())
-    post.save()
+    await post.asave()
 
     # Track
     Track.log(
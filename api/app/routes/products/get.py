@@ -8,7 +8,9 @@ from fastapi import APIRouter, Body, Request
 from pydantic import AliasChoices, BaseModel, Field, ConfigDict
 from consys.errors import ErrorAccess
 
-from models.product import Product
+from lib.counts import CountMode
+from lib.responses import fast_response
+from models.product import Product, calculate_final_price
 
 
 router = APIRouter()
@@ -231,6 +233,38 @@ class ProductsGetRequest(BaseModel):
         description="Filter by category name",
         examples=["Electronics"],
     )
+    price_from: float | None = Field(
+        default=None,
+        ge=0,
+        description="Minimal final price (after discounts)",
+        examples=[10],
+    )
+    price_to: float | None = Field(
+        default=None,
+        ge=0,
+        description="Maximal final price (after discounts)",
+        examples=[500],
+    )
+    in_stock: bool | None = Field(
+        default=None,
+        description="Only products available (or unavailable) in stock",
+        examples=[True],
+    )
+    is_new: bool | None = Field(
+        default=None,
+        description="Filter by new arrival flag",
+        examples=[True],
+    )
+    is_featured: bool | None = Field(
+        default=None,
+        description="Filter by featured flag",
+        examples=[True],
+    )
+    sort: Literal["new", "price_asc", "price_desc", "rating"] = Field(
+        default="new",
+        description="Sort order",
+        examples=["price_asc"],
+    )
     limit: int = Field(
         default=12,
         ge=1,
@@ -244,6 +278,13 @@ class ProductsGetRequest(BaseModel):
         description="Offset for pagination",
         examples=[0],
     )
+    count_mode: CountMode = Field(
+        default="cached",
+        description=(
+            "Count strategy: exact, cached, estimated, or `more` to skip counting"
+        ),
+        examples=["cached"],
+    )
 
 
 class ProductFeature(BaseModel):
@@ -309,35 +350,12 @@ class ProductResponse(BaseModel):
 class ProductsGetResponse(BaseModel):
     products: list[ProductResponse]
     count: int | None = None
+    more: bool | None = None
 
 
-def calculate_final_price(
-    price: float,
-    discount_type: str | None,
-    discount_value: float | None,
-) -> float:
-    """Calculate final price applying either percentage or fixed discount."""
-
-    try:
-        base_price = float(price or 0)
-    except (TypeError, ValueError):
-        base_price = 0.0
-
-    try:
-        value = float(discount_value or 0)
-    except (TypeError, ValueError):
-        value = 0.0
-
-    if not discount_type or value <= 0:
-        return base_price
-
-    if discount_type == "percent":
-        return max(base_price - base_price * value / 100, 0)
-
-    if discount_type == "fixed":
-        return max(base_price - value, 0)
-
-    return base_price
+# NOTE: Bump on any change of the output of `serialize_product`,
+# stored snapshots are rebuilt by the `backfill_products` job
+SNAPSHOT_VERSION = 1
 
 
 def _to_str(value: Any, default: str = "") -> str:
@@ -590,32 +608,73 @@ def serialize_product(product: Product | dict[str, Any]) -> ProductResponse:
     )
 
 
-def _filter_products(products: list[dict], params: ProductsGetRequest) -> list[dict]:
-    filtered = products
+def snapshot_product(product: Product | dict[str, Any]) -> dict[str, Any]:
+    """Serialized product stored for reads"""
+    return serialize_product(product).model_dump()
 
-    if params.id is not None:
-        ids = {params.id} if isinstance(params.id, int) else set(params.id)
-        filtered = [product for product in filtered if product.get("id") in ids]
 
-    if params.search:
-        query = params.search.lower()
-        filtered = [
-            product
-            for product in filtered
-            if query in str(product.get("title", "")).lower()
-            or query in str(product.get("description", "")).lower()
-            or query in str(product.get("category", "")).lower()
-        ]
+def _payload(product: Product | dict[str, Any] | None) -> dict[str, Any] | None:
+    """Response item of the product, stored or serialized"""
+
+    serialized = _snapshot(product)
+    if serialized is None:
+        serialized = serialize_product(product)
+        if serialized:
+            serialized = serialized.model_dump()
+    return serialized
+
+
+def _snapshot(product: Product | dict[str, Any] | None) -> dict[str, Any] | None:
+    """Stored response of the product when built by the current serializer"""
+
+    if isinstance(product, dict):
+        version, snapshot = product.get("snapshot_version"), product.get("snapshot")
+    else:
+        version = getattr(product, "snapshot_version", None)
+        snapshot = getattr(product, "snapshot", None)
+    return snapshot if version == SNAPSHOT_VERSION else None
 
-    if params.category:
-        category_query = params.category.lower()
-        filtered = [
-            product
-            for product in filtered
-            if category_query in str(product.get("category", "")).lower()
-        ]
 
-    return filtered
+# NOTE: (sortby, sort) for each `sort` option of the request
+SORTS = {
+    "new": ("id", "desc"),
+    "price_asc": ("final_price_from", "asc"),
+    "price_desc": ("final_price_from", "desc"),
+    "rating": ("rating", "desc"),
+}
+
+
+def _flag(value: bool | None, default: bool):
+    """Condition on a boolean field, default values are not stored"""
+
+    if value is None:
+        return None
+    if value == default:
+        return {"$ne": not default}
+    return value
+
+
+def _conditions(data: ProductsGetRequest) -> dict:
+    """DB filters of the request"""
+
+    extra = {}
+    if data.search:
+        extra["$text"] = {"$search": data.search}
+    price = {}
+    if data.price_from is not None:
+        price["$gte"] = data.price_from
+    if data.price_to is not None:
+        price["$lte"] = data.price_to
+
+    return dict(
+        category=data.category or None,
+        final_price_from=price or None,
+        in_stock=_flag(data.in_stock, True),
+        is_new=_flag(data.is_new, False),
+        is_featured=_flag(data.is_featured, False),
+        extra=extra or None,
+        # FIXME: status={"$exists": False} if request.state.status < 5 else None,
+    )
 
 
 @router.post("/get/", response_model=ProductsGetResponse, tags=["products"])
@@ -650,33 +709,63 @@ async def handler(
     }
 
     # Get
-    params = dict(
-        # FIXME: status={"$exists": False} if request.state.status < 5 else None,
-    )
+    params = _conditions(data)
+    sortby, sort = SORTS[data.sort]
 
-    products: list[ProductResponse] = []
+    products: list[dict[str, Any]] = []
     count = None
+    more = None
 
     if isinstance(data.id, int):
-        product_obj = Product.get(data.id)
-        serialized = serialize_product(product_obj)
+        product_obj = await Product.aget(data.id)
+        serialized = _payload(product_obj)
         if serialized:
             products = [serialized]
         count = 1 if products else 0
     else:
-        products_raw = Product.complex(
+        products_raw = await Product.acomplex(
             ids=data.id,
             limit=data.limit,
             offset=data.offset,
+            sortby=sortby,
+            sort=sort,
             **params,
-            fields=fields,
+            fields={"id", "snapshot", "snapshot_version"},
         )
-        products = [p for p in (serialize_product(product) for product in products_raw) if p]
 
-        if not data.id:
-            count = Product.count(**params)
+        # NOTE: Products without a current snapshot are serialized from raw fields
+        stale = [
+            product["id"] for product in products_raw if _snapshot(product) is None
+        ]
+        if stale:
+            loaded = {
+                product["id"]: product
+                for product in await Product.acomplex(ids=stale, fields=fields)
+            }
+        else:
+            loaded = {}
 
-    return {
-        "products": products,
-        "count": count,
-    }
+        for product in products_raw:
+            serialized = _snapshot(product)
+            if serialized is None and product["id"] in loaded:
+                serialized = _payload(loaded[product["id"]])
+            if serialized:
+                products.append(serialized)
+
+        if not data.id:
+            if data.count_mode == "more":
+                more = await Product.ahas_more(
+                    offset=(data.offset or 0) + len(products_raw),
+                    **params,
+                )
+            else:
+                count = await Product.acount(strategy=data.count_mode, **params)
+
+    # NOTE: Items are snapshots or dumps of `ProductResponse`, no re-validation
+    return fast_response(
+        {
+            "products": products,
+            "count": count,
+            "more": more,
+        }
+    )
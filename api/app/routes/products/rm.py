@@ -27,7 +27,7 @@ async def handler(
     if request.state.status < 2:
         raise ErrorAccess("rm")
 
-    product = Product.get(data.id)
+    product = await Product.aget(data.id)
 
     if request.state.status < 6 and product.token != request.state.token:
         raise ErrorAccess("rm")
@@ -43,7 +43,7 @@ async def handler(
             "token",
         }
     )
-    product.rm()
+    await product.arm()
 
     Track.log(
         object=TrackObject.PRODUCT,
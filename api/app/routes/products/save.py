@@ -11,7 +11,7 @@ from consys.errors import ErrorAccess
 
 from models.product import Product
 from models.track import Track, TrackAction, TrackObject, format_changes
-from .get import ProductResponse, ProductFeature, serialize_product
+from .get import ProductResponse, ProductFeature, SNAPSHOT_VERSION, snapshot_product
 
 
 router = APIRouter()
@@ -229,7 +229,7 @@ async def handler(
         "token",
     }
     if data.id:
-        product = Product.get(data.id)
+        product = await Product.aget(data.id)
     else:
         product = Product(
             token=request.state.token,
@@ -274,14 +274,16 @@ async def handler(
     product.status = data.status
 
     changes = format_changes(product.get_changes())
-    product.save()
+    await product.asave()
 
     # URL with id suffix for consistency
     url = to_url(product.title) or ""
     if url:
         url += "-"
     product.url = f"{url}{product.id}"
-    product.save()
+    product.snapshot = snapshot_product(product)
+    product.snapshot_version = SNAPSHOT_VERSION
+    await product.asave()
 
     Track.log(
         object=TrackObject.PRODUCT,
@@ -298,5 +300,5 @@ async def handler(
     return {
         "id": product.id,
         "new": new,
-        "product": serialize_product(product),
+        "product": product.snapshot,
     }
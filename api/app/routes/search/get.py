@@ -0,0 +1,69 @@
+"""
+Ranked full-text search across models.
+"""
+
+import asyncio
+from typing import Any, Dict
+
+from fastapi import APIRouter, Body, Request
+from pydantic import BaseModel, Field
+from consys.errors import ErrorAccess
+
+from lib import log
+from .utils import sources
+
+
+router = APIRouter()
+
+
+class SearchRequest(BaseModel):
+    """Search query and collections to search in"""
+
+    query: str = Field(
+        ..., min_length=2, description="Search query", examples=["headphones"]
+    )
+    models: list[str] | None = Field(
+        None,
+        description="Collections to search in (all available by default)",
+        examples=[["posts", "products"]],
+    )
+    limit: int = Field(20, ge=1, le=100, description="Max number of results")
+
+
+async def _search(name, model, fields, conditions, data):
+    try:
+        docs = await model.atext_search(
+            data.query,
+            limit=data.limit,
+            fields=fields,
+            extra=conditions or None,
+        )
+    except Exception as e:  # pylint: disable=broad-except
+        log.error("Search failed: {}", {"model": name, "error": str(e)})
+        return []
+    return [{"model": name, **doc} for doc in docs]
+
+
+@router.post("/", tags=["search"])
+async def handler(request: Request, data: SearchRequest = Body(...)):
+    """Search by text indexes over `_search_fields`, best matches first"""
+
+    if request.state.status < 2:
+        raise ErrorAccess("search")
+
+    found = await asyncio.gather(
+        *(
+            _search(name, model, fields, conditions, data)
+            for name, model, fields, conditions in sources(data.models, request)
+        )
+    )
+
+    results: list[Dict[str, Any]] = sorted(
+        (doc for docs in found for doc in docs),
+        key=lambda doc: doc["score"],
+        reverse=True,
+    )
+
+    return {
+        "results": results[: data.limit],
+    }
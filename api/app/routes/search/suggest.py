@@ -0,0 +1,66 @@
+"""
+Typeahead suggestions by word prefixes.
+"""
+
+import asyncio
+
+from fastapi import APIRouter, Body, Request
+from pydantic import BaseModel, Field
+from consys.errors import ErrorAccess
+
+from lib import log
+from .utils import sources
+
+
+router = APIRouter()
+
+
+class SuggestRequest(BaseModel):
+    """Typed text and collections to suggest from"""
+
+    query: str = Field(..., min_length=2, description="Typed text", examples=["head"])
+    models: list[str] | None = Field(
+        None,
+        description="Collections to suggest from (all available by default)",
+        examples=[["posts"]],
+    )
+    limit: int = Field(10, ge=1, le=20, description="Max suggestions per collection")
+
+
+async def _suggest(name, model, conditions, data):
+    try:
+        ids = await model.asuggest(
+            data.query, limit=data.limit, extra=conditions or None
+        )
+        if not ids:
+            return []
+        docs = await model.acomplex(ids=ids, fields={"id", "title"})
+    except Exception as e:  # pylint: disable=broad-except
+        log.error("Suggest failed: {}", {"model": name, "error": str(e)})
+        return []
+
+    titles = {doc["id"]: doc.get("title") for doc in docs}
+    return [
+        {"model": name, "id": id_, "title": titles[id_]}
+        for id_ in ids
+        if id_ in titles
+    ]
+
+
+@router.post("/suggest/", tags=["search"])
+async def handler(request: Request, data: SuggestRequest = Body(...)):
+    """Documents with words starting with the typed text"""
+
+    if request.state.status < 2:
+        raise ErrorAccess("search")
+
+    found = await asyncio.gather(
+        *(
+            _suggest(name, model, conditions, data)
+            for name, model, _, conditions in sources(data.models, request)
+        )
+    )
+
+    return {
+        "suggestions": [item for items in found for item in items],
+    }
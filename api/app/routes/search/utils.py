@@ -0,0 +1,53 @@
+"""
+Searchable models and access conditions for the search routes.
+"""
+
+from typing import Any, Dict
+
+from fastapi import Request
+
+from models.feedback import Feedback
+from models.post import Post
+from models.product import Product
+from models.space import Space
+
+
+# NOTE: Collection name → model and fields of a search result
+SOURCES = {
+    "posts": (Post, {"id", "title", "url", "image", "description"}),
+    "products": (Product, {"id", "title", "url", "images"}),
+    "spaces": (Space, {"id", "title", "link", "logo"}),
+    "feedback": (Feedback, {"id", "title", "type", "source"}),
+}
+
+
+def access_conditions(name: str, request: Request) -> Dict[str, Any] | None:
+    """Conditions limiting results to what the user can list, None if nothing"""
+
+    status = request.state.status
+    if status < 2:
+        return None
+
+    if name == "posts":
+        return {"status": {"$exists": False}} if status < 5 else {}
+    if name == "spaces":
+        if status >= 4:
+            return {}
+        # NOTE: Guests are not members of any space
+        return {"users": request.state.user} if request.state.user else None
+    if name == "feedback":
+        return {} if status >= 6 else None
+    return {}
+
+
+def sources(names: list[str] | None, request: Request):
+    """Models to search in with their access conditions"""
+
+    for name in names or SOURCES:
+        if name not in SOURCES:
+            continue
+        conditions = access_conditions(name, request)
+        if conditions is None:
+            continue
+        model, fields = SOURCES[name]
+        yield name, model, fields, conditions
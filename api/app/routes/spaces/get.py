@@ -6,6 +6,8 @@ from fastapi import APIRouter, Body, Request
 from pydantic import BaseModel, Field, ConfigDict
 from consys.errors import ErrorAccess, ErrorWrong
 
+from lib.responses import fast_response, shape
+from models import run_sync
 from models.space import Space
 from .utils import attach_user_to_space, _ensure_space_instance
 
@@ -72,28 +74,17 @@ class SpacesGetResponse(BaseModel):
     count: int | None = Field(None, description="Total count for pagination")
 
 
-def serialize_space(space: Space | dict) -> SpaceResponse:
+def serialize_space(space: Space | dict) -> dict:
+    """`SpaceResponse` item from stored fields, without validation"""
+
     data = space.json() if hasattr(space, "json") else space
-    return SpaceResponse(
-        id=data.get("id"),
-        title=data.get("title"),
-        link=data.get("link") or "",
-        logo=data.get("logo"),
-        description=data.get("description"),
-        entity=data.get("entity"),
-        director=data.get("director"),
-        inn=data.get("inn"),
-        margin=float(data.get("margin") or 0),
-        phone=data.get("phone"),
-        mail=data.get("mail"),
-        telegram=data.get("telegram"),
-        country=data.get("country"),
-        region=data.get("region"),
-        city=data.get("city"),
-        users=data.get("users"),
-        user=data.get("user"),
-        created=data.get("created"),
-        updated=data.get("updated"),
+    return shape(
+        SpaceResponse,
+        {
+            **data,
+            "link": data.get("link") or "",
+            "margin": float(data.get("margin") or 0),
+        },
     )
 
 
@@ -107,17 +98,19 @@ async def handler(request: Request, data: SpacesGetRequest = Body(...)):
     # Resolve fetch by link for attachment flow
     if data.link:
         try:
-            space = _ensure_space_instance(Space.get(link=data.link))
+            space = _ensure_space_instance(await Space.aget(link=data.link))
         except ErrorWrong as exc:
             raise ErrorWrong("space") from exc
 
         if data.attach and request.state.user:
-            attach_user_to_space(space, request.state.user)
+            await run_sync(attach_user_to_space, space, request.state.user)
 
-        return {
-            "spaces": [serialize_space(space)],
-            "count": 1,
-        }
+        return fast_response(
+            {
+                "spaces": [serialize_space(space)],
+                "count": 1,
+            }
+        )
 
     attached_only = data.attached or request.state.status < 4
     if attached_only and not request.state.user:
@@ -130,12 +123,14 @@ async def handler(request: Request, data: SpacesGetRequest = Body(...)):
         offset=data.offset,
         extra={"users": request.state.user} if attached_only else None,
     )
-    spaces = Space.complex(**params)
+    spaces = await Space.acomplex(**params)
 
     if not isinstance(spaces, list):
         spaces = [spaces] if spaces else []
 
-    return {
-        "spaces": [serialize_space(space) for space in spaces],
-        "count": len(spaces) if data.id is None else None,
-    }
+    return fast_response(
+        {
+            "spaces": [serialize_space(space) for space in spaces],
+            "count": len(spaces) if data.id is None else None,
+        }
+    )
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Body, Request
 from pydantic import BaseModel, Field
 from consys.errors import ErrorAccess
 
+from models import run_sync
 from models.space import Space
 from models.track import Track, TrackAction, TrackObject, changes_from_snapshot
 from .utils import detach_space_from_users
@@ -25,14 +26,14 @@ async def handler(request: Request, data: SpaceRemoveRequest = Body(...)):
     if request.state.status < 2 or not request.state.user:
         raise ErrorAccess("rm")
 
-    space = Space.get(data.id)
+    space = await Space.aget(data.id)
 
     if request.state.status < 4 and request.state.user not in (space.users or []):
         raise ErrorAccess("rm")
 
     snapshot = space.json(fields={"id", "title", "users"})
-    detach_space_from_users(space)
-    space.rm()
+    await run_sync(detach_space_from_users, space)
+    await space.arm()
 
     Track.log(
         object=TrackObject.SPACE,
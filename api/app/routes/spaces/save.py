@@ -7,6 +7,7 @@ from pydantic import BaseModel, Field, ConfigDict
 from libdev.crypt import encrypt
 from consys.errors import ErrorAccess, ErrorWrong
 
+from models import run_sync
 from models.space import Space
 from models.track import Track, TrackAction, TrackObject, format_changes
 from .get import SpaceResponse, serialize_space
@@ -58,12 +59,12 @@ class SpaceSaveResponse(BaseModel):
     space: SpaceResponse
 
 
-def _get_space_for_update(data: SpaceSaveRequest) -> Space:
+async def _get_space_for_update(data: SpaceSaveRequest) -> Space:
     target_id = data.id or data.space_id
     if target_id:
-        return Space.get(target_id)
+        return await Space.aget(target_id)
     if data.link:
-        return Space.get(link=data.link)
+        return await Space.aget(link=data.link)
     raise ErrorWrong("space")
 
 
@@ -127,7 +128,7 @@ async def handler(request: Request, data: SpaceSaveRequest = Body(...)):
     }
 
     if data.id or data.link:
-        space = _get_space_for_update(data)
+        space = await _get_space_for_update(data)
         if request.state.status < 4 and request.state.user not in (space.users or []):
             raise ErrorAccess("save")
     else:
@@ -157,12 +158,12 @@ async def handler(request: Request, data: SpaceSaveRequest = Body(...)):
     _apply_space_fields(space, data)
 
     changes = format_changes(space.get_changes())
-    space.save()
+    await space.asave()
     if not space.link:
         space.link = encrypt(space.id, 5)
-        space.save()
+        await space.asave()
 
-    attach_user_to_space(space, request.state.user)
+    await run_sync(attach_user_to_space, space, request.state.user)
 
     Track.log(
         object=TrackObject.SPACE,
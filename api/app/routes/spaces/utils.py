@@ -39,12 +39,8 @@ def attach_user_to_space(
 def detach_space_from_users(space: Space) -> None:
     """Remove space reference from all attached users."""
     space = _ensure_space_instance(space)
-    for user_id in space.users or []:
-        try:
-            user_local = UserLocal.get(user_id)
-        except ErrorWrong:
-            continue
-
+    users_local = UserLocal.get_many(space.users or [])
+    for user_local in users_local.values():
         if space.id in user_local.spaces:
             user_local.spaces.remove(space.id)
             user_local.save()
@@ -31,7 +31,7 @@ async def handler(
     request: Request,
     data: Type = Body(...),
 ):
-    user = UserLocal.get(request.state.user)
+    user = await UserLocal.aget(request.state.user)
 
     if data.id in user.tasks:
         return {
@@ -41,7 +41,7 @@ async def handler(
             "balance": user.balance,
         }
 
-    task = Task.get(data.id)
+    task = await Task.aget(data.id)
 
     # Disabled/cancelled tasks must not be claimable
     if task.status == 0:
@@ -70,7 +70,7 @@ async def handler(
     if status == 3:
         user.balance += reward
         user.tasks.append(task.id)
-        user.save()
+        await user.asave()
 
         # await report.important(
         #     "Complete task",
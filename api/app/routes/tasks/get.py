@@ -14,7 +14,8 @@ from pydantic import BaseModel, Field
 from libdev.codes import NETWORKS
 from consys.errors import ErrorAccess
 
-from models.user import User, UserLocal
+from lib.profiles import profiles
+from models.user import UserLocal
 from models.task import Task
 
 
@@ -61,12 +62,11 @@ async def handler(
             "network",
         }
 
-    user_global = await User.get(
-        token=request.state.token,
-        id=request.state.user,
-        fields=list({"id", "link"}),
-    )  # TODO: use local
-    user = UserLocal.get(request.state.user)
+    user_global = (
+        await profiles.get(request.state.user, {"link"}, token=request.state.token)
+        or {}
+    )
+    user = await UserLocal.aget(request.state.user)
 
     def handle(task):
         # User-facing status is derived from `UserLocal.tasks` (completed ids list).
@@ -79,7 +79,7 @@ async def handler(
         task["status"] = 3 if task["id"] in user.tasks else 1
         if task.get("link") and "{}" in task["link"]:
             # Keep DB value as literal `'{}'` and inject user social id only in user mode.
-            task["link"] = task["link"].format(user_global.link)
+            task["link"] = task["link"].format(user_global.get("link"))
         if task.get("network"):
             task["network"] = NETWORKS[task["network"]]
         return task
@@ -106,7 +106,7 @@ async def handler(
             },
         )
 
-    tasks = Task.complex(
+    tasks = await Task.acomplex(
         ids=data.id,
         limit=data.limit,
         offset=data.offset,
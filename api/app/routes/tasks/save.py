@@ -104,7 +104,7 @@ async def handler(
 
     new = False
     if data.id:
-        task = Task.get(data.id)
+        task = await Task.aget(data.id)
     else:
         if not data.title:
             raise ErrorWrong("title")
@@ -150,7 +150,7 @@ async def handler(
             del task.network
 
     changes = format_changes(task.get_changes())
-    task.save()
+    await task.asave()
 
     Track.log(
         object=TrackObject.TASK,
@@ -13,6 +13,8 @@ from consys.errors import ErrorInvalid, ErrorWrong
 from libdev.crypt import decrypt, encrypt
 
 from lib import cfg, log, report
+from lib.profiles import profiles
+from models import run_sync
 from models.track import Track, TrackAction, TrackObject, _resolve_source
 from models.user import UserLocal, complex_global_users, get_name, get_social
 
@@ -35,11 +37,12 @@ USER_FIELDS = {
 router = APIRouter()
 
 
-def get_user(global_user, **kwargs):
+async def get_user(global_user, **kwargs):
     if not global_user or not global_user["id"]:
         raise ErrorInvalid("user_id")
 
-    user, new = UserLocal.get_or_create(
+    user, new = await run_sync(
+        UserLocal.get_or_create,
         global_user["id"],
         locale=kwargs.get("locale"),
     )
@@ -78,10 +81,10 @@ async def update_utm(user, global_user, utm):
             return user, None, None
 
         user.utm = utm
-        user.save()
+        await user.asave()
         return user, None, None
 
-    referrer, _ = get_user(global_referrer)
+    referrer, _ = await get_user(global_referrer)
     log.info(f"referrer #{referrer.id}")
 
     if referrer.id == user.id:
@@ -96,11 +99,11 @@ async def update_utm(user, global_user, utm):
 
     if referrer.id not in user.frens:
         user.frens.append(referrer.id)
-    user.save()
+    await user.asave()
 
     if user.id not in referrer.frens:
         referrer.frens.append(user.id)
-        referrer.save()
+        await referrer.asave()
 
     return user, referrer, global_referrer
 
@@ -115,7 +118,10 @@ async def wrap_auth(*args, **kwargs):
     if not user:
         raise ErrorWrong("password")
 
-    local_user, new_local = get_user(user, **kwargs)
+    # NOTE: Authorization can change the global profile (social, login, ...)
+    await profiles.invalidate(user["id"])
+
+    local_user, new_local = await get_user(user, **kwargs)
     local_status = local_user["status"]
     if local_status is not None:
         user["status"] = local_status
@@ -134,6 +140,8 @@ async def wrap_auth(*args, **kwargs):
             "user": user["id"],
             "status": user["status"],
             "network": kwargs["network"],
+            # NOTE: Tokens issued before a revocation are denied
+            "iat": time.time(),
         },
         cfg("jwt"),
         algorithm="HS256",
@@ -3,6 +3,7 @@
 # from consys.errors import ErrorAccess
 
 # from models.user import User
+# from services.access import revoke
 # from services.auth import sign
 
 
@@ -30,6 +31,7 @@
 #     # Save
 #     subuser.status = 1
 #     subuser.save()
+#     await revoke(user=subuser.id)
 
 #     # Response
 #     return {
@@ -10,7 +10,27 @@ from lib import report
 from lib.sockets import sio
 from models.socket import Socket
 from models.track import Track, TrackAction, TrackObject
-from routes.users.online import _other_sessions, _online_count
+from services import presence
+
+
+def session_end(socket, now):
+    """`Track.log` arguments of a closed socket session"""
+
+    return {
+        "object": TrackObject.SESSION,
+        "action": TrackAction.DISCONNECT,
+        "user": socket.user,
+        "token": socket.token,
+        "params": {
+            "session": socket.id,
+            "started_at": socket.created,
+            "ended_at": now,
+            "duration": now - socket.created,
+        },
+        "created": socket.created,
+        "expired": now,
+        "context": {"source": "socket"},
+    }
 
 
 async def online_stop(socket_id, close=True):
@@ -20,9 +40,11 @@ async def online_stop(socket_id, close=True):
     # TODO: Если сервер был остановлен, отслеживать сессию
 
     try:
-        socket = Socket.get(socket_id)
+        socket = await Socket.aget(socket_id)
     except ErrorWrong:
         # NOTE: method "exit" -> socket "disconnect"
+        if close:
+            await presence.disconnect(socket_id)
         return
 
     now = time.time()
@@ -35,44 +57,26 @@ async def online_stop(socket_id, close=True):
     #     user.save()
 
     # Action tracking
-    Track.log(
-        object=TrackObject.SESSION,
-        action=TrackAction.DISCONNECT,
-        user=socket.user,
-        token=socket.token,
-        params={
-            "session": socket.id,
-            "started_at": socket.created,
-            "ended_at": now,
-            "duration": now - socket.created,
-        },
-        created=socket.created,
-        expired=now,
-        context={"source": "socket"},
-    )
+    Track.log(**session_end(socket, now))
 
     # Remove token / Reset user
+    user_id = socket.user
     if close:
-        socket.rm()
+        await socket.arm()
+        gone = await presence.disconnect(socket_id)
     else:
         del socket.user
-        socket.save()
+        await socket.asave()
+        # NOTE: The session stays open for the token
+        await presence.connect(socket_id, None, socket.token)
+        gone = False
 
     # Other sessions of this user
-    other = _other_sessions(socket.user, socket.token)
-    if other:
+    if not gone:
         return
 
     # Send sockets about the user to all online users
-    count = _online_count()
-    if count:
-        await sio.emit(
-            "online_del",
-            {
-                "count": count,
-                "users": [{"id": socket.user}],  # TODO: Админам
-            },
-        )
+    presence.broadcast.remove([{"id": user_id}])  # TODO: Админам
 
 
 @sio.on("disconnect")
@@ -8,6 +8,7 @@ from consys.errors import ErrorAccess
 from lib import report
 from models.socket import Socket
 from routes.users.disconnect import online_stop
+from services.access import revoke
 
 
 router = APIRouter()
@@ -36,10 +37,13 @@ async def handler(
         raise ErrorAccess("exit")
 
     # Close session
-    sockets = Socket.get(token=request.state.token, fields={})
+    sockets = await Socket.aget(token=request.state.token, fields={})
     for socket in sockets:
         await online_stop(socket.id, close=False)
 
+    # NOTE: Current tokens of the session stop working on all API processes
+    await revoke(session=request.state.token)
+
     # Reset
     # FIXME: unauth via core API
     # token = Token.get(request.state.token, fields={'user'})
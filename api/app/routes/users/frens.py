@@ -9,7 +9,9 @@ from pydantic import BaseModel, Field
 from consys.errors import ErrorAccess
 from libdev.crypt import encrypt
 
-from models.user import User, UserLocal, fetch_user_profiles
+from lib.profiles import profiles as profile_cache
+from models import run_sync
+from models.user import UserLocal, fetch_user_profiles
 
 
 router = APIRouter()
@@ -73,19 +75,18 @@ async def handler(
     if request.state.status < 3 or not request.state.user:
         raise ErrorAccess("frens")
 
-    user_global = await User.get(
-        token=request.state.token,
-        id=request.state.user,
-        fields=list({"id", "link"}),
-    )  # TODO: use local
-    user, _ = UserLocal.get_or_create(request.state.user)
+    user_global = (
+        await profile_cache.get(request.state.user, {"link"}, token=request.state.token)
+        or {}
+    )
+    user, _ = await run_sync(UserLocal.get_or_create, request.state.user)
 
     fren_ids = {int(value) for value in (user.frens or []) if value}
     if not fren_ids:
         return {
             "frens": [],
             "count": 0,
-            "referral_link": user_global.link,
+            "referral_link": user_global.get("link"),
         }
 
     profiles = await fetch_user_profiles(
@@ -138,5 +139,5 @@ async def handler(
     return {
         "frens": frens,
         "count": total,
-        "referral_link": user_global.link,
+        "referral_link": user_global.get("link"),
     }
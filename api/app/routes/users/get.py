@@ -8,6 +8,7 @@ from fastapi import APIRouter, Body, Request
 from pydantic import BaseModel
 from consys.errors import ErrorAccess, ErrorInvalid
 
+from models import run_sync
 from models.user import User, UserLocal, complex_global_users
 from models.socket import Socket
 
@@ -82,14 +83,14 @@ async def handler(
     else:
         user_ids = {user["id"] for user in users}
 
-    users_local = UserLocal.complex(list(user_ids))
-    user_local_ids = {user["id"] for user in users_local}
+    # NOTE: One `$in` query, misses are remembered so `get_or_create` only inserts
+    users_local = await UserLocal.load_many(user_ids)
 
-    for user_id in user_ids - user_local_ids:
-        user_local, _ = UserLocal.get_or_create(user_id)  # TODO: social
-        users_local.append(user_local.json())
+    for user_id in user_ids - set(users_local):
+        # TODO: social
+        users_local[user_id], _ = await run_sync(UserLocal.get_or_create, user_id)
 
-    users_local = {user["id"]: user for user in users_local}
+    users_local = {user_id: user.json() for user_id, user in users_local.items()}
 
     if isinstance(users, dict):
         if users_local[users["id"]].get("spaces") is None:
@@ -7,6 +7,7 @@ from consys.errors import ErrorWrong
 from lib import report
 from lib.sockets import sio
 from models.socket import Socket
+from services import presence
 
 # from models.space import Space
 
@@ -29,30 +30,6 @@ from models.socket import Socket
 #         return spaces[0].id
 
 
-def _other_sessions(user_id, token=None):
-    """Checking for open online sessions of the user"""
-
-    if not user_id:
-        if not token:
-            return False
-
-        sockets = Socket.get(token=token)
-
-    else:
-        sockets = Socket.get(user=user_id)
-
-    return bool(sockets)
-
-
-def _online_count():
-    """Counting the total number of online users"""
-
-    sockets = Socket.get(fields={"user", "token"})
-    count = len({socket.user or socket.token for socket in sockets})
-
-    return count
-
-
 # pylint: disable=too-many-branches
 async def online_start(token_id, socket_id=None):
     """Start / update online session of the user"""
@@ -75,31 +52,30 @@ async def online_start(token_id, socket_id=None):
         # ]
         users_uniq = []
 
-        count = _online_count()
+        count = await presence.count()
         if count:
             await sio.emit(
-                "online_add",
+                "online_update",
                 {
                     "count": count,
-                    "users": users_uniq,
+                    "add": users_uniq,
+                    "del": [],
                 },
                 room=socket_id,
             )
 
-    # Already online
-    already = _other_sessions(user_id, token_id)
-
     # Save current socket with user & token data
     if socket_id:
         changed = False
 
         try:
-            socket = Socket.get(socket_id, fields={"user", "token"})
+            socket = await Socket.aget(socket_id, fields={"user", "token", "node"})
         except ErrorWrong:
             socket = Socket(
                 id=socket_id,
                 user=user_id,
                 token=token_id,
+                node=presence.NODE,
             )
             changed = True
 
@@ -126,20 +102,30 @@ async def online_start(token_id, socket_id=None):
                 socket.user = user_id
                 changed = True
 
+            if socket.node != presence.NODE:
+                socket.node = presence.NODE
+                changed = True
+
         if changed:
-            socket.save()
+            await socket.asave()
 
     # Update other sockets by token
 
-    sockets = Socket.get(token=token_id, fields={"user"})
+    sockets = await Socket.aget(token=token_id, fields={"user"})
 
     for socket in sockets:
         socket.user = user_id
-        socket.save()
+        await socket.asave()
+
+    # Already online
+    if socket_id:
+        came = await presence.connect(socket_id, user_id, token_id)
+    else:
+        came = not await presence.online(user_id, token_id)
 
     # Send sockets
 
-    if already:
+    if not came:
         return
 
     # TODO: Сокет на обновление сессий в браузере
@@ -148,8 +134,6 @@ async def online_start(token_id, socket_id=None):
     # TODO: Full info for all / auth / only for admins
     # NOTE: user.json(default=True) -> login, status
 
-    count = _online_count()
-
     # FIXME: update via core API
     # if user_id:
     #     data = [user.json(
@@ -159,14 +143,8 @@ async def online_start(token_id, socket_id=None):
     #     data = []
     data = []
 
-    if sio is not None:
-        await sio.emit(
-            "online_add",
-            {
-                "count": count,
-                "users": data,
-            },
-        )
+    # NOTE: Coalesced, reconnect storms are sent as one message
+    presence.broadcast.add(data or [{"id": user_id}])
 
     # # Redirect to active space
     # # TODO: cache
@@ -8,8 +8,11 @@ from fastapi import APIRouter, Body, Request
 from pydantic import BaseModel, ConfigDict, Field
 from consys.errors import ErrorAccess, ErrorInvalid
 
+from lib.profiles import profiles
+from models import run_sync
 from models.user import User, UserLocal
 from models.track import Track, TrackAction, TrackObject, format_changes
+from services.access import revoke
 
 
 router = APIRouter()
@@ -152,7 +155,7 @@ async def handler(
     if data.id and target_user_id != request.state.user and not is_admin:
         raise ErrorAccess("save user")
 
-    user_local, new = UserLocal.get_or_create(target_user_id)
+    user_local, new = await run_sync(UserLocal.get_or_create, target_user_id)
 
     tracked_fields = {
         "id",
@@ -198,7 +201,12 @@ async def handler(
 
     if new or payload:
         changes = format_changes(user_local.get_changes())
-        user_local.save()
+        await user_local.asave()
+
+        # NOTE: Tokens keep the previous status, so they are revoked
+        if "status" in changes:
+            await revoke(user=target_user_id)
+        await profiles.invalidate(target_user_id)
 
         Track.log(
             object=TrackObject.USER,
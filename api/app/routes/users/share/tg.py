@@ -10,7 +10,9 @@ from consys.errors import BaseError, ErrorAccess
 from libdev.req import fetch
 
 from lib import cfg, generate
-from models.user import User, UserLocal
+from lib.profiles import profiles
+from models import run_sync
+from models.user import UserLocal, get_social
 
 
 router = APIRouter()
@@ -60,16 +62,19 @@ async def handler(
     if not token:
         raise BaseError("tg.token")
 
-    user, _ = UserLocal.get_or_create(request.state.user)
-    user_global = await User.get(
-        token=request.state.token,
-        id=request.state.user,
-        fields=list({"id", "link", "social"}),
-    )  # FIXME: use local
+    user, _ = await run_sync(UserLocal.get_or_create, request.state.user)
+    user_global = (
+        await profiles.get(
+            request.state.user,
+            {"link", "social"},
+            token=request.state.token,
+        )
+        or {}
+    )
 
     url = (data.url or "").strip()
     if not url:
-        url = f"https://t.me/{cfg('tg.bot')}?start={user_global.link}"
+        url = f"https://t.me/{cfg('tg.bot')}?start={user_global.get('link')}"
     text = data.text.strip()
     button = (data.button or "").strip()
     image = (data.image or "").strip()
@@ -92,7 +97,7 @@ async def handler(
         }
 
     payload = {
-        "user_id": int(user_global.get_social(2)["id"]),
+        "user_id": int(get_social(user_global, 2)["id"]),
         "result": json.dumps(result, ensure_ascii=False),
         "allow_user_chats": True,
         "allow_bot_chats": True,
@@ -2,6 +2,8 @@
 The token creating method of the user object of the API
 """
 
+import time
+
 import jwt
 from fastapi import APIRouter, Body, Request
 from fastapi.responses import JSONResponse
@@ -47,6 +49,8 @@ async def handler(
             "user": user_id,
             "status": status,
             "network": get_network(data.network),
+            # NOTE: Tokens issued before a revocation are denied
+            "iat": time.time(),
             # 'exp': datetime.datetime.utcnow() + datetime.timedelta(days=1),
         },
         cfg("jwt"),
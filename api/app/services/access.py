@@ -1,15 +1,36 @@
 """
 Check access by token
+
+Verified tokens are kept in a process LRU, so repeated requests skip JWT
+verification. Revocations (logout, status changes) are shared by API
+processes through Redis: tokens of a revoked session or user issued before
+the revocation are denied.
 """
 
+import hashlib
+import time
+from collections import OrderedDict
 from typing import Any
 
 import jwt
 from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from consys.errors import ErrorInvalid
+from libdev.cfg import cfg
+from consys.errors import ErrorAccess, ErrorInvalid
+
+from lib import log, report
+from lib.queue import redis
+from lib.subscriber import Subscriber
+
 
-from lib import report
+JWT_CACHE_SIZE = int(cfg("jwt.cache") or 10000)
+# NOTE: Revocations do not wait for it, it bounds the cache on lost messages
+JWT_CACHE_TTL = float(cfg("jwt.cache_ttl") or 300)
+# NOTE: Tokens without `iat` (issued before it was added) are denied this long
+REVOKE_TTL = int(cfg("jwt.revoke_ttl") or 30 * 86400)
+# NOTE: Seconds of clock skew between API processes allowed for `iat` / `exp`
+JWT_LEEWAY = float(cfg("jwt.leeway") or 10)
+REVOKED_KEY = "access:revoked"
+REVOKE_CHANNEL = "access:revoke"
 
 
 def _normalize_status(raw_status: Any) -> int:
@@ -22,66 +43,200 @@ def _normalize_status(raw_status: Any) -> int:
         return 3
 
 
+class _Verified:
+    """LRU of verified tokens and the revocations known to the process"""
+
+    def __init__(self, size=JWT_CACHE_SIZE):
+        self.size = size
+        self.entries: OrderedDict = OrderedDict()
+        # NOTE: `t{session}` / `u{user}` -> (revoked at, kept until)
+        self.revoked: dict = {}
+        self.subscriber = Subscriber(
+            REVOKE_CHANNEL,
+            lambda message: self._apply(*self._parse(message)),
+            self._load,
+        )
+
+    def get(self, digest):
+        """Claims of a verified token, None if unknown or expired"""
+
+        # NOTE: Cached tokens are trusted only while revocations are received
+        if not self.subscriber.active():
+            return None
+        entry = self.entries.get(digest)
+        if entry is None:
+            return None
+        claims, expires = entry
+        if expires <= time.time():
+            del self.entries[digest]
+            return None
+        self.entries.move_to_end(digest)
+        return claims
+
+    def put(self, digest, claims, exp=None):
+        """Remember a verified token until `exp` or the cache TTL"""
+
+        expires = time.time() + JWT_CACHE_TTL
+        if exp is not None:
+            expires = min(expires, float(exp))
+        self.entries[digest] = (claims, expires)
+        self.entries.move_to_end(digest)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def is_revoked(self, session, user, issued) -> bool:
+        """Whether the token was issued before a revocation of its session / user"""
+
+        for key in (f"t{session}", f"u{user}" if user else None):
+            revocation = self.revoked.get(key)
+            if revocation is None:
+                continue
+            revoked, until = revocation
+            if until < time.time():
+                del self.revoked[key]
+                continue
+            if issued < revoked:
+                return True
+        return False
+
+    def _apply(self, key, revoked, until):
+        current = self.revoked.get(key)
+        if current is None or current[0] < revoked:
+            self.revoked[key] = (revoked, until)
+
+    @staticmethod
+    def _parse(value):
+        key, revoked, until = (
+            value.decode() if isinstance(value, bytes) else value
+        ).rsplit(":", 2)
+        return key, float(revoked), float(until)
+
+    async def fetch(self, session, user):
+        """Load revocations of the session / user from Redis"""
+
+        keys = [f"t{session}", f"u{user}"] if user else [f"t{session}"]
+        for key, value in zip(keys, await redis.hmget(REVOKED_KEY, keys)):
+            if value is not None:
+                self._apply(*self._parse(b":".join((key.encode(), value))))
+
+    async def _load(self):
+        now = time.time()
+        stale = []
+        for key, value in (await redis.hgetall(REVOKED_KEY)).items():
+            key, revoked, until = self._parse(b":".join((key, value)))
+            if until < now:
+                stale.append(key)
+                continue
+            self._apply(key, revoked, until)
+        if stale:
+            await redis.hdel(REVOKED_KEY, *stale)
+
+    async def revoke(self, session=None, user=None):
+        """Deny tokens of the session / user issued until now"""
+
+        now = time.time()
+        until = now + REVOKE_TTL
+        for key in (f"t{session}" if session else None, f"u{user}" if user else None):
+            if key is None:
+                continue
+            self._apply(key, now, until)
+            try:
+                await redis.hset(REVOKED_KEY, key, f"{now}:{until}")
+            except Exception as e:  # pylint: disable=broad-except
+                log.warning("Token revocation error: {}", e)
+            await self.subscriber.publish(f"{key}:{now}:{until}")
+
+
+verified = _Verified()
+
+
+async def revoke(session=None, user=None):
+    """Deny tokens of the session (logout) / user (status change) issued until now"""
+    await verified.revoke(session=session, user=user)
+
+
 async def jwt_auth(jwt_secret, token):
     if not token or token == "null":
         raise ErrorInvalid("token")
 
-    token = jwt.decode(token, jwt_secret, algorithms="HS256")
+    digest = hashlib.sha256(token.encode()).digest()
+    cached = verified.get(digest)
+    if cached is None:
+        payload = jwt.decode(
+            token, jwt_secret, algorithms="HS256", leeway=JWT_LEEWAY
+        )
+        claims = (
+            payload["token"],
+            payload.get("user", 0),
+            _normalize_status(payload.get("status", 3)),
+            payload.get("network", 0),
+        )
+        cached = (claims, float(payload.get("iat") or 0))
+        verified.put(digest, cached, payload.get("exp"))
 
-    return (
-        token["token"],
-        token.get("user", 0),
-        _normalize_status(token.get("status", 3)),
-        token.get("network", 0),
-    )
+    claims, issued = cached
+    # NOTE: Without the subscription revocations may be missed, fail closed
+    if not verified.subscriber.active():
+        try:
+            await verified.fetch(claims[0], claims[1])
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Token revocation error: {}", e)
+            raise ErrorAccess("token") from e
+    if verified.is_revoked(claims[0], claims[1], issued):
+        raise ErrorAccess("token")
 
+    return claims
 
-class AccessMiddleware(BaseHTTPMiddleware):
-    """Access checking middleware"""
 
-    def __init__(self, app, jwt_secret, whitelist):
-        super().__init__(app)
-        self.jwt = jwt_secret
-        self.whitelist = whitelist
+def _guest(request: Request) -> None:
+    request.state.token = None
+    request.state.user = 0
+    request.state.status = 3
+    request.state.network = 0
 
-    async def dispatch(self, request: Request, call_next):
-        url = request.url.path
 
-        # TODO: check current ip with token ip
+async def authorize(request: Request, jwt_secret, whitelist) -> Response | None:
+    """Check access by token, response if it is denied"""
 
-        token = request.cookies.get("Authorization") or request.headers.get(
-            "Authorization"
-        )
+    url = request.url.path
 
-        if not token:
-            # Whitelist
-            if request.method != "POST" or url in self.whitelist:
-                request.state.token = None
-                request.state.user = 0
-                request.state.status = 3
-                request.state.network = 0
-                return await call_next(request)
+    # TODO: check current ip with token ip
 
-            await report.warning("No token", {"url": url})
-            return Response(content="Invalid token", status_code=401)
+    token = request.cookies.get("Authorization") or request.headers.get(
+        "Authorization"
+    )
 
-        try:
-            token = token.split(" ")[1]
-            token, user, status, network = await jwt_auth(self.jwt, token)
-        except Exception as e:  # pylint: disable=broad-except
-            await report.warning(
-                "Invalid token",
-                {
-                    "url": url,
-                    "token": token,
-                },
-                error=e,
-            )
-            return Response(content="Invalid token", status_code=401)
-
-        request.state.token = token
-        request.state.user = user
-        request.state.status = status
-        request.state.network = network
-
-        return await call_next(request)
+    if not token:
+        # Whitelist
+        if request.method != "POST" or url in whitelist:
+            _guest(request)
+            return None
+
+        await report.warning("No token", {"url": url})
+        return Response(content="Invalid token", status_code=401)
+
+    try:
+        token = token.split(" ")[1]
+        token, user, status, network = await jwt_auth(jwt_secret, token)
+    except ErrorAccess:
+        # NOTE: After logout the old token must not block getting a new one
+        if request.method != "POST" or url in whitelist:
+            _guest(request)
+            return None
+        return Response(content="Invalid token", status_code=401)
+    except Exception as e:  # pylint: disable=broad-except
+        await report.warning(
+            "Invalid token",
+            {
+                "url": url,
+                "token": token,
+            },
+            error=e,
+        )
+        return Response(content="Invalid token", status_code=401)
+
+    request.state.token = token
+    request.state.user = user
+    request.state.status = status
+    request.state.network = network
+    return None
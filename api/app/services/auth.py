@@ -2,25 +2,36 @@
 User authorization
 """
 
-# TODO: cache + use local
-
 from fastapi import Request
-from consys.errors import ErrorWrong
 
+from lib.profiles import profiles
 from models.user import User
 
 
+# NOTE: Profile fields of the signed user
+FIELDS = {
+    "id",
+    "login",
+    "name",
+    "surname",
+    "title",
+    "image",
+    "status",
+    "social",
+    "link",
+}
+
+
 async def sign(request: Request):
     """Get user object"""
 
     if request.state.user:
-        try:
-            return await User.get(
-                token=request.state.token,
-                id=request.state.user,
-                # fields=list({"id"}),
-            )
-        except ErrorWrong:
-            pass
+        profile = await profiles.get(
+            request.state.user,
+            FIELDS,
+            token=request.state.token,
+        )
+        if profile:
+            return User(request.state.token, **profile)
 
     return User()
@@ -1,28 +1,57 @@
+import hashlib
 from collections import defaultdict
 
-from lib.queue import save
+from lib.cache import categories as categories_cache
 from models.category import Category
 
 
-def get_parents(categories_tree):
-    """Get category parents"""
+CATEGORY_MAPS = (
+    "category_ids",
+    "category_urls",
+    "category_parents",
+    "category_childs",
+)
+
+
+def get_index(categories_tree):
+    """Ancestor / descendant maps from one Euler tour over the tree
+
+    Descendants of a category are a contiguous slice of the visiting order,
+    so both maps are built in a single pass.
+    """
 
-    if isinstance(categories_tree, (list, tuple)):
-        categories = {}
-        for category in categories_tree:
-            for k, v in get_parents(category).items():
-                categories[k] = v
-        return categories
+    if isinstance(categories_tree, dict):
+        categories_tree = [categories_tree]
 
-    categories = {
-        categories_tree["id"]: [],
+    parents = {}
+    order = []
+    bounds = {}
+
+    def visit(category, path):
+        start = len(order)
+        order.append(category["id"])
+        parents[category["id"]] = list(path)
+        path.append(category["id"])
+        for child in category["categories"]:
+            visit(child, path)
+        path.pop()
+        bounds[category["id"]] = (start + 1, len(order))
+
+    for category in categories_tree:
+        visit(category, [])
+
+    childs = {
+        category: order[start:end]
+        for category, (start, end) in bounds.items()
+        if start < end
     }
 
-    for category in categories_tree["categories"]:
-        for k, v in get_parents(category).items():
-            categories[k] = [categories_tree["id"]] + v
+    return parents, childs
+
 
-    return categories
+def get_parents(categories_tree):
+    """Get category parents"""
+    return get_index(categories_tree)[0]
 
 
 def get_childs(category_parents):
@@ -37,17 +66,158 @@ def get_childs(category_parents):
     return parents
 
 
-async def cache_categories():
-    """Cache categories"""
+def get_checksum(categories):
+    """Change-detection checksum over category ids and update times"""
+
+    digest = hashlib.blake2b(digest_size=16)
+    for id_, updated in sorted(
+        (category.id, category.updated or 0) for category in categories
+    ):
+        digest.update(f"{id_}:{updated};".encode())
+    return digest.hexdigest()
+
+
+def _patch(maps, category_id, category):
+    """Apply one saved (or removed, when `category` is None) category
+
+    Returns whether the tree structure changed, or None when the change
+    can't be applied locally and a full rebuild is needed.
+    NOTE: Lists from the maps are shared with the L1 cache, never mutate them
+    """
+
+    ids = maps["category_ids"]
+    urls = maps["category_urls"]
+    parents = maps["category_parents"]
+    childs = maps["category_childs"]
+
+    old = ids.get(category_id)
+
+    if old is not None and old.url in urls and urls[old.url].id == category_id:
+        del urls[old.url]
+    if category is None:
+        ids.pop(category_id, None)
+    else:
+        ids[category_id] = category
+        urls[category.url] = category
+
+    old_parent = None if old is None else old.parent or 0
+    new_parent = None if category is None else category.parent or 0
+    if old_parent == new_parent:
+        return False
+
+    subtree = childs.get(category_id, [])
+    moved = {category_id, *subtree}
+    depth = 0
+
+    # Detach
+    if old is not None:
+        if category_id not in parents:
+            return None
+        depth = len(parents[category_id])
+        for ancestor in parents[category_id]:
+            rest = [child for child in childs[ancestor] if child not in moved]
+            if rest:
+                childs[ancestor] = rest
+            else:
+                del childs[ancestor]
+
+    elif any(
+        other.parent == category_id and other.id not in parents
+        for other in ids.values()
+    ):
+        # NOTE: New category adopts orphans
+        return None
+
+    if category is None:
+        if subtree:
+            return None
+        parents.pop(category_id, None)
+        return True
+
+    # Attach
+    if not new_parent:
+        ancestors = []
+    elif new_parent in parents and new_parent not in moved:
+        ancestors = parents[new_parent] + [new_parent]
+    else:
+        return None
+
+    for ancestor in ancestors:
+        childs[ancestor] = childs.get(ancestor, []) + [category_id] + subtree
+    for child in (category_id, *subtree):
+        parents[child] = ancestors + parents.get(child, [])[depth:]
+
+    return True
+
+
+async def _patch_categories(changed):
+    """Patch the cached maps with changed categories, False if not possible"""
+
+    if not await categories_cache.current_version():
+        return False
+
+    maps = {}
+    for key in CATEGORY_MAPS:
+        value = await categories_cache.get(key)
+        if value is None:
+            return False
+        maps[key] = dict(value)
+
+    categories = await Category.aget(ids=list(changed))
+    categories = {category.id: category for category in categories}
+
+    structure = False
+    for category_id in changed:
+        result = _patch(maps, category_id, categories.get(category_id))
+        if result is None:
+            return False
+        structure |= result
+
+    values = {
+        "category_ids": maps["category_ids"],
+        "category_urls": maps["category_urls"],
+        "category_checksum": get_checksum(maps["category_ids"].values()),
+    }
+    keep = ()
+    if structure:
+        values["category_parents"] = maps["category_parents"]
+        values["category_childs"] = maps["category_childs"]
+    else:
+        keep = ("category_parents", "category_childs")
+
+    await categories_cache.publish(values, keep=keep)
+    return True
+
+
+async def cache_categories(changed=None):
+    """Cache categories
+
+    With `changed` (ids of saved / removed categories) the cached maps are
+    patched in place; otherwise they are rebuilt only if categories in DB
+    differ from the cached snapshot.
+    """
+
+    if changed is not None:
+        if await _patch_categories(changed):
+            return
+
+    elif await categories_cache.current_version():
+        stamps = await Category.aget(fields={"id", "updated"})
+        if get_checksum(stamps) == await categories_cache.get("category_checksum"):
+            return
 
-    categories = Category.get()
+    categories = await Category.aget()
     categories_tree = Category.get_tree(categories)
-    category_parents = get_parents(categories_tree)
-    category_childs = get_childs(category_parents)
+    category_parents, category_childs = get_index(categories_tree)
     category_ids = {category.id: category for category in categories}
     category_urls = {category.url: category for category in categories}
 
-    await save("category_ids", category_ids)
-    await save("category_urls", category_urls)
-    await save("category_parents", category_parents)
-    await save("category_childs", category_childs)
+    await categories_cache.publish(
+        {
+            "category_ids": category_ids,
+            "category_urls": category_urls,
+            "category_parents": category_parents,
+            "category_childs": category_childs,
+            "category_checksum": get_checksum(categories),
+        }
+    )
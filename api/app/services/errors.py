@@ -1,116 +1,203 @@
 """
 Request processing and response statuses formatting
+
+Unexpected responses are passed through as is, only the first
+`CAPTURE_SIZE` bytes of their bodies are kept. They are logged and reported
+by a background task: the same error (status, method, route and body) is
+reported once per `DEDUP_WINDOW` seconds with the number of repeats, and a
+`SAMPLE_RATE` share of the rest is reported.
 """
 
+import hashlib
+import random
+import time
 import traceback
 
 from fastapi import Request
 from fastapi.responses import JSONResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from libdev.cfg import cfg
+from prometheus_client import Counter
+from starlette.types import Message, Send
 from consys.errors import BaseError
 
 from lib import log, report
+from lib.worker import Worker
 
 
 SUSPICIOUS_PATHS = {
     "vendor/phpunit",
 }
-
-
-class ErrorsMiddleware(BaseHTTPMiddleware):
-    """Formatting errors middleware"""
-
-    def __init__(self, app):
-        super().__init__(app)
-
-    async def _create_body_iterator(self, body: bytes):
-        yield body
-
-    async def dispatch(self, request: Request, call_next):
-        # # Whitelist
-        # if request.method != "POST":
-        #     return await call_next(request)
-
+# NOTE: Responses with other statuses are logged and reported
+OK_STATUSES = {200, 303, 401}
+CAPTURE_SIZE = int(cfg("errors.capture") or 4096)
+QUEUE_SIZE = int(cfg("errors.queue") or 1000)
+SAMPLE_RATE = float(1 if cfg("errors.sample") is None else cfg("errors.sample"))
+DEDUP_WINDOW = float(cfg("errors.window") or 60)
+
+metric_errors = Counter(
+    "errors_responses",
+    "Unexpected responses by the result of reporting",
+    ["result"],
+)
+
+
+def suspicious(path: str) -> JSONResponse | None:
+    """Forbidden response for scanner paths"""
+
+    for suspicious_path in SUSPICIOUS_PATHS:
+        if suspicious_path not in path:
+            continue
+        return JSONResponse(
+            status_code=403,
+            content={
+                "status": "error",
+                "error": "Forbidden",
+                "detail": suspicious_path,
+            },
+        )
+    return None
+
+
+def client_error(e: BaseError) -> JSONResponse:
+    """Response of a handled error"""
+    return JSONResponse(
+        status_code=400,
+        content={
+            "status": "error",
+            "error": e.__class__.__name__,
+            "detail": vars(e)["txt"],
+        },
+    )
+
+
+async def server_error(e: Exception) -> JSONResponse:
+    """Log & report an unhandled error, response for it"""
+
+    # Log
+    tb_str = "".join(traceback.format_tb(e.__traceback__))
+    log.error(f"Exception during request processing: {str(e)}\nTraceback: {tb_str}")
+
+    # Report
+    await report.critical(str(e), error=e)
+
+    return JSONResponse(
+        status_code=500,
+        content={
+            "status": "error",
+            "error": "ErrorServer",
+            "detail": str(e),
+        },
+    )
+
+
+class _Reporter(Worker):
+    """Background reports of unexpected responses"""
+
+    def __init__(self, size=QUEUE_SIZE):
+        super().__init__(size)
+        self.seen: dict = {}
+
+    def dropped(self, count):
+        metric_errors.labels("dropped").inc(count)
+
+    def _repeats(self, fingerprint, now) -> int | None:
+        """Repeats since the last report, None if it is a duplicate"""
+
+        if len(self.seen) > self.queue.maxlen * 10:
+            self.seen = {
+                key: value for key, value in self.seen.items() if value[0] > now
+            }
+
+        seen = self.seen.get(fingerprint)
+        if seen is not None and seen[0] > now:
+            seen[1] += 1
+            return None
+        self.seen[fingerprint] = [now + DEDUP_WINDOW, 0]
+        return seen[1] if seen is not None else 0
+
+    async def send(self, item):
+        """Log and report a response"""
+
+        fingerprint, text, extra = item
+        log.info(f"Response: {extra['status']}")
+        log.info(f"Response Body: {text}")
+
+        repeats = self._repeats(fingerprint, time.time())
+        if repeats is None:
+            metric_errors.labels("duplicate").inc()
+            return
+        if random.random() >= SAMPLE_RATE:
+            metric_errors.labels("sampled").inc()
+            return
+
+        if repeats:
+            extra = {**extra, "repeats": repeats}
         try:
-            for path in SUSPICIOUS_PATHS:
-                if path not in request.url.path:
-                    continue
-                return JSONResponse(
-                    status_code=403,
-                    content={
-                        "status": "error",
-                        "error": "Forbidden",
-                        "detail": path,
-                    },
-                )
-
-            # # Create a new request with the cached body
-            # body = await request.body()
-            # request = Request(
-            #     request.scope,
-            #     receive=lambda: {"type": "http.request", "body": request_body},
-            # )
-
-            # log.info(f"Method: {request.method}")
-            # log.info(f"URL: {request.url}")
-            # log.info(f"Headers: {dict(request.headers)}")
-            # log.info(f"Query Params: {dict(request.query_params)}")
-
-            response = await call_next(request)
-
-            if response.status_code not in {200, 303, 401}:
-                # # Log request
-                # request_body = body.decode("utf-8")
-                # log.info(f"Request: {request.method} {request.url}")
-                # log.info(f"Request Body: {request_body}")
-
-                # Log response
-                response_body = b""
-                async for chunk in response.body_iterator:
-                    response_body += chunk
-                response.body_iterator = self._create_body_iterator(response_body)
-                response_body = response_body.decode("utf-8")
-                log.info(f"Response: {response.status_code}")
-                log.info(f"Response Body: {response_body}")
-
-                # Report
-                await report.warning(
-                    response_body,
-                    {
-                        "method": request.method,
-                        "url": getattr(request.state, "url", None) or request.url,
-                        "status": response.status_code,
-                        # "request": request_body,
-                    },
-                )
-
-            return response
-
-        except BaseError as e:
-            return JSONResponse(
-                status_code=400,
-                content={
-                    "status": "error",
-                    "error": e.__class__.__name__,
-                    "detail": vars(e)["txt"],
-                },
-            )
-
+            await report.warning(text, extra)
         except Exception as e:  # pylint: disable=broad-except
-            # Log
-            tb_str = "".join(traceback.format_tb(e.__traceback__))
-            log.error(
-                f"Exception during request processing: {str(e)}\nTraceback: {tb_str}"
-            )
-
-            # Report
-            await report.critical(str(e), error=e)
-
-            return JSONResponse(
-                status_code=500,
-                content={
-                    "status": "error",
-                    "error": "ErrorServer",
-                    "detail": str(e),
-                },
-            )
+            log.error("Error report failed: {}", str(e))
+            return
+        metric_errors.labels("reported").inc()
+
+    async def flush(self):
+        """Send queued reports"""
+        while self.queue:
+            await self.send(self.queue.popleft())
+
+
+reporter = _Reporter()
+
+
+class ResponseCapture:
+    """`send` keeping the status and the beginning of unexpected responses"""
+
+    def __init__(self, send: Send, size=CAPTURE_SIZE):
+        self.send = send
+        self.status: int | None = None
+        self.body = bytearray()
+        self.size = 0
+        self.limit = size
+
+    @property
+    def started(self) -> bool:
+        """Whether the response has been started"""
+        return self.status is not None
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.status = message["status"]
+        elif message["type"] == "http.response.body":
+            if self.status not in OK_STATUSES:
+                chunk = message.get("body", b"")
+                self.size += len(chunk)
+                room = self.limit - len(self.body)
+                if room > 0:
+                    self.body += memoryview(chunk)[:room]
+        await self.send(message)
+
+    async def report(self, request: Request) -> None:
+        """Queue a report of the response if its status is unexpected"""
+
+        if self.status is None or self.status in OK_STATUSES:
+            return
+
+        text = self.body.decode("utf-8", "replace")
+        if self.size > len(self.body):
+            text += f"... ({self.size} bytes)"
+
+        route = request.scope.get("route")
+        path = getattr(route, "path", None) or request.url.path
+        fingerprint = hashlib.sha1(
+            f"{self.status} {request.method} {path} {text}".encode()
+        ).digest()
+        item = (
+            fingerprint,
+            text,
+            {
+                "method": request.method,
+                "url": str(getattr(request.state, "url", None) or request.url),
+                "status": self.status,
+            },
+        )
+        if not reporter.push(item):
+            await reporter.send(item)
@@ -1,3 +1,71 @@
+"""
+Rate limits
+
+Sliding windows (the previous fixed window weighted by its remaining share
+plus the current one) kept in Redis, so limits are shared by all API
+processes and survive restarts. All windows of a request, the default ones
+and the ones of its route, are checked and counted by one Lua script call.
+While Redis is unavailable the same windows are counted in process memory.
+"""
+
+import math
+import time
+
+from fastapi import Request, Response
+from fastapi.responses import JSONResponse
+from slowapi.middleware import _find_route_handler
+
+from lib import log
+from lib.queue import redis
+
+
+PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+_NAMES = {window: period for period, window in PERIODS.items()}
+PREFIX = "limits"
+# NOTE: Delay before trying Redis again after an error
+RETRY_DELAY = 5
+# NOTE: Expired process counters are dropped above this size
+LOCAL_SIZE = 100_000
+
+# NOTE: Returns the number of the exceeded window (0 if none) and the previous
+# and the current count of every window, the current ones after this request
+_HIT = """
+local now = tonumber(ARGV[1])
+local count = #KEYS / 2
+local counts = {}
+local exceeded = 0
+for i = 1, count do
+    local window = tonumber(ARGV[i * 2])
+    local limit = tonumber(ARGV[i * 2 + 1])
+    local previous = tonumber(redis.call("GET", KEYS[i * 2]) or "0")
+    local current = tonumber(redis.call("GET", KEYS[i * 2 - 1]) or "0")
+    local weight = (window - now % window) / window
+    if exceeded == 0 and previous * weight + current + 1 > limit then
+        exceeded = i
+    end
+    counts[i * 2 - 1] = previous
+    counts[i * 2] = current
+end
+if exceeded == 0 then
+    for i = 1, count do
+        counts[i * 2] = redis.call("INCR", KEYS[i * 2 - 1])
+        if counts[i * 2] == 1 then
+            redis.call("EXPIRE", KEYS[i * 2 - 1], tonumber(ARGV[i * 2]) * 2)
+        end
+    end
+end
+table.insert(counts, 1, exceeded)
+return counts
+"""
+
+_hit = redis.register_script(_HIT)
+
+
 def get_ip(request):
     """Get IP address"""
     return request.state.ip
@@ -11,3 +79,181 @@ def get_user(request):
 def get_uniq(request):
     """Get unique requester"""
     return get_ip(request) or get_user(request)
+
+
+def parse(limit: str) -> tuple[int, int]:
+    """`25/second` → `(25, 1)`, number of requests and window in seconds"""
+
+    amount, period = limit.split("/")
+    return int(amount), PERIODS[period.strip().rstrip("s")]
+
+
+class Limiter:
+    """Default and per-route rate limits of the requester"""
+
+    def __init__(
+        self,
+        key_func,
+        default_limits,
+        route_limits=None,
+        enabled=True,
+        headers_enabled=True,
+    ):
+        self.key_func = key_func
+        self.limits = [parse(limit) for limit in default_limits]
+        self.route_limits = {
+            path: [parse(limit) for limit in limits]
+            for path, limits in (route_limits or {}).items()
+        }
+        self.enabled = enabled
+        self.headers_enabled = headers_enabled
+        self.local: dict = {}
+        self.redis_failed = 0.0
+
+    def _windows(self, key, path, now) -> tuple[list, list]:
+        """Keys of the current and the previous counter and limits of each window"""
+
+        keys = []
+        windows = []
+        for scope, limits in (
+            ("", self.limits),
+            (path, self.route_limits.get(path, ())),
+        ):
+            for amount, window in limits:
+                bucket = int(now // window)
+                base = f"{PREFIX}:{key}:{scope}:{window}"
+                keys += [f"{base}:{bucket}", f"{base}:{bucket - 1}"]
+                windows.append((amount, window))
+        return keys, windows
+
+    def _hit_local(self, keys, windows, now) -> list:
+        """`_HIT` on process counters"""
+
+        if len(self.local) > LOCAL_SIZE:
+            self.local = {
+                key: (value, until)
+                for key, (value, until) in self.local.items()
+                if until > now
+            }
+
+        counts = []
+        exceeded = 0
+        for i, (amount, window) in enumerate(windows):
+            previous = self.local.get(keys[i * 2 + 1], (0, 0))[0]
+            current = self.local.get(keys[i * 2], (0, 0))[0]
+            weight = (window - now % window) / window
+            if not exceeded and previous * weight + current + 1 > amount:
+                exceeded = i + 1
+            counts += [previous, current]
+        if not exceeded:
+            for i, (_, window) in enumerate(windows):
+                counts[i * 2 + 1] += 1
+                self.local[keys[i * 2]] = (counts[i * 2 + 1], now + window * 2)
+        return [exceeded, *counts]
+
+    async def hit(self, key, path) -> tuple[str | None, dict]:
+        """Count a request, the exceeded limit if any and rate limit headers"""
+
+        now = time.time()
+        keys, windows = self._windows(key, path, now)
+
+        result = None
+        if now - self.redis_failed > RETRY_DELAY:
+            try:
+                args = [now]
+                for amount, window in windows:
+                    args += [window, amount]
+                result = await _hit(keys=keys, args=args)
+            except Exception as e:  # pylint: disable=broad-except
+                log.warning("Rate limits in process memory, Redis error: {}", e)
+                self.redis_failed = now
+        if result is None:
+            result = self._hit_local(keys, windows, now)
+
+        exceeded, counts = int(result[0]), [int(count) for count in result[1:]]
+        headers = self._headers(windows, counts, exceeded, now)
+        if not exceeded:
+            return None, headers
+        amount, window = windows[exceeded - 1]
+        return f"{amount} per 1 {_NAMES[window]}", headers
+
+    def _headers(self, windows, counts, exceeded, now) -> dict:
+        """State of the most used window, time to wait if one is exceeded"""
+
+        if exceeded:
+            amount, window = windows[exceeded - 1]
+            previous, current = counts[exceeded * 2 - 2 : exceeded * 2]
+            elapsed = now % window
+            # NOTE: Until the weighted previous count frees one request, or
+            # until the current count alone does after the window changes
+            if previous and current < amount:
+                wait = (window - elapsed) - (amount - 1 - current) * window / previous
+            else:
+                wait = (window - elapsed) + window * (1 - (amount - 1) / current)
+            return {
+                "X-RateLimit-Limit": str(amount),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(math.ceil(now + wait)),
+                "Retry-After": str(max(math.ceil(wait), 1)),
+            }
+
+        best = None
+        for i, (amount, window) in enumerate(windows):
+            previous, current = counts[i * 2], counts[i * 2 + 1]
+            elapsed = now % window
+            used = previous * (window - elapsed) / window + current
+            remaining = max(amount - math.ceil(used), 0)
+            if best is None or remaining < best[1]:
+                best = (amount, remaining, now - elapsed + window)
+        if best is None:
+            return {}
+        return {
+            "X-RateLimit-Limit": str(best[0]),
+            "X-RateLimit-Remaining": str(best[1]),
+            "X-RateLimit-Reset": str(math.ceil(best[2])),
+        }
+
+
+# NOTE: Routes do not change after startup, so handlers are found once per path
+HANDLERS_CACHE = 1024
+_handlers: dict = {}
+
+
+def _route_handler(app, scope):
+    key = (id(app), scope.get("root_path", ""), scope["path"], scope["method"])
+    if key not in _handlers:
+        if len(_handlers) >= HANDLERS_CACHE:
+            _handlers.clear()
+        _handlers[key] = _find_route_handler(app.routes, scope)
+    return _handlers[key]
+
+
+async def check_limits(request: Request) -> tuple[Response | None, list]:
+    """Rate limits of the route, response if they are exceeded
+
+    The second value is rate limit headers for the response.
+    """
+
+    app = request.scope["app"]
+    limiter = app.state.limiter
+    if not limiter.enabled:
+        return None, []
+
+    # NOTE: Unknown paths are not limited
+    if _route_handler(app, request.scope) is None:
+        return None, []
+
+    exceeded, headers = await limiter.hit(limiter.key_func(request), request.url.path)
+    if not limiter.headers_enabled:
+        headers = {}
+    if exceeded is None:
+        return None, [(k.lower().encode(), v.encode()) for k, v in headers.items()]
+
+    return (
+        JSONResponse(
+            {"error": f"Rate limit exceeded: {exceeded}"},
+            status_code=429,
+            headers=headers,
+        ),
+        [],
+    )
@@ -0,0 +1,101 @@
+"""
+Request pipeline
+
+One pure ASGI middleware for request parameters, monitoring, error
+formatting, access checking and rate limits, in this order. Responses are
+passed through without extra tasks or body buffering.
+"""
+
+from consys.errors import BaseError
+from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from lib.identity import identity_scope
+from services.access import authorize
+from services.errors import ResponseCapture, client_error, server_error, suspicious
+from services.limiter import check_limits
+from services.logging import clear_request_context
+from services.monitoring import observe
+from services.parameters import response_headers, set_parameters
+
+
+class RequestMiddleware:
+    """Request processing middleware"""
+
+    def __init__(self, app: ASGIApp, jwt_secret, whitelist):
+        self.app = app
+        self.jwt = jwt_secret
+        self.whitelist = whitelist
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope, receive)
+
+        async def send_response(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    *response_headers(request),
+                ]
+                observe(request, message["status"])
+            await send(message)
+
+        # NOTE: One identity map of model instances per request
+        with identity_scope():
+            set_parameters(request)
+            try:
+                await self._process(request, receive, send_response)
+            finally:
+                clear_request_context()
+
+    async def _process(self, request: Request, receive: Receive, send: Send):
+        """Errors formatting"""
+
+        scope = request.scope
+        response = suspicious(request.url.path)
+        if response is not None:
+            await response(scope, receive, send)
+            return
+
+        capture = ResponseCapture(send)
+        try:
+            await self._call(request, receive, capture)
+        except BaseError as e:
+            if capture.started:
+                raise
+            await client_error(e)(scope, receive, send)
+            return
+        except Exception as e:  # pylint: disable=broad-except
+            response = await server_error(e)
+            if capture.started:
+                raise
+            await response(scope, receive, send)
+            return
+
+        await capture.report(request)
+
+    async def _call(self, request: Request, receive: Receive, send: Send):
+        """Access checking and rate limits"""
+
+        scope = request.scope
+        response = await authorize(request, self.jwt, self.whitelist)
+        headers = []
+        if response is None:
+            response, headers = await check_limits(request)
+        if response is not None:
+            await response(scope, receive, send)
+            return
+
+        if not headers:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_limits(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), *headers]
+            await send(message)
+
+        await self.app(scope, receive, send_limits)
@@ -1,7 +1,6 @@
 import time
 
 from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
 from prometheus_client import Histogram
 
 
@@ -12,25 +11,17 @@ metric_endpoints = Histogram(
 )
 
 
-class MonitoringMiddleware(BaseHTTPMiddleware):
-    """Monitoring requests middleware"""
+def observe(request: Request, status: int) -> None:
+    """Monitoring requests"""
 
-    def __init__(self, app):
-        super().__init__(app)
+    # Whitelist
+    if request.method != "POST":
+        return
 
-    async def dispatch(self, request: Request, call_next):
-        # Whitelist
-        if request.method != "POST":
-            return await call_next(request)
+    request.state.process_time = time.time() - request.state.start
 
-        response = await call_next(request)
-
-        request.state.process_time = time.time() - request.state.start
-
-        # Monitoring
-        # TODO: native methods
-        metric_endpoints.labels(request.state.url, response.status_code).observe(
-            request.state.process_time
-        )
-
-        return response
+    # Monitoring
+    # TODO: native methods
+    metric_endpoints.labels(request.state.url, status).observe(
+        request.state.process_time
+    )
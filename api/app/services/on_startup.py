@@ -3,14 +3,24 @@ Tasks on start
 """
 
 from lib import log
+from models import ensure_indexes, run_sync
+from services import errors, presence, tracking
 from services.cache import cache_categories
-from tasks import reset_online_users
+from tasks import backfill_products, reset_online_users
 
 
 async def on_startup():
     """Tasks on start"""
+    presence.start()
+    tracking.writer.start()
+    errors.reporter.start()
     try:
         await reset_online_users.kiq()
     except Exception as exc:  # pylint: disable=broad-except
         log.error("Failed to enqueue reset_online_users: {}", str(exc))
+    try:
+        await backfill_products.kiq()
+    except Exception as exc:  # pylint: disable=broad-except
+        log.error("Failed to enqueue backfill_products: {}", str(exc))
+    await run_sync(ensure_indexes)
     await cache_categories()  # TODO: remove
@@ -0,0 +1,281 @@
+"""
+Online presence registry
+
+Open sockets are kept in Redis: the owner (user or token) of each socket,
+the number of open sockets per owner and the last heartbeat of each socket.
+The online count is the number of owners, so it does not depend on the
+number of connections.
+"""
+
+import asyncio
+import os
+import platform
+import time
+import uuid
+
+from libdev.cfg import cfg
+from prometheus_client import Counter
+
+from lib import log
+from lib.queue import redis
+from lib.sockets import sio
+
+
+SOCKETS_KEY = "presence:sockets"
+OWNERS_KEY = "presence:owners"
+HEARTBEAT_KEY = "presence:heartbeat"
+NODES_KEY = "presence:nodes"
+# NOTE: Sockets without a heartbeat for `TTL` seconds are considered closed
+TTL = int(cfg("presence.ttl") or 120)
+HEARTBEAT_INTERVAL = TTL / 4
+# NOTE: Online broadcasts are sent at most once per window
+BROADCAST_WINDOW = float(cfg("presence.window") or 0.25)
+
+metric_presence_events = Counter(
+    "presence_events",
+    "Online / offline changes",
+    ["type"],
+)
+metric_presence_broadcasts = Counter(
+    "presence_broadcasts",
+    "Online update messages sent to all clients",
+)
+metric_presence_saved = Counter(
+    "presence_broadcasts_saved",
+    "Online changes not sent separately due to coalescing",
+)
+
+# NOTE: Returns 1 when the owner had no other open sockets
+_CONNECT = """
+local previous = redis.call("HGET", KEYS[1], ARGV[1])
+redis.call("ZADD", KEYS[3], ARGV[3], ARGV[1])
+if previous == ARGV[2] then
+    return 0
+end
+if previous then
+    if redis.call("HINCRBY", KEYS[2], previous, -1) <= 0 then
+        redis.call("HDEL", KEYS[2], previous)
+    end
+end
+redis.call("HSET", KEYS[1], ARGV[1], ARGV[2])
+if redis.call("HINCRBY", KEYS[2], ARGV[2], 1) == 1 then
+    return 1
+end
+return 0
+"""
+
+# NOTE: Returns 1 when it was the last open socket of the owner
+_DISCONNECT = """
+local owner = redis.call("HGET", KEYS[1], ARGV[1])
+redis.call("ZREM", KEYS[3], ARGV[1])
+if not owner then
+    return 0
+end
+redis.call("HDEL", KEYS[1], ARGV[1])
+if redis.call("HINCRBY", KEYS[2], owner, -1) <= 0 then
+    redis.call("HDEL", KEYS[2], owner)
+    return 1
+end
+return 0
+"""
+
+# NOTE: API process, unique across restarts of the same container
+NODE = f"{platform.node()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+_connect = redis.register_script(_CONNECT)
+_disconnect = redis.register_script(_DISCONNECT)
+_keys = [SOCKETS_KEY, OWNERS_KEY, HEARTBEAT_KEY]
+
+
+def _owner(user=None, token=None):
+    if user:
+        return f"u{user}"
+    if token:
+        return f"t{token}"
+    return None
+
+
+async def connect(socket_id, user=None, token=None) -> bool:
+    """Register an open socket, True if the owner has just come online"""
+
+    owner = _owner(user, token)
+    if owner is None:
+        return False
+    return bool(await _connect(keys=_keys, args=[socket_id, owner, time.time()]))
+
+
+async def disconnect(socket_id) -> bool:
+    """Unregister a socket, True if the owner has no open sockets left"""
+    return bool(await _disconnect(keys=_keys, args=[socket_id]))
+
+
+async def disconnect_many(socket_ids) -> list[bool]:
+    """Unregister sockets in one round trip, `disconnect` result of each"""
+
+    if not socket_ids:
+        return []
+    async with redis.pipeline(transaction=False) as pipe:
+        for socket_id in socket_ids:
+            await _disconnect(keys=_keys, args=[socket_id], client=pipe)
+        return [bool(gone) for gone in await pipe.execute()]
+
+
+async def online(user=None, token=None) -> bool:
+    """Whether the user (or the token) has open sockets"""
+
+    owner = _owner(user, token)
+    if owner is None:
+        return False
+    return bool(await redis.hexists(OWNERS_KEY, owner))
+
+
+async def count() -> int:
+    """Number of online users / guests"""
+    return await redis.hlen(OWNERS_KEY)
+
+
+async def touch(socket_ids):
+    """Heartbeat of open sockets"""
+
+    if not socket_ids:
+        return
+    now = time.time()
+    # NOTE: `XX` does not bring back sockets closed in the meantime
+    await redis.zadd(
+        HEARTBEAT_KEY,
+        {socket_id: now for socket_id in socket_ids},
+        xx=True,
+    )
+
+
+async def stale(ttl=TTL) -> list[str]:
+    """Sockets without a heartbeat for `ttl` seconds"""
+
+    socket_ids = await redis.zrangebyscore(HEARTBEAT_KEY, "-inf", time.time() - ttl)
+    return [socket_id.decode() for socket_id in socket_ids]
+
+
+async def live_nodes(ttl=TTL) -> list[str]:
+    """API processes with a heartbeat in the last `ttl` seconds"""
+
+    since = time.time() - ttl
+    await redis.zremrangebyscore(NODES_KEY, "-inf", since)
+    nodes = await redis.zrangebyscore(NODES_KEY, since, "+inf")
+    return [node.decode() for node in nodes]
+
+
+def local_sockets() -> list[str]:
+    """Sockets connected to this process"""
+    return [sid for sid, _ in sio.manager.get_participants("/", None)]
+
+
+async def _keep_alive():
+    while True:
+        try:
+            await redis.zadd(NODES_KEY, {NODE: time.time()})
+            await touch(local_sockets())
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Presence heartbeat error: {}", e)
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+
+class _Broadcaster:
+    """Online changes coalesced into one `online_update` per window
+
+    A user who came online and went offline within a window is not sent,
+    a window without changes of users or of the count sends nothing.
+    """
+
+    def __init__(self, event="online_update"):
+        self.event = event
+        self.changes: dict = {}
+        self.events = 0
+        self.count = None
+        self.task: asyncio.Task | None = None
+
+    def _change(self, users, delta):
+        for user in users:
+            self.changes[user["id"]] = self.changes.get(user["id"], 0) + delta
+        self.events += 1
+        metric_presence_events.labels("add" if delta > 0 else "del").inc()
+        if self.task is None:
+            self.task = asyncio.get_running_loop().create_task(self._send())
+
+    def add(self, users=()):
+        """User (or guest) came online"""
+        self._change(users, 1)
+
+    def remove(self, users=()):
+        """User (or guest) went offline"""
+        self._change(users, -1)
+
+    async def _send(self):
+        await asyncio.sleep(BROADCAST_WINDOW)
+        changes, self.changes = self.changes, {}
+        events, self.events = self.events, 0
+        self.task = None
+
+        # NOTE: Guests have no id, they change only the count
+        added = [{"id": user} for user, delta in changes.items() if user and delta > 0]
+        removed = [
+            {"id": user} for user, delta in changes.items() if user and delta < 0
+        ]
+
+        try:
+            current = await count()
+            if added or removed or current != self.count:
+                await sio.emit(
+                    self.event,
+                    {
+                        "count": current,
+                        "add": added,
+                        "del": removed,
+                    },
+                )
+                self.count = current
+                events -= 1
+                metric_presence_broadcasts.inc()
+        except Exception as e:  # pylint: disable=broad-except
+            log.warning("Presence broadcast error: {}", e)
+
+        metric_presence_saved.inc(max(events, 0))
+
+
+_tasks: set[asyncio.Task] = set()
+
+broadcast = _Broadcaster()
+
+
+def start():
+    """Send heartbeats of this process and of its sockets"""
+
+    task = asyncio.get_running_loop().create_task(_keep_alive())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def stop():
+    """Stop heartbeats, sockets of this process are closed on next startup"""
+
+    for task in list(_tasks):
+        task.cancel()
+    try:
+        await redis.zrem(NODES_KEY, NODE)
+    except Exception as e:  # pylint: disable=broad-except
+        log.warning("Presence stop error: {}", e)
+
+
+__all__ = (
+    "connect",
+    "disconnect",
+    "disconnect_many",
+    "online",
+    "count",
+    "touch",
+    "stale",
+    "live_nodes",
+    "local_sockets",
+    "broadcast",
+    "start",
+    "stop",
+)
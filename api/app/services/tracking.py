@@ -0,0 +1,230 @@
+"""
+Buffered tracking writer
+
+`Track.log` in an API process puts entries into a bounded in-memory buffer,
+a background task writes them with bulk inserts, so tracking does not wait
+for the DB on the request path. When the buffer is full the oldest entries
+are dropped and counted. Processes without a running writer (workers,
+scripts) save entries right away.
+
+Entries older than `RETENTION_DAYS` are removed by the `expire_tracking` task
+after their days are summed up into `TrackRollup` documents.
+"""
+
+import time
+
+from libdev.cfg import cfg
+from prometheus_client import Counter, Gauge
+
+from lib import log
+from lib.worker import Worker
+from models import run_sync
+from models.track import Track, TrackAction, TrackObject, TrackRollup
+
+
+BUFFER_SIZE = int(cfg("tracking.buffer") or 10000)
+BATCH_SIZE = int(cfg("tracking.batch") or 500)
+# NOTE: Entries are written at least once per interval, full batches at once
+FLUSH_INTERVAL = float(cfg("tracking.interval") or 1)
+# NOTE: `0` keeps entries forever
+RETENTION_DAYS = int(
+    180 if cfg("tracking.retention") is None else cfg("tracking.retention")
+)
+DAY = 86400
+# NOTE: Days summed up and removed per `expire` call, the rest on next runs
+EXPIRE_DAYS = 30
+REMOVE_BATCH = 1000
+
+metric_tracking_buffered = Counter(
+    "tracking_buffered",
+    "Tracking entries put into the buffer",
+)
+metric_tracking_written = Counter(
+    "tracking_written",
+    "Tracking entries written to the DB",
+)
+metric_tracking_dropped = Counter(
+    "tracking_dropped",
+    "Tracking entries dropped due to the full buffer or failed writes",
+)
+metric_tracking_pending = Gauge(
+    "tracking_pending",
+    "Tracking entries waiting in the buffer",
+)
+
+
+class _Writer(Worker):
+    """Bounded buffer of tracking documents written in batches"""
+
+    def __init__(self, size=BUFFER_SIZE, batch=BATCH_SIZE):
+        super().__init__(size, wake=batch, interval=FLUSH_INTERVAL)
+        self.batch = batch
+
+    def dropped(self, count):
+        metric_tracking_dropped.inc(count)
+
+    def push(self, item) -> bool:
+        """Buffer a `Track.document`, False if the writer is not running"""
+
+        if not super().push(item):
+            return False
+        metric_tracking_buffered.inc()
+        return True
+
+    def _requeue(self, docs):
+        """Put unwritten documents back before the newer ones"""
+
+        overflow = len(self.queue) + len(docs) - self.queue.maxlen
+        if overflow > 0:
+            self.dropped(overflow)
+            docs = docs[overflow:]
+        self.queue.extendleft(reversed(docs))
+
+    async def flush(self):
+        """Write buffered entries"""
+
+        while self.queue:
+            docs = [
+                self.queue.popleft() for _ in range(min(self.batch, len(self.queue)))
+            ]
+            try:
+                written, skipped = await run_sync(Track.insert_many, docs)
+            except Exception as e:  # pylint: disable=broad-except
+                log.error("Tracking write failed: {}", str(e))
+                written = skipped = 0
+
+            metric_tracking_written.inc(written)
+            # NOTE: Entries that can not be stored are not retried
+            metric_tracking_dropped.inc(skipped)
+            if written + skipped < len(docs):
+                # NOTE: Retried on the next interval
+                self._requeue(docs[written + skipped :])
+                break
+
+        metric_tracking_pending.set(len(self.queue))
+
+
+def _oldest_day() -> int | None:
+    # pylint: disable=protected-access
+    docs = list(
+        Track._db[Track._name]
+        .find({"created": {"$ne": None}}, {"_id": False, "created": True})
+        .sort("created", 1)
+        .limit(1)
+    )
+    if not docs:
+        return None
+    return int(docs[0]["created"]) // DAY * DAY
+
+
+def _rollup(day: int) -> int:
+    """Save totals of the day by object and action, number of entries"""
+
+    # NOTE: Entries of a complete day may be partly removed already, so its
+    # totals are kept as they are
+    rollups = TrackRollup.get(day=day)
+    if rollups and all(rollup.complete for rollup in rollups):
+        return 0
+
+    # pylint: disable=protected-access
+    groups = Track._db[Track._name].aggregate(
+        [
+            {"$match": {"created": {"$gte": day, "$lt": day + DAY}}},
+            {
+                "$group": {
+                    "_id": {
+                        "object": "$object",
+                        "action": "$action",
+                        "user": "$user",
+                    },
+                    "events": {"$sum": 1},
+                },
+            },
+            {
+                "$group": {
+                    "_id": {"object": "$_id.object", "action": "$_id.action"},
+                    "events": {"$sum": "$events"},
+                    "users": {
+                        "$sum": {"$cond": [{"$gt": ["$_id.user", 0]}, 1, 0]},
+                    },
+                },
+            },
+        ]
+    )
+
+    # NOTE: Legacy entries without object / action are shown as system views
+    totals: dict = {}
+    for group in groups:
+        key = (
+            group["_id"].get("object") or TrackObject.SYSTEM.value,
+            group["_id"].get("action") or TrackAction.VIEW.value,
+        )
+        events, users = totals.get(key, (0, 0))
+        totals[key] = (events + group["events"], users + group["users"])
+
+    for (object_, action), (events, users) in totals.items():
+        rollups = TrackRollup.get(day=day, object=object_, action=action)
+        rollup = (
+            rollups[0]
+            if rollups
+            else TrackRollup(day=day, object=object_, action=action)
+        )
+        # NOTE: Totals are replaced, so a run interrupted before the day is
+        # complete is repeated from scratch
+        rollup.events = events
+        rollup.users = users
+        rollup.save()
+
+    # pylint: disable=protected-access
+    TrackRollup._db[TrackRollup._name].update_many(
+        {"day": day},
+        {"$set": {"complete": True}},
+    )
+    return sum(events for events, _ in totals.values())
+
+
+def _remove(day: int) -> int:
+    """Delete entries of the day in batches"""
+
+    # pylint: disable=protected-access
+    coll = Track._db[Track._name]
+    condition = {"created": {"$gte": day, "$lt": day + DAY}}
+    removed = 0
+    while True:
+        ids = [
+            doc["_id"]
+            for doc in coll.find(condition, {"_id": True}).limit(REMOVE_BATCH)
+        ]
+        if not ids:
+            return removed
+        removed += coll.delete_many({"_id": {"$in": ids}}).deleted_count
+
+
+async def expire(retention=RETENTION_DAYS) -> int:
+    """Sum up and remove entries older than `retention` days"""
+
+    if not retention:
+        return 0
+
+    cutoff = (int(time.time()) // DAY - retention) * DAY
+    removed = 0
+    for _ in range(EXPIRE_DAYS):
+        # NOTE: Days without entries are skipped
+        day = await run_sync(_oldest_day)
+        if day is None or day >= cutoff:
+            break
+        await run_sync(_rollup, day)
+        removed += await run_sync(_remove, day)
+
+    if removed:
+        log.info("Tracking entries removed: {}", removed)
+    return removed
+
+
+writer = _Writer()
+
+
+__all__ = (
+    "writer",
+    "expire",
+)
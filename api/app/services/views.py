@@ -0,0 +1,224 @@
+"""
+Post view counters
+
+Unique viewers are counted in a Redis HyperLogLog per post; raw views are
+queued and persisted as `Reaction` documents by the `flush_views` task, which
+also writes the counters to `Post.views`.
+"""
+
+import time
+
+from lib import log
+from lib.queue import queue, redis
+from models import run_sync
+from models.post import Post
+from models.reaction import Reaction
+
+
+PENDING_QUEUE = "views:pending"
+DIRTY_KEY = "views:dirty"
+BATCH_SIZE = 1000
+# NOTE: Seconds per run, the task is scheduled every minute
+FLUSH_BUDGET = 45
+
+
+def _counter_key(post_id):
+    return f"views:{post_id}"
+
+
+def _viewer(user, token):
+    if user:
+        return f"u{user}"
+    if token:
+        return f"t{token}"
+    return None
+
+
+async def record(post_id, user=None, token=None, utm=None):
+    """Count a view and queue its raw reaction"""
+
+    viewer = _viewer(user, token)
+    if viewer is None:
+        return
+
+    try:
+        await redis.pfadd(_counter_key(post_id), viewer)
+        await redis.sadd(DIRTY_KEY, post_id)
+    except Exception as e:  # pylint: disable=broad-except
+        log.warning("View counter error: {}", e)
+
+    await queue(PENDING_QUEUE).push(
+        {
+            "post": post_id,
+            "user": user,
+            "token": token,
+            "utm": utm,
+        }
+    )
+
+
+async def count(post_id, stored=None):
+    """Unique viewers of the post"""
+
+    try:
+        # NOTE: Posts without a stored counter are seeded on the first read
+        if stored is None:
+            await _seed_counter(post_id)
+        counted = await redis.pfcount(_counter_key(post_id))
+        if stored is None:
+            await run_sync(_store_counts, {post_id: counted})
+    except Exception as e:  # pylint: disable=broad-except
+        log.warning("View counter error: {}", e)
+        counted = 0
+    return max(counted, stored or 0)
+
+
+def _matches(doc, field, value):
+    # NOTE: As in Mongo queries, `None` also matches a missing field
+    if value is None:
+        return doc.get(field) is None
+    return doc.get(field) == value
+
+
+def _save_reactions(views):
+    """Persist raw views, merging token views into the user ones"""
+
+    # pylint: disable=protected-access
+    coll = Reaction._db[Reaction._name]
+    reactions = {view["post"]: [] for view in views}
+    for doc in coll.find(
+        {
+            "type": {"$exists": False},
+            "post": {"$in": list(reactions)},
+            "$or": [
+                {"user": {"$in": list({view["user"] for view in views})}},
+                {"token": {"$in": list({view["token"] for view in views})}},
+            ],
+        },
+        {"_id": False, "id": True, "post": True, "user": True, "token": True},
+    ).sort("id", 1):
+        reactions[doc["post"]].append(doc)
+
+    # NOTE: Views are applied in order, new documents have no id until inserted
+    new, claimed, removed = [], {}, []
+    for view in views:
+        post = reactions[view["post"]]
+        found = [
+            doc
+            for doc in post
+            if _matches(doc, "user", view["user"])
+            or _matches(doc, "token", view["token"])
+        ]
+
+        if not found:
+            doc = Reaction(
+                post=view["post"],
+                user=view["user"],
+                token=view["token"],
+                utm=view["utm"] or None,
+            ).document()
+            new.append(doc)
+            post.append(doc)
+            continue
+
+        if not view["user"]:
+            continue
+
+        viewed = False
+        for doc in found:
+            if doc.get("user"):
+                if doc["user"] == view["user"]:
+                    viewed = True
+                continue
+            if viewed:
+                post[:] = [other for other in post if other is not doc]
+                if "id" in doc:
+                    removed.append(doc["id"])
+                else:
+                    new[:] = [other for other in new if other is not doc]
+                continue
+            doc["user"] = view["user"]
+            if "id" in doc:
+                claimed.setdefault(view["user"], []).append(doc["id"])
+            viewed = True
+
+    Reaction.insert_many(new)
+    now = time.time()
+    for user, ids in claimed.items():
+        coll.update_many(
+            {"id": {"$in": ids}},
+            {"$set": {"user": user, "updated": now}},
+        )
+    Reaction.rm_many(removed)
+
+
+def _seed(post_id):
+    """Viewers of a post counted before the HyperLogLog existed"""
+
+    # pylint: disable=protected-access
+    coll = Reaction._db[Reaction._name]
+    condition = {"post": post_id, "type": {"$exists": False}}
+    users = coll.distinct("user", {**condition, "user": {"$nin": [None, 0]}})
+    tokens = coll.distinct(
+        "token",
+        {**condition, "user": {"$in": [None, 0]}, "token": {"$ne": None}},
+    )
+    return [_viewer(user, None) for user in users] + [
+        _viewer(None, token) for token in tokens
+    ]
+
+
+async def _seed_counter(post_id):
+    viewers = await run_sync(_seed, post_id)
+    if viewers:
+        await redis.pfadd(_counter_key(post_id), *viewers)
+
+
+def _store_counts(counts):
+    """Write counters without touching `updated` (the feed is sorted by it)"""
+
+    # pylint: disable=protected-access
+    coll = Post._db[Post._name]
+    for post_id, value in counts.items():
+        coll.update_one({"id": post_id}, {"$max": {"views": value}})
+
+
+async def flush():
+    """Persist queued views and write counters to posts"""
+
+    deadline = time.time() + FLUSH_BUDGET
+
+    # NOTE: The backlog is drained in batches, the rest waits for the next run
+    pending = queue(PENDING_QUEUE)
+    while time.time() < deadline:
+        views = await pending.pop_many(BATCH_SIZE)
+        if not views:
+            break
+        try:
+            await run_sync(_save_reactions, views)
+        except Exception as e:  # pylint: disable=broad-except
+            log.error("Views save failed: {}", {"views": views, "error": str(e)})
+        if len(views) < BATCH_SIZE:
+            break
+
+    while time.time() < deadline:
+        post_ids = [int(post_id) for post_id in await redis.spop(DIRTY_KEY, BATCH_SIZE)]
+        if not post_ids:
+            break
+
+        posts = await Post.aget(ids=post_ids, fields={"id", "views"})
+        for post in posts:
+            if post.views is None:
+                await _seed_counter(post.id)
+
+        counts = {}
+        for post_id in post_ids:
+            counts[post_id] = await redis.pfcount(_counter_key(post_id))
+        await run_sync(_store_counts, counts)
+
+
+__all__ = (
+    "record",
+    "count",
+    "flush",
+)
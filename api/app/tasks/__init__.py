@@ -5,10 +5,12 @@ Use in API code:
 `from tasks import <job_task>`.
 """
 
+from tasks.jobs.backfill_products import backfill_products
 from tasks.jobs.model_events import process_model_event, retry_model_events
 from tasks.jobs.reset_online_users import reset_online_users
 
 __all__ = (
+    "backfill_products",
     "process_model_event",
     "retry_model_events",
     "reset_online_users",
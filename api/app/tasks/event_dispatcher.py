@@ -6,13 +6,13 @@ Executed by Taskiq workers.
 
 from __future__ import annotations
 
-from functools import lru_cache
 from typing import Any, Dict, Type
 
 from tasks.event_registry import get_handlers
 from lib import log
+from lib.identity import identity_scope
 from lib.queue import redis
-from models import Base
+from models import Base, get_model
 
 
 LOCK_TTL_SECONDS = 60 * 5
@@ -66,34 +66,43 @@ async def _release_lock(event_id: str) -> None:
         return
 
 
-@lru_cache(maxsize=1)
-def _model_map() -> Dict[str, Type[Base]]:
-    """
-    Build a mapping from collection name (`_name`) -> model class.
-    """
+def _get_model_cls(model_name: str) -> Type[Base] | None:
+    return get_model(model_name)
 
-    import importlib
-    import pkgutil
 
-    import models
+async def _dispatch(event: Dict[str, Any], event_id: str) -> None:
+    model_name = str(event.get("model") or "")
+    entity_id = event.get("entity_id")
+    field = str(event.get("field") or "")
 
-    mapping: Dict[str, Type[Base]] = {}
-    for module_info in pkgutil.iter_modules(models.__path__):
-        module = importlib.import_module(f"models.{module_info.name}")
-        for obj in module.__dict__.values():
-            if not isinstance(obj, type):
-                continue
-            if not issubclass(obj, Base):
-                continue
-            model_name = getattr(obj, "_name", None)
-            if isinstance(model_name, str) and model_name:
-                mapping[model_name] = obj
+    model_cls = _get_model_cls(model_name)
+    if not model_cls or not entity_id or not field:
+        log.error("Invalid event: {}", event)
+        await _mark_done(event_id)
+        return
 
-    return mapping
+    handlers = get_handlers(model=model_name, field=field)
+    if not handlers:
+        await _mark_done(event_id)
+        return
 
+    entity = model_cls.get(int(entity_id))
+    if not entity:
+        await _mark_done(event_id)
+        return
 
-def _get_model_cls(model_name: str) -> Type[Base] | None:
-    return _model_map().get(model_name)
+    for handler_cls in handlers:
+        handler = handler_cls(
+            entity,
+            field,
+            event.get("old"),
+            event.get("new"),
+            updated=event.get("updated"),
+            event_id=event_id,
+        )
+        await handler.execute()
+
+    await _mark_done(event_id)
 
 
 async def dispatch_event(event: Dict[str, Any]) -> None:
@@ -104,37 +113,7 @@ async def dispatch_event(event: Dict[str, Any]) -> None:
         return
 
     try:
-        model_name = str(event.get("model") or "")
-        entity_id = event.get("entity_id")
-        field = str(event.get("field") or "")
-
-        model_cls = _get_model_cls(model_name)
-        if not model_cls or not entity_id or not field:
-            log.error("Invalid event: {}", event)
-            await _mark_done(event_id)
-            return
-
-        handlers = get_handlers(model=model_name, field=field)
-        if not handlers:
-            await _mark_done(event_id)
-            return
-
-        entity = model_cls.get(int(entity_id))
-        if not entity:
-            await _mark_done(event_id)
-            return
-
-        for handler_cls in handlers:
-            handler = handler_cls(
-                entity,
-                field,
-                event.get("old"),
-                event.get("new"),
-                updated=event.get("updated"),
-                event_id=event_id,
-            )
-            await handler.execute()
-
-        await _mark_done(event_id)
+        with identity_scope():
+            await _dispatch(event, event_id)
     finally:
         await _release_lock(event_id)
@@ -1,7 +1,8 @@
 """
 Queue event jobs for background processing.
 
-Prefer sending Taskiq tasks when an event loop is available; otherwise enqueue synchronously.
+Prefer sending Taskiq tasks when an event loop is available (including the loop
+that offloaded `.asave()` to a DB thread); otherwise enqueue synchronously.
 """
 
 from __future__ import annotations
@@ -58,8 +59,17 @@ def enqueue(event: Dict[str, Any]) -> None:
             )
             await _push_fallback(event, str(exc))
 
+    # NOTE: Tasks are kept referenced by `models` until they finish
+    from models import _create_task, owner_loop
+
     if loop is not None:
-        loop.create_task(_send())
+        _create_task(loop, _send)
+        return
+
+    # NOTE: `.asave()` runs in a DB thread, hand the send back to the owner loop
+    loop = owner_loop()
+    if loop is not None and not loop.is_closed():
+        loop.call_soon_threadsafe(_create_task, loop, _send)
         return
 
     try:
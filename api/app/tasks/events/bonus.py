@@ -18,7 +18,7 @@ class BonusReferrer(EventHandler):
         return True
 
     async def _execute(self):
-        referrer = self.entity.get(self.entity.referrer)
+        referrer = await self.entity.load(self.entity.referrer)
         referrer.balance += FRENS_BONUS
-        referrer.save()
+        await referrer.asave()
         # tasks.bonus_referrer.send(referrer, self.entity)
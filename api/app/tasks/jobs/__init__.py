@@ -2,10 +2,12 @@
 Queued job tasks (triggered by API/webhooks/startup events).
 """
 
+from tasks.jobs.backfill_products import backfill_products
 from tasks.jobs.model_events import process_model_event
 from tasks.jobs.reset_online_users import reset_online_users
 
 __all__ = (
+    "backfill_products",
     "process_model_event",
     "reset_online_users",
 )
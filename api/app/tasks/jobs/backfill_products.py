@@ -0,0 +1,28 @@
+"""
+Backfill denormalized product fields job task.
+"""
+
+from __future__ import annotations
+
+from lib import log
+from models import run_sync
+from models.product import Product
+from routes.products.get import SNAPSHOT_VERSION, snapshot_product
+from tasks.broker import broker
+
+
+@broker.task
+async def backfill_products() -> None:
+    """Store fields computed on save for products saved before they existed"""
+
+    count = await run_sync(Product.backfill_final_price)
+    if count:
+        log.info("Products backfilled: {}", count)
+
+    count = await run_sync(
+        Product.backfill_snapshots,
+        snapshot_product,
+        SNAPSHOT_VERSION,
+    )
+    if count:
+        log.info("Product snapshots rebuilt: {}", count)
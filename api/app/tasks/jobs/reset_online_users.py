@@ -4,14 +4,34 @@ Reset online users job task.
 
 from __future__ import annotations
 
+import time
+
+from models import run_sync
 from models.socket import Socket
-from routes.users.disconnect import online_stop
+from models.track import Track
+from routes.users.disconnect import session_end
+from services import presence
 from tasks.broker import broker
 
 
 @broker.task
 async def reset_online_users() -> None:
-    """Reset online users"""
+    """Close sessions of API processes that are not running anymore"""
+
+    # NOTE: Sockets of other running processes / replicas stay open
+    nodes = await presence.live_nodes()
+    sockets = await Socket.aget(
+        extra={"node": {"$nin": nodes}},
+        fields={"user", "token", "created"},
+    )
+    if not sockets:
+        return
 
-    for socket in Socket.get(fields={}):
-        await online_stop(socket.id)
+    # NOTE: Constant number of round trips for any number of sessions
+    now = time.time()
+    await run_sync(Track.log_many, [session_end(socket, now) for socket in sockets])
+    await run_sync(Socket.rm_many, [socket.id for socket in sockets])
+    gone = await presence.disconnect_many([socket.id for socket in sockets])
+    presence.broadcast.remove(
+        [{"id": socket.user} for socket, offline in zip(sockets, gone) if offline]
+    )
@@ -35,7 +35,7 @@ async def _cache_categories() -> None:
 
 
 PERIODIC_JOBS: Dict[str, Dict[str, Any]] = {
-    # Refresh category caches in Redis.
+    # Refresh category caches in Redis (skipped when the checksum matches).
     "cache_categories": {
         "delay": 300,
         "handler": _cache_categories,
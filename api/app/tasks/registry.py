@@ -6,15 +6,27 @@ Used by Taskiq worker/scheduler to import and register all tasks.
 
 # pylint: disable=wrong-import-position,unused-import
 
-from tasks import process_model_event, reset_online_users, retry_model_events
+from tasks import (
+    backfill_products,
+    process_model_event,
+    reset_online_users,
+    retry_model_events,
+)
 from tasks.periodic.run_periodic import run_periodic
 from tasks.scheduled.analytics import analytics
+from tasks.scheduled.presence import expire_presence
 from tasks.scheduled.sitemap import sitemap
+from tasks.scheduled.tracking import expire_tracking
+from tasks.scheduled.views import flush_views
 from tasks.system import ping
 
 __all__ = (
     "analytics",
+    "backfill_products",
     "sitemap",
+    "flush_views",
+    "expire_presence",
+    "expire_tracking",
     "ping",
     "process_model_event",
     "retry_model_events",
@@ -3,10 +3,16 @@ Scheduled tasks (cron/interval).
 """
 
 from tasks.scheduled.analytics import analytics
+from tasks.scheduled.presence import expire_presence
 from tasks.scheduled.sitemap import sitemap
+from tasks.scheduled.tracking import expire_tracking
+from tasks.scheduled.views import flush_views
 
 __all__ = (
     "analytics",
     "sitemap",
+    "flush_views",
+    "expire_presence",
+    "expire_tracking",
 )
 
@@ -119,7 +119,7 @@ async def analytics():
         if filled:
             users_fill[user.id] = users_reg[user.id]
 
-    for post in Post.get():
+    for post in await Post.aget():
         if not post.user:
             continue
 
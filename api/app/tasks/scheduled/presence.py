@@ -0,0 +1,21 @@
+"""
+Close stale online sessions
+"""
+
+from tasks.broker import broker
+
+
+@broker.task(
+    schedule=[
+        {"cron": "*/1 * * * *"},
+    ],
+)
+async def expire_presence() -> None:
+    """Close sockets without a heartbeat (e.g. of a killed API process)"""
+
+    # NOTE: lazy import to avoid cycles
+    from routes.users.disconnect import online_stop
+    from services.presence import stale
+
+    for socket_id in await stale():
+        await online_stop(socket_id)
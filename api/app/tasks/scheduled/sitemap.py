@@ -132,7 +132,7 @@ async def sitemap():
     # Categories
     for locale in [None, *LOCALES]:
         links_sub = []
-        for category in Category.get(
+        for category in await Category.aget(
             locale=locale if locale else {"$nin": LOCALES},
             status={"$exists": False},
         ):
@@ -169,7 +169,7 @@ async def sitemap():
     for locale in [None, *LOCALES]:
         links_sub = []
         last_update = 0
-        for post in Post.get(
+        for post in await Post.aget(
             locale=locale if locale else {"$nin": LOCALES},
             status={"$exists": False},
         ):
@@ -0,0 +1,18 @@
+"""
+Tracking retention
+"""
+
+from tasks.broker import broker
+
+
+@broker.task(
+    schedule=[
+        {"cron": "15 * * * *"},
+    ],
+)
+async def expire_tracking() -> None:
+    """Sum up old tracking entries into daily rollups and remove them"""
+
+    from services.tracking import expire  # lazy import to avoid cycles
+
+    await expire()
@@ -0,0 +1,18 @@
+"""
+Persist post views
+"""
+
+from tasks.broker import broker
+
+
+@broker.task(
+    schedule=[
+        {"cron": "*/1 * * * *"},
+    ],
+)
+async def flush_views() -> None:
+    """Save queued views and write view counters to posts"""
+
+    from services.views import flush  # lazy import to avoid cycles
+
+    await flush()
@@ -0,0 +1,134 @@
+"""
+Rate limit check cost and correctness with several API processes
+
+Times one limit check of a request with the default windows: slowapi with
+in-memory storage (the previous setup, one counter update per window), the
+Redis limiter (one Lua script call for all windows) and its in-process
+fallback. Then sends the same requests through `--workers` limiters and
+counts how many pass a 100/minute limit.
+
+python -m scripts.bench_limiter --requests=5000 --workers=4
+"""
+
+import argparse
+import asyncio
+import time
+
+from slowapi import Limiter as SlowLimiter
+
+from lib.queue import redis
+from main import limits
+from services import limiter as redis_limiter
+
+
+def _args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--requests",
+        type=int,
+        required=False,
+        default=5000,
+        help="Number of measured limit checks",
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        required=False,
+        default=4,
+        help="Number of API processes sharing the limit",
+    )
+
+    return parser.parse_args()
+
+
+def _slowapi(default_limits):
+    """Hit of a request on slowapi limits, as its middleware does"""
+
+    slow = SlowLimiter(key_func=lambda request: None, default_limits=default_limits)
+    # pylint: disable=protected-access
+    items = [limit.limit for group in slow._default_limits for limit in group]
+
+    async def hit(key):
+        for item in items:
+            # pylint: disable=protected-access
+            if not slow._limiter.hit(item, key, "bench"):
+                return False
+        return True
+
+    return hit
+
+
+def _redis(default_limits):
+    limiter = redis_limiter.Limiter(key_func=None, default_limits=default_limits)
+
+    async def hit(key):
+        exceeded, _ = await limiter.hit(key, "/")
+        return exceeded is None
+
+    return hit
+
+
+def _local(default_limits):
+    limiter = redis_limiter.Limiter(key_func=None, default_limits=default_limits)
+    # NOTE: Redis is skipped as if it has just failed
+    limiter.redis_failed = float("inf")
+
+    async def hit(key):
+        exceeded, _ = await limiter.hit(key, "/")
+        return exceeded is None
+
+    return hit
+
+
+async def _measure(hit, requests, prefix):
+    # NOTE: New requester every time, so limits are checked but not hit
+    start = time.perf_counter()
+    for i in range(requests):
+        await hit(f"bench:{prefix}:{i}")
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+async def _shared(make, workers, requests, prefix):
+    """Allowed requests of one requester spread over the workers"""
+
+    hits = [make(["100/minute"]) for _ in range(workers)]
+    allowed = 0
+    for i in range(requests):
+        allowed += await hits[i % workers](f"bench:{prefix}:shared")
+    return allowed
+
+
+async def main(args: argparse.Namespace):
+    """Print per-request limit check time and allowed requests of each limiter"""
+
+    limiters = {
+        "slowapi, memory": _slowapi,
+        "limiter, memory": _local,
+    }
+    try:
+        await redis.ping()
+        limiters["limiter, redis"] = _redis
+    except Exception as e:  # pylint: disable=broad-except
+        print(f"Redis is unavailable, skipped: {e}")
+
+    prefix = int(time.time())
+    print(f"{len(limits)} windows: {', '.join(limits)}")
+    print(
+        f"{'limiter':<18}{'us / request':>14}"
+        f"{f'allowed of 200 with {args.workers} workers at 100/minute':>52}"
+    )
+    for name, make in limiters.items():
+        duration = await _measure(make(limits), args.requests, f"{prefix}:{name}")
+        allowed = await _shared(make, args.workers, 200, f"{prefix}:{name}")
+        print(f"{name:<18}{duration:>14.1f}{allowed:>52}")
+
+    if "limiter, redis" in limiters:
+        keys = [key async for key in redis.scan_iter(f"limits:bench:{prefix}:*")]
+        for i in range(0, len(keys), 1000):
+            await redis.delete(*keys[i : i + 1000])
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_args()))
@@ -0,0 +1,138 @@
+"""
+Per-request middleware overhead on the `/` ping route
+
+Requests are sent straight to the ASGI app (no server, no network): once
+through the full application with its middleware and once through an app
+with the same route and no middleware; the difference is the cost of the
+middleware stack. Each request has its own public IP, so rate limits are
+checked but not hit.
+
+python -m scripts.bench_middleware --requests=5000 --token
+"""
+
+import argparse
+import asyncio
+import time
+
+import jwt
+from fastapi import FastAPI
+
+from lib import cfg
+from main import app, ping
+
+
+def _args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--requests",
+        type=int,
+        required=False,
+        default=5000,
+        help="Number of measured requests",
+    )
+
+    parser.add_argument(
+        "--method",
+        type=str,
+        required=False,
+        default="POST",
+        help="HTTP method, most middleware skips non-POST requests",
+    )
+
+    parser.add_argument(
+        "--token",
+        action="store_true",
+        help="Send a signed JWT (needs the `JWT` secret)",
+    )
+
+    return parser.parse_args()
+
+
+def _bare():
+    bare = FastAPI()
+    bare.add_api_route("/", ping, methods=["GET", "POST"])
+    return bare
+
+
+def _scope(method, i, token):
+    headers = [
+        (b"host", b"localhost"),
+        (b"content-type", b"application/json"),
+        (b"accept-language", b"en-US,en;q=0.9"),
+        (b"user-agent", b"bench"),
+        (b"x-real-ip", f"8.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}".encode()),
+    ]
+    if token:
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 12345),
+        "root_path": "",
+        "path": "/",
+        "raw_path": b"/",
+        "query_string": b"",
+        "headers": headers,
+    }
+
+
+async def _request(application, scope):
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    await application(scope, receive, send)
+    return statuses[0] if statuses else None
+
+
+async def _measure(application, args, token, offset):
+    failed = 0
+    start = time.perf_counter()
+    for i in range(args.requests):
+        status = await _request(application, _scope(args.method, offset + i, token))
+        if status != 200:
+            failed += 1
+    return (time.perf_counter() - start) / args.requests * 1_000_000, failed
+
+
+async def main(args: argparse.Namespace):
+    """Print per-request time with and without middleware"""
+
+    token = None
+    if args.token:
+        secret = cfg("jwt")
+        if not secret:
+            raise SystemExit("Set the `JWT` secret to sign the token")
+        token = jwt.encode(
+            {"token": "bench", "user": 1, "status": 3, "network": 0},
+            secret,
+            algorithm="HS256",
+        )
+
+    bare = _bare()
+    # NOTE: Warm-up, also builds the middleware stacks
+    warmup = argparse.Namespace(**{**vars(args), "requests": 100})
+    await _measure(bare, warmup, token, 0)
+    await _measure(app, warmup, token, 0)
+
+    plain, _ = await _measure(bare, args, token, 1_000)
+    full, failed = await _measure(app, args, token, 1_000)
+
+    print(f"{'app':<20}{'us / request':>14}")
+    print(f"{'no middleware':<20}{plain:>14.1f}")
+    print(f"{'middleware':<20}{full:>14.1f}")
+    print(f"overhead: {full - plain:.1f} us / request, {failed} non-200 responses")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_args()))
@@ -0,0 +1,107 @@
+"""
+Compare queue codecs on size and speed
+
+python -m scripts.bench_queue --count=1000 --rounds=20
+"""
+
+import argparse
+import pickle
+import time
+
+from lib.codec import decode, encode
+from models.category import Category
+
+
+def _args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--count",
+        type=int,
+        required=False,
+        default=1000,
+        help="Number of objects in the payload",
+    )
+
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        required=False,
+        default=20,
+        help="Number of encode / decode rounds",
+    )
+
+    return parser.parse_args()
+
+
+def _payloads(count):
+    categories = [
+        Category(
+            id=i + 1,
+            title=f"Category {i}",
+            data=f"<p>Description of the category number {i}</p>",
+            parent=i // 10,
+            url=f"category-{i}",
+            locale="en",
+        )
+        for i in range(count)
+    ]
+
+    return {
+        "categories": categories,
+        "category_ids": {category.id: category for category in categories},
+        "events": [
+            {
+                "type": "model.save",
+                "model": "categories",
+                "id": i,
+                "changes": {"title": [f"Old {i}", f"New {i}"]},
+                "tags": {"admin", "bulk"},
+            }
+            for i in range(count)
+        ],
+    }
+
+
+def _measure(dumps, loads, data, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        raw = dumps(data)
+    encoded = time.perf_counter()
+    for _ in range(rounds):
+        loads(raw)
+    decoded = time.perf_counter()
+
+    return (
+        len(raw),
+        (encoded - start) / rounds * 1000,
+        (decoded - encoded) / rounds * 1000,
+    )
+
+
+def main(args: argparse.Namespace):
+    """Print size, encode and decode time per codec"""
+
+    codecs = {
+        "pickle": (pickle.dumps, pickle.loads),
+        "pickle+zstd": (
+            lambda data: encode(data, "pickle", compress=True),
+            decode,
+        ),
+        "msgpack": (lambda data: encode(data, "msgpack", compress=False), decode),
+        "msgpack+zstd": (
+            lambda data: encode(data, "msgpack", compress=True),
+            decode,
+        ),
+    }
+
+    for name, data in _payloads(args.count).items():
+        print(f"\n{name} ({args.count} items)")
+        print(f"{'codec':<14}{'bytes':>12}{'encode, ms':>14}{'decode, ms':>14}")
+        for codec, (dumps, loads) in codecs.items():
+            size, enc, dec = _measure(dumps, loads, data, args.rounds)
+            print(f"{codec:<14}{size:>12}{enc:>14.3f}{dec:>14.3f}")
+
+
+if __name__ == "__main__":
+    main(_args())
@@ -0,0 +1,234 @@
+"""
+Compare per-item serialization cost of list endpoints
+
+Before: items built as pydantic models / dicts and validated again through
+`response_model` (what FastAPI does for returned content).
+After: items in the response shape encoded by `lib.responses`.
+
+python -m scripts.bench_responses --count=100 --rounds=50
+"""
+
+import argparse
+import json
+import time
+
+from pydantic import TypeAdapter
+
+from lib.responses import dumps, shape
+from models.track import TrackAction, TrackObject
+from routes.admin.activity import AdminActivityResponse, _serialize_item
+from routes.feedback.get import FeedbackGetResponse, FeedbackItem
+from routes.products.get import (
+    ProductsGetResponse,
+    serialize_product,
+    snapshot_product,
+)
+from routes.spaces.get import SpaceResponse, SpacesGetResponse, serialize_space
+
+
+def _args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--count",
+        type=int,
+        required=False,
+        default=100,
+        help="Number of items on a page",
+    )
+
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        required=False,
+        default=50,
+        help="Number of serialization rounds",
+    )
+
+    return parser.parse_args()
+
+
+def _products(count):
+    return [
+        {
+            "id": i + 1,
+            "title": f"Product {i}",
+            "description": f"Description of the product number {i}",
+            "images": [f"https://example.com/{i}.webp"],
+            "currency": "$",
+            "category": "Electronics",
+            "is_new": bool(i % 2),
+            "is_featured": False,
+            "url": f"product-{i}-{i + 1}",
+            "features": [
+                {"key": "Battery life", "value": "32h", "value_type": "string"},
+                {"key": "Weight", "value": 250, "value_type": "number"},
+            ],
+            "options": [
+                {
+                    "name": f"Option {j}",
+                    "price": 100.0 + j,
+                    "discount_type": "percent" if j else None,
+                    "discount_value": 10.0 if j else 0.0,
+                    "images": [],
+                    "rating": 4.5,
+                    "rating_count": 10 + j,
+                    "stock_count": j,
+                    "attributes": [
+                        {"key": "Color", "value": "Black", "value_type": "string"},
+                    ],
+                    "features": [],
+                }
+                for j in range(3)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def _spaces(count):
+    return [
+        {
+            "id": i + 1,
+            "title": f"Space {i}",
+            "link": f"link{i}",
+            "description": "Wholesale partners",
+            "margin": 12.5,
+            "phone": "+19998887766",
+            "city": "San Francisco",
+            "users": [1, 2, 3],
+            "user": 1,
+            "created": 1719877200 + i,
+            "updated": 1719877200 + i,
+        }
+        for i in range(count)
+    ]
+
+
+def _feedback(count):
+    return [
+        {
+            "id": i + 1,
+            "type": "question",
+            "source": "faq",
+            "title": f"Question {i}",
+            "data": "How to change the password?",
+            "user": i % 10 + 1,
+            "user_info": {"id": i % 10 + 1, "login": f"user{i % 10}"},
+            "created": 1719877200 + i,
+        }
+        for i in range(count)
+    ]
+
+
+def _activity(count):
+    user_map = {i + 1: {"id": i + 1, "login": f"user{i}"} for i in range(10)}
+    return [
+        _serialize_item(
+            {
+                "id": i + 1,
+                "object": TrackObject.PRODUCT.value,
+                "action": TrackAction.UPDATE.value,
+                "user": i % 10 + 1,
+                "token": "token",
+                "ip": "1.1.1.1",
+                "created": 1719877200.0 + i,
+                "params": {"id": i, "changes": {"title": ["Old", "New"]}},
+                "context": {"path": "/products/save/"},
+            },
+            user_map,
+        )
+        for i in range(count)
+    ]
+
+
+def _validated(response_model, build):
+    """Content built per request and validated through `response_model`"""
+
+    adapter = TypeAdapter(response_model)
+
+    def render(items):
+        content = adapter.validate_python(build(items), from_attributes=True)
+        return json.dumps(
+            adapter.dump_python(content, mode="json"),
+            ensure_ascii=False,
+            allow_nan=False,
+            separators=(",", ":"),
+        ).encode()
+
+    return render
+
+
+def _cases(count):
+    products = _products(count)
+    snapshots = [snapshot_product(product) for product in products]
+    spaces = _spaces(count)
+    feedback = _feedback(count)
+    activity = _activity(count)
+
+    return {
+        "/products/get/": (
+            _validated(
+                ProductsGetResponse,
+                lambda items: {"products": [serialize_product(i) for i in items]},
+            ),
+            products,
+            lambda items: dumps({"products": items, "count": None, "more": None}),
+            snapshots,
+        ),
+        "/spaces/get/": (
+            _validated(
+                SpacesGetResponse,
+                lambda items: {
+                    "spaces": [SpaceResponse(**serialize_space(i)) for i in items]
+                },
+            ),
+            spaces,
+            lambda items: dumps(
+                {"spaces": [serialize_space(i) for i in items], "count": None}
+            ),
+            spaces,
+        ),
+        "/feedback/get/": (
+            _validated(FeedbackGetResponse, lambda items: {"feedback": items}),
+            feedback,
+            lambda items: dumps(
+                {
+                    "feedback": [shape(FeedbackItem, item) for item in items],
+                    "count": None,
+                    "more": None,
+                }
+            ),
+            feedback,
+        ),
+        "/admin/activity/": (
+            _validated(AdminActivityResponse, lambda items: {"items": items}),
+            activity,
+            lambda items: dumps({"items": items, "count": None, "more": None}),
+            activity,
+        ),
+    }
+
+
+def _measure(render, items, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        render(items)
+    return (time.perf_counter() - start) / rounds / len(items) * 1_000_000
+
+
+def main(args: argparse.Namespace):
+    """Print serialization time per item before and after"""
+
+    print(f"{'endpoint':<20}{'before, us':>14}{'after, us':>14}{'speedup':>10}")
+    for name, (before, raw, after, stored) in _cases(args.count).items():
+        if json.loads(before(raw)) != json.loads(after(stored)):
+            print(f"{name:<20} outputs differ")
+            continue
+        old = _measure(before, raw, args.rounds)
+        new = _measure(after, stored, args.rounds)
+        print(f"{name:<20}{old:>14.1f}{new:>14.1f}{old / new:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main(_args())
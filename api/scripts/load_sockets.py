@@ -0,0 +1,193 @@
+"""
+Socket.IO load test across several API workers
+
+Connects clients to the workers round-robin, then a probe client comes
+online on each worker in turn and every client measures how long the
+`online_update` broadcast took to reach it.
+
+python -m scripts.load_sockets --url=http://localhost:5000 \
+    --url=http://localhost:5001 --clients=2000 --rounds=10
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import socketio
+
+
+def _args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--url",
+        action="append",
+        required=True,
+        help="API worker URL, repeat for several workers",
+    )
+
+    parser.add_argument(
+        "--path",
+        type=str,
+        required=False,
+        default="/ws/socket.io",
+        help="Socket.IO path",
+    )
+
+    parser.add_argument(
+        "--clients",
+        type=int,
+        required=False,
+        default=1000,
+        help="Number of connected clients",
+    )
+
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        required=False,
+        default=100,
+        help="Number of simultaneous connection attempts",
+    )
+
+    parser.add_argument(
+        "--rounds",
+        type=int,
+        required=False,
+        default=10,
+        help="Number of measured broadcasts",
+    )
+
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        required=False,
+        default=5,
+        help="Seconds to wait for a broadcast",
+    )
+
+    return parser.parse_args()
+
+
+class Client:
+    """Connected client recording `online_update` arrival times"""
+
+    def __init__(self, url, path):
+        self.url = url
+        self.path = path
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self.received: list[float] = []
+        self.sio.on("online_update", self._online_update)
+
+    async def _online_update(self, _data):
+        self.received.append(time.perf_counter())
+
+    async def start(self):
+        await self.sio.connect(
+            self.url,
+            socketio_path=self.path,
+            transports=["websocket"],
+        )
+        await self.sio.emit("online", {"token": uuid.uuid4().hex})
+
+    async def stop(self):
+        await self.sio.disconnect()
+
+    def latency(self, since):
+        """Seconds from `since` to the first broadcast after it"""
+        for received in self.received:
+            if received >= since:
+                return received - since
+        return None
+
+
+async def _connect(clients, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def start(client):
+        async with semaphore:
+            try:
+                await client.start()
+                return True
+            except Exception:  # pylint: disable=broad-except
+                await client.stop()
+                return False
+
+    results = await asyncio.gather(*(start(client) for client in clients))
+    return [client for client, ok in zip(clients, results) if ok]
+
+
+async def _round(clients, url, path, timeout):
+    probe = Client(url, path)
+    started = time.perf_counter()
+    try:
+        await probe.start()
+    except Exception:  # pylint: disable=broad-except
+        await probe.stop()
+        return None
+
+    deadline = started + timeout
+    while time.perf_counter() < deadline:
+        if all(client.latency(started) is not None for client in clients):
+            break
+        await asyncio.sleep(0.01)
+
+    latencies = [client.latency(started) for client in clients]
+    await probe.stop()
+    return [latency for latency in latencies if latency is not None]
+
+
+def _ms(values, share):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(len(values) * share), len(values) - 1)] * 1000
+
+
+async def main(args: argparse.Namespace):
+    """Print connection time and broadcast latency"""
+
+    clients = [
+        Client(args.url[i % len(args.url)], args.path) for i in range(args.clients)
+    ]
+
+    start = time.perf_counter()
+    clients = await _connect(clients, args.concurrency)
+    print(
+        f"connected {len(clients)}/{args.clients} clients to {len(args.url)} "
+        f"workers in {time.perf_counter() - start:.1f}s"
+    )
+
+    # NOTE: Broadcasts of the connection storm itself are not measured
+    await asyncio.sleep(args.timeout)
+
+    print(f"{'round':<8}{'worker':<28}{'delivered':>10}{'p50, ms':>10}{'p95, ms':>10}")
+    delivered = []
+    for i in range(args.rounds):
+        url = args.url[i % len(args.url)]
+        latencies = await _round(clients, url, args.path, args.timeout)
+        if latencies is None:
+            print(f"{i + 1:<8}{url:<28}{'probe failed to connect':>30}")
+            continue
+        delivered.extend(latencies)
+        print(
+            f"{i + 1:<8}{url:<28}{len(latencies):>10}"
+            f"{_ms(latencies, 0.5):>10.1f}{_ms(latencies, 0.95):>10.1f}"
+        )
+        await asyncio.sleep(1)
+
+    if delivered:
+        print(
+            f"total: p50 {_ms(delivered, 0.5):.1f} ms, "
+            f"p95 {_ms(delivered, 0.95):.1f} ms, "
+            f"p99 {_ms(delivered, 0.99):.1f} ms, "
+            f"mean {statistics.mean(delivered) * 1000:.1f} ms"
+        )
+
+    await asyncio.gather(*(client.stop() for client in clients))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_args()))
@@ -0,0 +1,38 @@
+"""
+Rebuild the prefix search index of searchable models
+
+python -m scripts.reindex_search --model=posts
+"""
+
+import argparse
+
+from models import ensure_indexes, get_model
+from routes.search.utils import SOURCES
+
+
+def _args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "--model",
+        type=str,
+        required=False,
+        default=None,
+        help="Collection name (all searchable by default)",
+    )
+
+    return parser.parse_args()
+
+
+def main(args: argparse.Namespace):
+    """Create indexes and reindex documents"""
+
+    ensure_indexes()
+
+    for name in [args.model] if args.model else SOURCES:
+        count = get_model(name).reindex_search()
+        print(f"{name}: {count}")
+
+
+if __name__ == "__main__":
+    main(_args())
@@ -18,6 +18,42 @@ os.environ["ENV"] = "test"
 os.environ["TG_TOKEN"] = "123456789:AABBCCDDEEFFaabbccddeeff-1234567890"
 
 
+@pytest.fixture(scope="function")
+def db(monkeypatch):
+    """In-memory MongoDB in place of the models database"""
+
+    import mongomock
+    import models
+
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(models._ConSysBase, "_db", database)
+    yield database
+
+
+@pytest.fixture(scope="function")
+def redis(monkeypatch):
+    """In-memory Redis in place of the `lib.queue` client
+
+    Replaces the client in every imported module and rebinds Lua scripts
+    registered on it, so import the tested modules before using it.
+    """
+
+    import fakeredis
+    from redis.commands.core import AsyncScript
+
+    import lib.queue
+
+    real = lib.queue.redis
+    fake = fakeredis.FakeAsyncRedis()
+    for module in list(sys.modules.values()):
+        for name, value in list(getattr(module, "__dict__", {}).items()):
+            if value is real:
+                monkeypatch.setattr(module, name, fake)
+            elif isinstance(value, AsyncScript) and value.registered_client is real:
+                monkeypatch.setattr(value, "registered_client", fake)
+    yield fake
+
+
 @pytest.fixture(scope="function")
 def app() -> Generator[FastAPI, Any, None]:
     from app import app
@@ -0,0 +1,159 @@
+import asyncio
+import time
+
+import jwt
+import pytest
+import pytest_asyncio
+from consys.errors import ErrorAccess
+
+from services import access
+
+
+SECRET = "secret"
+
+
+def _token(**claims):
+    return jwt.encode(
+        {"token": "s1", "user": 5, "status": 3, "network": 0, **claims},
+        SECRET,
+        algorithm="HS256",
+    )
+
+
+async def _started(verified):
+    """Wait for the revocation subscription of the process"""
+
+    for _ in range(100):
+        if verified.subscriber.active():
+            return verified
+        await asyncio.sleep(0.01)
+    raise AssertionError("Not subscribed")
+
+
+@pytest_asyncio.fixture
+async def processes(redis, monkeypatch):
+    """Revocation state of API processes, the first one is the current"""
+
+    created = []
+
+    def make():
+        created.append(access._Verified())
+        return created[-1]
+
+    monkeypatch.setattr(access, "verified", make())
+    yield make
+
+    for verified in created:
+        if verified.subscriber.listener is not None:
+            verified.subscriber.listener.cancel()
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    calls = []
+    decode = jwt.decode
+
+    def counted(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(access.jwt, "decode", counted)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_cache(processes, decodes):
+    token = _token(iat=time.time())
+
+    # NOTE: Cached tokens are not used until revocations are received
+    for _ in range(2):
+        assert await access.jwt_auth(SECRET, token) == ("s1", 5, 3, 0)
+    assert len(decodes) == 2
+
+    await _started(access.verified)
+    for _ in range(3):
+        assert await access.jwt_auth(SECRET, token) == ("s1", 5, 3, 0)
+    assert len(decodes) == 2
+
+    access.verified.subscriber.listener.cancel()
+    await asyncio.sleep(0)
+    await access.jwt_auth(SECRET, token)
+    assert len(decodes) == 3
+
+
+@pytest.mark.asyncio
+async def test_cache_expiry(processes):
+    verified = await _started(access.verified)
+
+    verified.put(b"expired", (("s1", 5, 3, 0), 0.0), exp=time.time() - 1)
+    assert verified.get(b"expired") is None
+
+    verified.size = 2
+    for i in range(3):
+        await access.jwt_auth(SECRET, _token(token=f"s{i}"))
+    assert len(verified.entries) == 2
+
+
+@pytest.mark.asyncio
+async def test_revoke(processes):
+    await _started(access.verified)
+    old = _token(iat=time.time() - 10)
+    legacy = _token()
+    other = _token(token="s2", iat=time.time() - 10)
+    await access.jwt_auth(SECRET, old)
+
+    await access.revoke(session="s1")
+    for token in (old, legacy):
+        with pytest.raises(ErrorAccess):
+            await access.jwt_auth(SECRET, token)
+    assert await access.jwt_auth(SECRET, other)
+
+    await access.revoke(user=5)
+    with pytest.raises(ErrorAccess):
+        await access.jwt_auth(SECRET, other)
+    assert not access.verified.is_revoked("s2", 5, time.time() + 1)
+
+
+@pytest.mark.asyncio
+async def test_revoke_processes(processes):
+    running = await _started(processes())
+    await _started(access.verified)
+
+    await access.revoke(session="s1", user=7)
+    await asyncio.sleep(0.05)
+    # NOTE: Received by running processes, loaded by the started ones
+    for verified in (running, await _started(processes())):
+        assert verified.is_revoked("s1", 0, time.time() - 10)
+        assert verified.is_revoked("s3", 7, time.time() - 10)
+        assert not verified.is_revoked("s3", 5, time.time() - 10)
+
+
+@pytest.mark.asyncio
+async def test_revoke_not_subscribed(processes, monkeypatch):
+    await _started(access.verified)
+    token = _token(iat=time.time() - 10)
+    await access.revoke(session="s1")
+
+    # NOTE: Revocations are read from Redis until the process is subscribed
+    fresh = processes()
+    monkeypatch.setattr(fresh.subscriber, "active", lambda: False)
+    monkeypatch.setattr(access, "verified", fresh)
+    with pytest.raises(ErrorAccess):
+        await access.jwt_auth(SECRET, token)
+    assert await access.jwt_auth(SECRET, _token(token="s2", iat=time.time()))
+
+    async def down(*args):
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(access.redis, "hmget", down)
+    with pytest.raises(ErrorAccess):
+        await access.jwt_auth(SECRET, _token(token="s2", iat=time.time()))
+
+
+@pytest.mark.asyncio
+async def test_leeway(processes):
+    await _started(access.verified)
+
+    # NOTE: Tokens issued by a process with the clock slightly ahead
+    token = _token(iat=time.time() + access.JWT_LEEWAY / 2)
+    assert (await access.jwt_auth(SECRET, token))[0] == "s1"
@@ -0,0 +1,131 @@
+import copy
+
+import pytest
+
+from lib import cache as module
+from lib.cache import LocalCache
+from models.category import Category
+from services.cache import _patch, get_index
+
+
+def _category(id_, parent=0, url=None):
+    return Category(id=id_, parent=parent, url=url or f"c{id_}", title=f"C{id_}")
+
+
+def _tree():
+    """1 → 2 → (3, 4), 1 → 5, 6 → 7"""
+
+    return [
+        _category(1),
+        _category(2, 1),
+        _category(3, 2),
+        _category(4, 2),
+        _category(5, 1),
+        _category(6),
+        _category(7, 6),
+    ]
+
+
+def _maps(categories):
+    """Maps as `cache_categories` builds them from scratch"""
+
+    parents, childs = get_index(Category.get_tree(categories))
+    return {
+        "category_ids": {category.id: category for category in categories},
+        "category_urls": {category.url: category for category in categories},
+        "category_parents": parents,
+        "category_childs": childs,
+    }
+
+
+def _plain(maps):
+    return {
+        "ids": {id_: category.parent for id_, category in maps["category_ids"].items()},
+        "urls": {url: category.id for url, category in maps["category_urls"].items()},
+        "parents": maps["category_parents"],
+        "childs": {
+            id_: sorted(childs) for id_, childs in maps["category_childs"].items()
+        },
+    }
+
+
+def _check(category_id, category, structure):
+    """Patched maps are equal to the rebuilt ones, cached lists are untouched"""
+
+    before = _tree()
+    cached = _maps(before)
+    snapshot = copy.deepcopy(_plain(cached))
+    maps = {key: dict(value) for key, value in cached.items()}
+
+    assert _patch(maps, category_id, category) is structure
+
+    after = [item for item in before if item.id != category_id]
+    if category is not None:
+        after.append(category)
+    assert _plain(maps) == _plain(_maps(after))
+    assert _plain(cached) == snapshot
+
+
+def test_update():
+    _check(3, _category(3, 2, url="renamed"), False)
+
+
+def test_move():
+    _check(2, _category(2, 6), True)
+    _check(2, _category(2, 0), True)
+    _check(7, _category(7, 4), True)
+
+
+def test_add_remove():
+    _check(8, _category(8, 3), True)
+    _check(8, _category(8, 0), True)
+    _check(4, None, True)
+    _check(7, None, True)
+
+
+@pytest.mark.parametrize(
+    "category_id, category",
+    [
+        # NOTE: Children of a removed category are orphaned
+        (2, None),
+        # NOTE: A category can not be moved into its own subtree
+        (2, _category(2, 3)),
+        # NOTE: Unknown parent
+        (5, _category(5, 9)),
+    ],
+)
+def test_rebuild_needed(category_id, category):
+    maps = {key: dict(value) for key, value in _maps(_tree()).items()}
+    assert _patch(maps, category_id, category) is None
+
+
+@pytest.mark.asyncio
+async def test_publish_partial(redis, monkeypatch):
+    cache = LocalCache("test")
+    await cache.publish({"a": 1, "b": 2})
+    assert int(await redis.get(cache.version_key)) == 1
+
+    save = module.save
+
+    async def failing(key, value, *args, **kwargs):
+        if key.startswith("b:"):
+            return False
+        return await save(key, value, *args, **kwargs)
+
+    # NOTE: Readers stay on the previous snapshot until every key is written
+    monkeypatch.setattr(module, "save", failing)
+    await cache.publish({"a": 3, "b": 4})
+    assert int(await redis.get(cache.version_key)) == 1
+
+    monkeypatch.setattr(module, "save", save)
+    await cache.publish({"a": 5}, keep=("missing",))
+    assert int(await redis.get(cache.version_key)) == 1
+    assert await cache.get("a") == 1
+    assert await cache.get("b") == 2
+
+    await cache.publish({"a": 6}, keep=("b",))
+    assert await cache.get("a") == 6
+    assert await cache.get("b") == 2
+
+    if cache.subscriber.listener is not None:
+        cache.subscriber.listener.cancel()
@@ -0,0 +1,80 @@
+import pickle
+
+import msgpack
+import pytest
+
+from lib import codec
+from lib.codec import decode, encode
+from models.comment import Comment
+
+
+def test_round_trip():
+    data = {"id": 1, "title": "Post", "tags": ["a", "b"], "price": 1.5, "raw": b"\0"}
+
+    for name in ("msgpack", "pickle"):
+        payload = encode(data, name)
+        assert payload[: len(codec.MAGIC)] == codec.MAGIC
+        assert payload[len(codec.MAGIC) + 1] == codec.get_codec(name).id
+        assert decode(payload) == data
+
+
+def test_compression():
+    data = {"text": "x" * (codec.COMPRESS_THRESHOLD * 2)}
+
+    compressed = encode(data)
+    assert compressed[codec.HEADER_SIZE - 1] & codec.FLAG_ZSTD
+    assert len(compressed) < codec.COMPRESS_THRESHOLD
+    assert decode(compressed) == data
+
+    plain = encode(data, compress=False)
+    assert not plain[codec.HEADER_SIZE - 1] & codec.FLAG_ZSTD
+    assert decode(plain) == data
+
+
+def test_default():
+    assert codec.get_codec() is codec.CODECS_BY_NAME["pickle"]
+
+
+def test_ext_set():
+    payload = codec.MsgpackCodec().dumps({"ids": {1, 2}, "fields": frozenset("ab")})
+    assert msgpack.unpackb(payload, raw=False)["ids"].code == codec.EXT_SET
+    assert decode(encode({"ids": {1, 2}}, "msgpack")) == {"ids": {1, 2}}
+    assert decode(encode(frozenset("ab"), "msgpack")) == {"a", "b"}
+
+
+def test_ext_model():
+    comment = Comment(id=7, post=3, data="text")
+
+    payload = codec.MsgpackCodec().dumps(comment)
+    name, state = msgpack.unpackb(payload, raw=False)
+    assert name.code == codec.EXT_MODEL_NAME
+    assert state["data"] == "text"
+
+    restored = decode(encode([comment], "msgpack"))[0]
+    assert isinstance(restored, Comment)
+    assert (restored.id, restored.post, restored.data) == (7, 3, "text")
+    assert restored.__dict__ == comment.__dict__
+
+
+def test_ext_model_nested():
+    # NOTE: Written before models were inlined
+    fields = {"id": 7, "post": 3, "data": "text"}
+    nested = msgpack.ExtType(codec.EXT_MODEL, msgpack.packb(["comments", fields]))
+    payload = msgpack.packb([nested], use_bin_type=True)
+
+    restored = codec.MsgpackCodec().loads(payload)[0]
+    assert isinstance(restored, Comment)
+    assert (restored.id, restored.post, restored.data) == (7, 3, "text")
+
+
+def test_legacy_pickle():
+    data = {"id": 1, "ids": {1, 2}}
+    assert decode(pickle.dumps(data)) == data
+
+
+def test_newer_version():
+    payload = bytearray(encode({"id": 1}))
+    payload[len(codec.MAGIC)] = codec.VERSION + 1
+
+    with pytest.raises(ValueError):
+        decode(bytes(payload))
@@ -0,0 +1,69 @@
+import pytest
+from consys.errors import ErrorInvalid
+
+from models.comment import Comment
+
+
+@pytest.fixture
+def comments(db):
+    """Comments of posts 1 and 2, with ties on `created`, and a hidden one"""
+
+    db.comments.insert_many(
+        [
+            {"_id": i, "id": i, "post": 1 + i % 2, "created": 100 + i // 4}
+            for i in range(1, 16)
+        ]
+        + [{"_id": 50, "id": 50, "post": 1, "created": 999, "status": 0}]
+    )
+    return db
+
+
+def _ids(post, db):
+    return [
+        doc["id"]
+        for doc in db.comments.find({"post": post, "status": {"$exists": False}}).sort(
+            [("created", -1), ("id", -1)]
+        )
+    ]
+
+
+def test_get_thread(comments):
+    expected = _ids(1, comments)
+
+    seen = []
+    key = None
+    while True:
+        page, key = Comment.get_thread(1, 3, after=key)
+        assert len(page) <= 3
+        seen += [comment["id"] for comment in page]
+        if key is None:
+            break
+        assert key == [page[-1]["created"], page[-1]["id"]]
+
+    assert seen == expected
+    assert 50 not in seen
+
+
+def test_get_thread_fields(comments):
+    page, _ = Comment.get_thread(2, 2, fields={"post"})
+    assert set(page[0]) == {"id", "created", "post"}
+
+    with pytest.raises(ErrorInvalid):
+        Comment.get_thread(1, 3, after=[100])
+
+
+@pytest.mark.asyncio
+async def test_aget_threads(comments):
+    threads = await Comment.aget_threads([1, 2, 3], 2)
+
+    assert set(threads) == {1, 2, 3}
+    for post in (1, 2):
+        page, key = threads[post]
+        assert [comment["id"] for comment in page] == _ids(post, comments)[:2]
+        assert key is not None
+    assert threads[3] == ([], None)
+
+    # NOTE: Each post is limited separately
+    threads = await Comment.aget_threads([1, 2], 100)
+    assert [len(page) for page, _ in threads.values()] == [7, 8]
+    assert [key for _, key in threads.values()] == [None, None]
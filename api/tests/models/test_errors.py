@@ -0,0 +1,135 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from starlette.requests import Request
+
+from services import errors as module
+from services.errors import ResponseCapture, _Reporter
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def reports(monkeypatch):
+    sent = []
+
+    async def warning(text, extra=None, **kwargs):
+        sent.append((text, extra))
+
+    monkeypatch.setattr(module.report, "warning", warning)
+    return sent
+
+
+def _request(path="/x/"):
+    return Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "path": path,
+            "root_path": "",
+            "scheme": "http",
+            "server": ("localhost", 80),
+            "query_string": b"",
+            "headers": [],
+        }
+    )
+
+
+async def _respond(capture, status, *chunks):
+    await capture({"type": "http.response.start", "status": status, "headers": []})
+    for chunk in chunks:
+        await capture({"type": "http.response.body", "body": chunk, "more_body": True})
+    await capture({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+@pytest.mark.asyncio
+async def test_capture_limit():
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    capture = ResponseCapture(send, size=10)
+    await _respond(capture, 500, b"abcdefgh", b"ijklmnop", b"qrstuvwx")
+
+    assert capture.started
+    assert bytes(capture.body) == b"abcdefghij"
+    assert capture.size == 24
+    # NOTE: The response itself is passed through as is
+    assert b"".join(message.get("body", b"") for message in sent[1:]) == (
+        b"abcdefghijklmnopqrstuvwx"
+    )
+
+    capture = ResponseCapture(send, size=10)
+    await _respond(capture, 200, b"abcdefgh")
+    assert capture.body == bytearray()
+
+
+@pytest.mark.asyncio
+async def test_capture_report(monkeypatch, reports, clock):
+    monkeypatch.setattr(module, "reporter", _Reporter())
+
+    async def send(message):
+        pass
+
+    capture = ResponseCapture(send, size=4)
+    await _respond(capture, 422, b"invalid")
+    await capture.report(_request())
+    assert reports == [
+        (
+            "inva... (7 bytes)",
+            {"method": "POST", "url": "http://localhost/x/", "status": 422},
+        )
+    ]
+
+    capture = ResponseCapture(send)
+    await _respond(capture, 401, b"Invalid token")
+    await capture.report(_request())
+    assert len(reports) == 1
+
+
+@pytest.mark.asyncio
+async def test_dedup(reports, clock):
+    reporter = _Reporter()
+    item = (b"a", "Error", {"status": 500})
+
+    for _ in range(3):
+        await reporter.send(item)
+    await reporter.send((b"b", "Other", {"status": 500}))
+    assert reports == [("Error", {"status": 500}), ("Other", {"status": 500})]
+
+    clock[0] += module.DEDUP_WINDOW + 1
+    await reporter.send(item)
+    assert reports[-1] == ("Error", {"status": 500, "repeats": 2})
+
+
+@pytest.mark.asyncio
+async def test_sampling(monkeypatch, reports, clock):
+    monkeypatch.setattr(module, "SAMPLE_RATE", 0)
+    await _Reporter().send((b"a", "Error", {"status": 500}))
+    assert reports == []
+
+
+@pytest.mark.asyncio
+async def test_background(reports, clock):
+    reporter = _Reporter(size=2)
+    assert not reporter.push((b"a", "Error", {"status": 500}))
+
+    reporter.start()
+    for key in (b"a", b"b", b"c"):
+        assert reporter.push((key, key.decode(), {"status": 500}))
+    # NOTE: The oldest report is dropped when the queue is full
+    assert [item[0] for item in reporter.queue] == [b"b", b"c"]
+    await asyncio.sleep(0.01)
+    assert [text for text, _ in reports] == ["b", "c"]
+
+    reporter.push((b"d", "d", {"status": 500}))
+    await reporter.stop()
+    assert [text for text, _ in reports] == ["b", "c", "d"]
+    assert not reporter.running
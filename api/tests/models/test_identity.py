@@ -0,0 +1,101 @@
+import asyncio
+
+import pytest
+from consys.errors import ErrorWrong
+
+from lib import identity
+from lib.identity import identity_scope
+from models.comment import Comment
+
+
+def _comments(db, *ids):
+    db.comments.insert_many(
+        [{"_id": id_, "id": id_, "post": 1, "data": f"c{id_}"} for id_ in ids]
+    )
+
+
+def test_scope():
+    assert not identity.active()
+    with identity_scope():
+        assert identity.active()
+        comment = Comment(id=1)
+        assert identity.remember(comment) is comment
+        assert identity.remember(Comment(id=1)) is comment
+        assert identity.lookup("comments", 1) is comment
+
+        identity.forget("comments", 2, missing=True)
+        assert identity.lookup("comments", 2) is identity.MISSING
+
+    assert not identity.active()
+    assert identity.lookup("comments", 1) is None
+
+
+def test_get(db):
+    _comments(db, 1, 2)
+
+    with identity_scope():
+        comment = Comment.get(1)
+        db.comments.update_one({"id": 1}, {"$set": {"data": "changed"}})
+        assert Comment.get(1) is comment
+        assert Comment.get(ids=1) is comment
+        assert comment in Comment.get([1, 2])
+
+        with pytest.raises(ErrorWrong):
+            Comment.get(3)
+        # NOTE: Known missing ids are not requested again
+        _comments(db, 3)
+        with pytest.raises(ErrorWrong):
+            Comment.get(3)
+
+    assert Comment.get(1).data == "changed"
+
+
+@pytest.mark.asyncio
+async def test_loader(db, monkeypatch):
+    _comments(db, 1, 2, 3)
+
+    calls = []
+    aget = Comment.aget
+
+    async def counted(*args, **kwargs):
+        calls.append(kwargs.get("ids"))
+        return await aget(*args, **kwargs)
+
+    monkeypatch.setattr(Comment, "aget", counted)
+
+    with identity_scope():
+        first, second, again = await asyncio.gather(
+            Comment.load(1), Comment.load(2), Comment.load(1)
+        )
+        assert [first.id, second.id] == [1, 2]
+        assert again is first
+        assert len(calls) == 1
+        assert sorted(calls[0]) == [1, 2]
+
+        # NOTE: Loaded instances are served from the map
+        assert await Comment.load(1) is first
+        assert len(calls) == 1
+
+        loaded = await Comment.load_many([1, 3, 4])
+        assert sorted(loaded) == [1, 3]
+        assert loaded[1] is first
+        assert calls[1] == [3, 4]
+
+        with pytest.raises(ErrorWrong):
+            await Comment.load(4)
+        assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_loader_task(db):
+    _comments(db, 1)
+
+    with identity_scope():
+        loading = asyncio.ensure_future(Comment.load(1))
+        for _ in range(2):
+            await asyncio.sleep(0)
+        # NOTE: The dispatch is referenced while it runs
+        assert len(identity._dispatches) == 1
+        assert (await loading).id == 1
+        await asyncio.sleep(0)
+        assert not identity._dispatches
@@ -0,0 +1,144 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from starlette.requests import Request
+
+from services import limiter as module
+from services.limiter import Limiter, check_limits
+
+
+# NOTE: Start of a day, so every window has just started
+NOW = 1_800_000_000.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [NOW]
+    monkeypatch.setattr(module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def _limiter():
+    return Limiter(
+        key_func=lambda request: "client",
+        default_limits=["3/second", "5/minute"],
+        route_limits={"/x/": ["2/minute"]},
+    )
+
+
+async def _hits(limiter, path, times):
+    return [await limiter.hit("client", path) for _ in range(times)]
+
+
+def test_parse():
+    assert module.parse("25/second") == (25, 1)
+    assert module.parse("100 / minutes") == (100, 60)
+
+
+@pytest.mark.asyncio
+async def test_hit(redis, clock):
+    limiter = _limiter()
+
+    hits = await _hits(limiter, "/y/", 4)
+    assert [exceeded for exceeded, _ in hits] == [None, None, None, "3 per 1 second"]
+    assert hits[0][1] == {
+        "X-RateLimit-Limit": "3",
+        "X-RateLimit-Remaining": "2",
+        "X-RateLimit-Reset": str(int(NOW) + 1),
+    }
+    # NOTE: The full second weighs 2 of 3 requests a third into the next one
+    assert hits[3][1] == {
+        "X-RateLimit-Limit": "3",
+        "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": str(int(NOW) + 2),
+        "Retry-After": "2",
+    }
+
+    # NOTE: The previous minute still counts, weighted by its remaining share
+    clock[0] += 60 + 30
+    hits = await _hits(limiter, "/y/", 3)
+    assert [exceeded for exceeded, _ in hits] == [None, None, None]
+    clock[0] += 2
+    exceeded, headers = await limiter.hit("client", "/y/")
+    assert exceeded == "5 per 1 minute"
+    assert headers["X-RateLimit-Limit"] == "5"
+    assert headers["Retry-After"] == "8"
+
+
+@pytest.mark.asyncio
+async def test_local_fallback(redis, clock, monkeypatch):
+    expected = await _hits(_limiter(), "/x/", 4)
+    await redis.flushall()
+
+    calls = []
+
+    async def down(**kwargs):
+        calls.append(kwargs)
+        raise ConnectionError("Redis is down")
+
+    monkeypatch.setattr(module, "_hit", down)
+    limiter = _limiter()
+    assert await _hits(limiter, "/x/", 4) == expected
+    # NOTE: Redis is not retried until `RETRY_DELAY` passes
+    assert len(calls) == 1
+    assert limiter.redis_failed == NOW
+
+    clock[0] += module.RETRY_DELAY + 1
+    await limiter.hit("client", "/x/")
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_local_cleanup(clock, monkeypatch):
+    monkeypatch.setattr(module, "LOCAL_SIZE", 2)
+    limiter = _limiter()
+    limiter.redis_failed = float("inf")
+
+    await limiter.hit("a", "/y/")
+    await limiter.hit("b", "/y/")
+    clock[0] += 120
+    await limiter.hit("c", "/y/")
+    assert {key.split(":")[1] for key in limiter.local} == {"c"}
+
+
+def _request(app, path):
+    return Request(
+        {
+            "type": "http",
+            "app": app,
+            "method": "GET",
+            "path": path,
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_check_limits(redis, clock):
+    app = FastAPI()
+    app.state.limiter = _limiter()
+
+    @app.get("/x/")
+    def route():
+        return {}
+
+    response, headers = await check_limits(_request(app, "/x/"))
+    assert response is None
+    assert (b"x-ratelimit-remaining", b"1") in headers
+
+    await check_limits(_request(app, "/x/"))
+    response, headers = await check_limits(_request(app, "/x/"))
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "90"
+    assert headers == []
+
+    # NOTE: Unknown paths are not limited
+    assert await check_limits(_request(app, "/unknown/")) == (None, [])
+
+    app.state.limiter.headers_enabled = False
+    response, headers = await check_limits(_request(app, "/y/"))
+    assert response is None
+    assert headers == []
@@ -0,0 +1,70 @@
+import base64
+
+import pytest
+from consys.errors import ErrorInvalid
+
+from lib.pagination import decode_cursor, encode_cursor
+from models import _keyset_condition
+from models.comment import Comment
+
+
+def test_keyset_condition():
+    assert _keyset_condition(("updated", "id"), [10, 5], "desc") == {
+        "$or": [
+            {"updated": {"$lt": 10}},
+            {"updated": 10, "id": {"$lt": 5}},
+        ]
+    }
+    assert _keyset_condition(("id",), [5], "asc") == {"$or": [{"id": {"$gt": 5}}]}
+
+
+@pytest.mark.parametrize("sort", ["desc", "asc"])
+def test_page(db, sort):
+    # NOTE: Ties on `created`, so ids break them
+    db.comments.insert_many(
+        [{"_id": i, "id": i, "post": 1, "created": i // 3} for i in range(1, 12)]
+    )
+    expected = sorted(
+        range(1, 12), key=lambda i: (i // 3, i), reverse=sort == "desc"
+    )
+
+    seen = []
+    key = None
+    for _ in range(10):
+        items, key = Comment.page(
+            4, after=key, sortby=("created", "id"), sort=sort, post=1
+        )
+        seen += [item.id for item in items]
+        if key is None:
+            break
+        key = decode_cursor(encode_cursor(key))
+
+    assert seen == expected
+
+
+def test_page_invalid_key(db):
+    with pytest.raises(ErrorInvalid):
+        Comment.page(4, after=[1], sortby=("created", "id"))
+
+
+def test_cursor():
+    assert encode_cursor(None) is None
+    assert decode_cursor(None) is None
+    assert decode_cursor("") is None
+
+    cursor = encode_cursor([1700000000.5, 42, "title"])
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == [1700000000.5, 42, "title"]
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not a cursor",
+        base64.urlsafe_b64encode(b'{"id": 1}').decode(),
+        base64.urlsafe_b64encode(b"[1,").decode(),
+    ],
+)
+def test_cursor_invalid(cursor):
+    with pytest.raises(ErrorInvalid):
+        decode_cursor(cursor)
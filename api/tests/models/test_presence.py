@@ -0,0 +1,65 @@
+import pytest
+
+from services import presence
+
+
+async def _owners(redis):
+    return {
+        owner.decode(): int(sockets)
+        for owner, sockets in (await redis.hgetall(presence.OWNERS_KEY)).items()
+    }
+
+
+@pytest.mark.asyncio
+async def test_connect_disconnect(redis):
+    assert await presence.connect("s1", user=5)
+    assert not await presence.connect("s2", user=5)
+    assert await presence.connect("s3", token="guest")
+    assert not await presence.connect("s4")
+    assert await _owners(redis) == {"u5": 2, "tguest": 1}
+    assert await presence.count() == 2
+    assert await presence.online(user=5)
+
+    # NOTE: Repeated online events of the same socket are not counted
+    assert not await presence.connect("s1", user=5)
+    assert await _owners(redis) == {"u5": 2, "tguest": 1}
+
+    assert not await presence.disconnect("s1")
+    assert not await presence.disconnect("s1")
+    assert await _owners(redis) == {"u5": 1, "tguest": 1}
+    assert await presence.disconnect("s2")
+    assert not await presence.online(user=5)
+    assert await presence.count() == 1
+
+    assert await presence.disconnect_many(["s3", "s9"]) == [True, False]
+    assert await _owners(redis) == {}
+    assert not await redis.exists(presence.SOCKETS_KEY, presence.HEARTBEAT_KEY)
+
+
+@pytest.mark.asyncio
+async def test_reconnect_new_owner(redis):
+    await presence.connect("s1", token="guest")
+    await presence.connect("s2", token="guest")
+
+    # NOTE: A guest socket that signed in moves to the user
+    assert await presence.connect("s1", user=5)
+    assert await _owners(redis) == {"u5": 1, "tguest": 1}
+    assert not await presence.connect("s2", user=5)
+    assert await _owners(redis) == {"u5": 2}
+    assert not await presence.online(token="guest")
+
+    assert not await presence.disconnect("s1")
+    assert await presence.disconnect("s2")
+    assert await presence.count() == 0
+
+
+@pytest.mark.asyncio
+async def test_heartbeat(redis):
+    await presence.connect("s1", user=5)
+    await presence.connect("s2", user=6)
+    await redis.zadd(presence.HEARTBEAT_KEY, {"s1": 0, "s2": 0})
+
+    await presence.touch(["s2", "s3"])
+    assert await presence.stale() == ["s1"]
+    # NOTE: Heartbeats do not bring back closed sockets
+    assert await redis.zscore(presence.HEARTBEAT_KEY, "s3") is None
@@ -0,0 +1,156 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+
+from lib import profiles as module
+
+
+class _UserHub:
+    """`User.complex`, responses are sent when `gate` is set"""
+
+    def __init__(self):
+        self.users = {
+            1: {"id": 1, "login": "one", "status": 3},
+            2: {"id": 2, "login": "two", "status": 4},
+        }
+        self.calls = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def complex(self, token=None, id=None, fields=None):
+        self.calls.append(id)
+        ids = id if isinstance(id, list) else [id]
+        users = [
+            {field: self.users[i].get(field) for field in fields}
+            for i in ids
+            if i in self.users
+        ]
+        await self.gate.wait()
+        return users
+
+
+async def _started(cache):
+    for _ in range(100):
+        if cache.subscriber.active():
+            return cache
+        await asyncio.sleep(0.01)
+    raise AssertionError("Not subscribed")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(module, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def userhub(monkeypatch):
+    fake = _UserHub()
+    monkeypatch.setattr(module.User, "complex", fake.complex)
+    return fake
+
+
+@pytest_asyncio.fixture
+async def processes(redis, clock, userhub):
+    """Profile caches of API processes"""
+
+    created = []
+
+    async def make():
+        created.append(module._Profiles())
+        return await _started(created[-1])
+
+    yield make
+
+    for cache in created:
+        if cache.subscriber.listener is not None:
+            cache.subscriber.listener.cancel()
+
+
+@pytest.mark.asyncio
+async def test_ttl(processes, clock, userhub):
+    cache = await processes()
+
+    assert await cache.get(1, {"login", "status"}) == {
+        "id": 1,
+        "login": "one",
+        "status": 3,
+    }
+    assert await cache.get_many([1, 2, 3], {"login"}) == {
+        1: {"id": 1, "login": "one"},
+        2: {"id": 2, "login": "two"},
+    }
+    assert userhub.calls == [1, [2, 3]]
+
+    # NOTE: Other processes read it from Redis
+    other = await processes()
+    assert await other.get(2, {"login"}) == {"id": 2, "login": "two"}
+    assert len(userhub.calls) == 2
+
+    # NOTE: `status` expires before `login`
+    userhub.users[1] = {"id": 1, "login": "renamed", "status": 5}
+    clock[0] += module.FIELD_TTL["status"] + 1
+    assert await cache.get(1, {"login"}) == {"id": 1, "login": "one"}
+    assert await cache.get(1, {"status"}) == {"id": 1, "status": 5}
+    assert len(userhub.calls) == 3
+
+    clock[0] += module.TTL
+    assert await other.get(1, {"login"}) == {"id": 1, "login": "renamed"}
+    assert len(userhub.calls) == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent(processes, userhub):
+    cache = await processes()
+    userhub.gate.clear()
+
+    loading = [
+        asyncio.ensure_future(cache.get(1, {"login"})),
+        asyncio.ensure_future(cache.get_many([1, 2], {"login"})),
+    ]
+    await asyncio.sleep(0.01)
+    userhub.gate.set()
+    single, many = await asyncio.gather(*loading)
+
+    assert single == {"id": 1, "login": "one"}
+    assert many == {1: single, 2: {"id": 2, "login": "two"}}
+    assert userhub.calls == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_invalidate(processes, clock, userhub, redis):
+    cache = await processes()
+    other = await processes()
+    await cache.get(1, {"login"})
+    await other.get(1, {"login"})
+    assert len(userhub.calls) == 1
+
+    userhub.users[1]["login"] = "renamed"
+    await cache.invalidate(1)
+    await asyncio.sleep(0.05)
+    clock[0] += 1
+    assert not await redis.exists(module._key(1))
+    for process in (cache, other):
+        assert await process.get(1, {"login"}) == {"id": 1, "login": "renamed"}
+    assert len(userhub.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_during_fetch(processes, userhub, redis):
+    cache = await processes()
+    userhub.gate.clear()
+
+    loading = asyncio.ensure_future(cache.get(1, {"login"}))
+    await asyncio.sleep(0.01)
+    userhub.users[1]["login"] = "renamed"
+    await cache.invalidate(1)
+    userhub.gate.set()
+
+    # NOTE: The stale result is returned to its caller, but not stored
+    assert await loading == {"id": 1, "login": "one"}
+    assert not await redis.exists(module._key(1))
+    assert await cache.get(1, {"login"}) == {"id": 1, "login": "renamed"}
+    assert len(userhub.calls) == 2
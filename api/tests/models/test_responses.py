@@ -0,0 +1,42 @@
+import orjson
+
+from lib.responses import dumps, shape
+from routes.feedback.get import FeedbackItem
+from routes.spaces.get import SpaceResponse, serialize_space
+
+
+SPACE = {
+    "id": 12,
+    "title": "Retail partners",
+    "link": "a1b2c",
+    "inn": "7701234567",
+    "margin": 12,
+    "users": [1, 2],
+    "created": 1_800_000_000.0,
+    "updated": 1_800_000_100,
+    "status": 1,
+}
+
+
+def _validated(model, data):
+    return orjson.loads(model.model_validate(data).model_dump_json())
+
+
+def test_shape_as_validated():
+    for model, data in (
+        (SpaceResponse, SPACE),
+        (FeedbackItem, {"id": 1, "type": "bug", "created": 1_800_000_000.0}),
+    ):
+        assert orjson.loads(dumps(shape(model, data))) == _validated(model, data)
+
+
+def test_shape_cast():
+    # NOTE: Stored with other types, response validation used to cast them
+    space = serialize_space(
+        {**SPACE, "inn": 7701234567, "created": 1_800_000_000.5, "users": ["1"]}
+    )
+    assert space["inn"] == "7701234567"
+    assert space["created"] == 1_800_000_000
+    assert space["users"] == [1]
+    assert space["margin"] == 12.0
+    assert space["logo"] is None
@@ -0,0 +1,19 @@
+from types import SimpleNamespace
+
+from routes.search.utils import access_conditions, sources
+
+
+def _request(user, status):
+    return SimpleNamespace(state=SimpleNamespace(user=user, status=status))
+
+
+def test_access_conditions():
+    assert access_conditions("spaces", _request(5, 3)) == {"users": 5}
+    assert access_conditions("spaces", _request(5, 4)) == {}
+    assert access_conditions("posts", _request(0, 3)) == {"status": {"$exists": False}}
+
+    # NOTE: Guests do not search spaces at all
+    guest = _request(0, 3)
+    assert access_conditions("spaces", guest) is None
+    assert "spaces" not in [name for name, *_ in sources(None, guest)]
+    assert access_conditions("spaces", _request(None, 3)) is None
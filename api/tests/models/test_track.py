@@ -0,0 +1,27 @@
+from models.track import Track, TrackAction, TrackObject
+from services.tracking import metric_tracking_dropped
+
+
+def _entry(user):
+    return {
+        "object": TrackObject.SESSION,
+        "action": TrackAction.DISCONNECT,
+        "user": user,
+        "token": None,
+    }
+
+
+def test_log_many(db):
+    assert Track.log_many([_entry(1), _entry(2)]) == 2
+    assert [doc["id"] for doc in db.tracking.find().sort("id", 1)] == [1, 2]
+
+
+def test_log_many_collisions(db, monkeypatch):
+    db.tracking.insert_one({"_id": 1, "id": 1})
+    # NOTE: Every attempt collides, as with concurrent inserts
+    monkeypatch.setattr(Track, "_next_id", classmethod(lambda cls: 1))
+    dropped = metric_tracking_dropped._value.get()
+
+    assert Track.log_many([_entry(1), _entry(2)]) == 0
+    assert metric_tracking_dropped._value.get() == dropped + 2
+    assert db.tracking.count_documents({}) == 1
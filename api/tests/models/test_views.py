@@ -0,0 +1,31 @@
+import pytest
+
+from services import views as module
+
+
+def _reactions(db):
+    return [
+        (doc["post"], doc.get("user"), doc.get("token"))
+        for doc in db.reactions.find().sort("id", 1)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_flush(db, redis, monkeypatch):
+    monkeypatch.setattr(module, "BATCH_SIZE", 2)
+    db.posts.insert_many([{"_id": 1, "id": 1}, {"_id": 2, "id": 2}])
+    db.reactions.insert_one({"_id": 1, "id": 1, "post": 1, "token": "a"})
+
+    # NOTE: More views than in one batch, merged across batches
+    await module.record(1, token="a")
+    await module.record(1, user=5, token="a")
+    await module.record(2, token="b")
+    await module.record(2, token="c")
+    await module.record(2, user=6, token="b")
+    await module.record(2, user=6, token="c")
+    await module.record(1, user=5, token="d")
+    await module.flush()
+
+    assert not await redis.llen(module.PENDING_QUEUE)
+    assert _reactions(db) == [(1, 5, "a"), (2, 6, "b")]
+    assert [doc.get("views") for doc in db.posts.find().sort("id", 1)] == [2, 3]
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from lib.worker import Worker
+
+
+class _Collector(Worker):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.flushed = []
+        self.lost = 0
+
+    def dropped(self, count):
+        self.lost += count
+
+    async def flush(self):
+        while self.queue:
+            self.flushed.append(self.queue.popleft())
+
+
+@pytest.mark.asyncio
+async def test_wake_interval():
+    worker = _Collector(3, wake=2, interval=0.05)
+    assert not worker.push(1)
+
+    worker.start()
+    worker.push(1)
+    await asyncio.sleep(0.01)
+    assert worker.flushed == []
+
+    # NOTE: Flushed once `wake` items are queued, the rest on the interval
+    worker.push(2)
+    await asyncio.sleep(0.01)
+    assert worker.flushed == [1, 2]
+    worker.push(3)
+    await asyncio.sleep(0.1)
+    assert worker.flushed == [1, 2, 3]
+    await worker.stop()
+
+
+@pytest.mark.asyncio
+async def test_overflow_stop():
+    worker = _Collector(2, wake=10)
+    worker.start()
+    for item in range(4):
+        worker.push(item)
+    assert worker.lost == 2
+
+    await worker.stop()
+    assert worker.flushed == [2, 3]
+    assert not worker.running
+    assert not worker.push(4)
@@ -125,7 +125,7 @@ export function PostDetailClient({
   });
 
   const formattedViews = new Intl.NumberFormat(locale).format(post.views ?? 0);
-  const commentsCount = new Intl.NumberFormat(locale).format(post.comments?.length ?? 0);
+  const commentsCount = new Intl.NumberFormat(locale).format(post.comments_count ?? post.comments?.length ?? 0);
   const publishedAt = formatDateTime(createdAt);
   const updatedAtFormatted = formatDateTime(updatedAt);
   const showUpdated = updatedAt !== createdAt;
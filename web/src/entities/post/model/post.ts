@@ -43,6 +43,8 @@ export interface Post {
             image?: string;
         };
     }>;
+    comments_count?: number;
+    comments_cursor?: string | null;
     views?: number;
 }
 
@@ -55,6 +57,8 @@ export interface PostsGetRequest {
     category?: number;
     locale?: string;
     utm?: string;
+    comments_limit?: number;
+    comments_cursor?: string;
 }
 
 export interface PostsGetResponse {